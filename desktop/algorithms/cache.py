@@ -0,0 +1,231 @@
+# algorithms/cache.py
+import os
+import json
+import hashlib
+import inspect
+import threading
+import contextlib
+import weakref
+from collections import OrderedDict
+import numpy as np
+from algorithms import registry
+
+# Result cache keyed by (content hash of the source, operation, normalized
+# parameters). Memory is bounded by a byte budget with LRU eviction; an
+# optional directory keeps results on disk across runs.
+
+_key_memo = {}  # id(array) -> (weakref, key); hashing the same array twice is free
+
+def content_key(img_np: np.ndarray) -> str:
+    memo = _key_memo.get(id(img_np))
+    if memo is not None and memo[0]() is img_np:
+        return memo[1]
+
+    a = np.ascontiguousarray(img_np)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{a.shape}|{a.dtype.str}".encode())
+    h.update(memoryview(a).cast("B"))
+    key = h.hexdigest()
+
+    if not img_np.flags.writeable:  # only arrays that cannot change under us
+        oid = id(img_np)
+        try:
+            ref = weakref.ref(img_np, lambda _r, oid=oid: _key_memo.pop(oid, None))
+            _key_memo[oid] = (ref, key)
+        except TypeError:
+            pass
+    return key
+
+# Caches of planes derived from a source image (gray, derivatives) key them
+# by plane_key(img). Inside a band or tile (partial()) nothing is kept: the
+# block is a new slice every time and would only push whole images out.
+# Instead the band runner fetches the whole image's planes once and passes
+# them in with the block's position, and the block uses its part of them
+# (band_planes). A caller that already knows the source's key (a pipeline
+# step, ResultCache.call) passes it with source_key() so the pixels are not
+# hashed again.
+_context = threading.local()
+
+@contextlib.contextmanager
+def partial(planes=None, at=(0, 0)):
+    # planes: {kind: plane of the whole image}; at: (row, column) of the block in it
+    prev = getattr(_context, "band", None)
+    _context.band = (planes or {}, at)
+    try:
+        yield
+    finally:
+        _context.band = prev
+
+def band_planes():
+    # (planes, at) of the band or tile being computed, None outside one
+    return getattr(_context, "band", None)
+
+@contextlib.contextmanager
+def source_key(img_np, key):
+    prev = getattr(_context, "source", None)
+    _context.source = (img_np, key) if key is not None else None
+    try:
+        yield
+    finally:
+        _context.source = prev
+
+def plane_key(img_np, cheap_only: bool = False) -> str:
+    # None: do not cache planes of img_np. cheap_only: no hashing of writable
+    # arrays (a full pass over the pixels, as costly as a cheap plane itself);
+    # read-only ones are hashed once and memoized
+    if band_planes() is not None:
+        return None
+    source = getattr(_context, "source", None)
+    if source is not None and source[0] is img_np:
+        return source[1]
+    if cheap_only and img_np.flags.writeable:
+        return None
+    return content_key(img_np)
+
+def cached_plane(get_cache, kind: str, img_np, compute, cheap_only: bool = False):
+    # read-only plane `kind` of img_np: inside a band or tile, its part of the
+    # whole image's plane when the runner passed one in; otherwise from
+    # get_cache() under plane_key; otherwise computed and not kept
+    band = band_planes()
+    if band is not None and kind in band[0]:
+        (y, x), (h, w) = band[1], img_np.shape[:2]
+        return band[0][kind][y:y + h, x:x + w]
+    src = plane_key(img_np, cheap_only)
+    if src is None:
+        plane = compute(img_np)
+        plane.flags.writeable = False
+        return plane
+    cache = get_cache()
+    key = f"{src}:{kind}"
+    plane = cache.get(key)
+    if plane is None:
+        plane = cache.put(key, compute(img_np))
+    return plane
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, (tuple, list)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def op_key(name: str, params: dict) -> str:
+    # defaults filled in and strings normalized the way the operations read
+    # them, so smooth(mode="Mean") and smooth() hit the same entry
+    fn = registry.get(name)
+    try:
+        bound = inspect.signature(fn).bind(None, **params)
+        bound.apply_defaults()
+        args = dict(list(bound.arguments.items())[1:])
+    except TypeError:
+        args = dict(params)
+    args = {k: _normalize(v) for k, v in sorted(args.items()) if k not in ("progress", "out")}
+    return f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+def derive_key(src_key: str, name: str, params: dict) -> str:
+    # key of the result of name(params) applied to the image with src_key;
+    # chains of operations get keys without hashing the intermediates
+    h = hashlib.blake2b(digest_size=16)
+    h.update(src_key.encode())
+    h.update(op_key(name, params).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, max_bytes: int = 512 << 20, cache_dir: str = None):
+        self.max_bytes = int(max_bytes)
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        mb = int(os.environ.get("IMAGE_TOOLKIT_CACHE_MB", "512"))
+        return cls(mb << 20, os.environ.get("IMAGE_TOOLKIT_CACHE_DIR") or None)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def _remember(self, key, arr):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            if arr.nbytes > self.max_bytes:
+                return
+            self._items[key] = arr
+            self._bytes += arr.nbytes
+            while self._bytes > self.max_bytes and self._items:
+                _, dropped = self._items.popitem(last=False)
+                self._bytes -= dropped.nbytes
+
+    def get(self, key):
+        with self._lock:
+            arr = self._items.get(key)
+            if arr is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return arr
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            try:
+                arr = np.load(self._disk_path(key))
+            except (OSError, ValueError):
+                arr = None
+            if arr is not None:
+                arr.flags.writeable = False
+                self._remember(key, arr)
+                with self._lock:
+                    self.hits += 1
+                return arr
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, arr):
+        arr = np.asarray(arr)
+        arr.flags.writeable = False  # shared between callers from now on
+        self._remember(key, arr)
+        if self.cache_dir:
+            path = self._disk_path(key)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+        return arr
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> str:
+        return (f"cache {self.hits} hit{'s' if self.hits != 1 else ''} / {self.misses} miss"
+                f"{'es' if self.misses != 1 else ''}, {self._bytes / (1 << 20):.0f} MB")
+
+    def call(self, name: str, img_np: np.ndarray, compute, **params):
+        # cached compute(img_np); PIL results are stored as arrays
+        src = content_key(img_np)
+        key = derive_key(src, name, params)
+        hit = self.get(key)
+        if hit is not None:
+            return hit
+        with source_key(img_np, src):
+            out = compute(img_np)
+        if not isinstance(out, np.ndarray):
+            out = np.array(out)
+        return self.put(key, out)
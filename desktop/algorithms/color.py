@@ -0,0 +1,122 @@
+# algorithms/color.py
+import os
+import threading
+from functools import lru_cache
+import numpy as np
+from algorithms.cache import ResultCache, cached_plane, plane_key
+
+# RGB -> gray with the 0.299 / 0.587 / 0.114 weights, truncated, in integer
+# arithmetic. A 20-bit fixed-point sum gives floor((299 r + 587 g + 114 b) /
+# 1000) for all 2^24 colors. The old float64 expression lands just below the
+# integer for some colors whose exact luminance is a whole number; those are
+# found once (a 64K table) and corrected, so the result stays byte-identical
+# to the float version.
+#
+# The gray plane of a color image is also cached per source when its key is
+# known without hashing (a pipeline step, or a read-only array: cache.plane_key),
+# so running Negative, Threshold or any other gray-based op again on the same
+# source skips the conversion.
+
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+_SHIFT = 20
+_FIXED = (313524, 615514, 119538)  # round(w * 2**20)
+_BIAS = 256
+_NEAR = 1 << 10  # fraction below this: the exact luminance is a whole number
+CHUNK_PIXELS = 1 << 18  # uint32 scratch is bounded to this many pixels
+
+def luminance_float(rgb: np.ndarray) -> np.ndarray:
+    # the original expression, kept as the reference the integer path matches
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (0.299 * r + 0.587 * g + 0.114 * b).astype(np.uint8)
+
+@lru_cache(maxsize=1)
+def _low_table() -> np.ndarray:
+    # (r << 8 | g) -> True where the color with 1000 | (299 r + 587 g + 114 b)
+    # comes out one too low in float64. 114 b mod 1000 is distinct for
+    # b < 256, so r and g fix b and a 64K table covers all such colors.
+    b_for = np.full(1000, -1, dtype=np.int64)
+    b = np.arange(256, dtype=np.int64)
+    b_for[(114 * b) % 1000] = b
+    rg = np.arange(65536, dtype=np.int64)
+    r, g = rg >> 8, rg & 0xFF
+    b = b_for[(-(299 * r + 587 * g)) % 1000]
+    ok = b >= 0
+    exact = (299 * r[ok] + 587 * g[ok] + 114 * b[ok]) // 1000
+    table = np.zeros(65536, dtype=bool)
+    table[rg[ok]] = luminance_float(np.stack([r[ok], g[ok], b[ok]], axis=1)) < exact
+    return table
+
+def _correct(acc, frac, rgb):
+    # acc -= 1 for the colors in the low table; a small fixed-point fraction
+    # means the exact luminance is a whole number
+    near = frac < _NEAR
+    n = np.count_nonzero(near)
+    if not n:
+        return
+    low = _low_table()
+    if n * 16 < near.size:
+        idx = np.flatnonzero(near)
+        px = rgb[np.divmod(idx, rgb.shape[1])]
+        rg = (px[:, 0].astype(np.uint16) << 8) | px[:, 1]
+        acc.reshape(-1)[idx[low[rg]]] -= 1
+    else:  # flat areas: look up every pixel rather than gather
+        rg = rgb[..., 0].astype(np.uint16)
+        rg <<= 8
+        rg |= rgb[..., 1]
+        hit = low[rg]
+        hit &= near
+        np.subtract(acc, hit, out=acc, casting="unsafe")
+
+def luminance(rgb: np.ndarray, out=None) -> np.ndarray:
+
+    # (H, W, 3) uint8 -> (H, W) uint8, identical to luminance_float(rgb)
+    H, W = rgb.shape[0], rgb.shape[1]
+    if out is None:
+        out = np.empty((H, W), dtype=np.uint8)
+    if rgb.dtype != np.uint8:  # the fixed-point weights assume 0..255
+        out[...] = luminance_float(rgb)
+        return out
+    rows = max(1, CHUNK_PIXELS // max(1, W))
+    acc = np.empty((min(rows, H), W), dtype=np.uint32)
+    tmp = np.empty_like(acc)
+    for y0 in range(0, H, rows):
+        y1 = min(H, y0 + rows)
+        a, t, c = acc[:y1 - y0], tmp[:y1 - y0], rgb[y0:y1]
+        np.multiply(c[..., 0], _FIXED[0], out=a, dtype=np.uint32)
+        np.multiply(c[..., 1], _FIXED[1], out=t, dtype=np.uint32)
+        a += t
+        np.multiply(c[..., 2], _FIXED[2], out=t, dtype=np.uint32)
+        a += t
+        a += _BIAS
+        np.bitwise_and(a, (1 << _SHIFT) - 1, out=t)
+        a >>= _SHIFT
+        _correct(a, t, c)
+        np.copyto(out[y0:y1], a, casting="unsafe")
+    return out
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def gray_cache() -> ResultCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(int(os.environ.get("IMAGE_TOOLKIT_GRAY_CACHE_MB", "128")) << 20)
+    return _cache
+
+def gray_plane(img_np: np.ndarray) -> np.ndarray:
+
+    # read-only luminance of a color image, cached per source when its key
+    # comes for free (hashing costs as much as the luminance); gray input is
+    # returned as it is
+    if img_np.ndim == 2:
+        return img_np
+    return cached_plane(gray_cache, "luma", img_np, luminance, cheap_only=True)
+
+def gray_planes(img_np) -> dict:
+    # {"luma": plane} of the whole image for bands to share, None when it
+    # would not be kept (the bands then each compute their own rows)
+    if np.ndim(img_np) != 3 or plane_key(img_np, cheap_only=True) is None:
+        return None
+    return {"luma": gray_plane(img_np)}
@@ -0,0 +1,104 @@
+# algorithms/convolve.py
+import numpy as np
+
+def _pad_zero(img_np: np.ndarray, r: int = 1) -> np.ndarray:
+    # pad rows/cols only, channels stay as they are
+    pad = [(r, r), (r, r)] + [(0, 0)] * (img_np.ndim - 2)
+    return np.pad(img_np, pad, mode="constant", constant_values=0)
+
+def _taps(K, H, W):
+    # (weight, output slices, input slices) per nonzero tap; pixels outside
+    # the image count as zero, so they are simply left out of the sums
+    for di in range(3):
+        for dj in range(3):
+            k = K[di, dj].item()
+            if k == 0:
+                continue
+            dy, dx = di - 1, dj - 1
+            rows_out = slice(max(0, -dy), H - max(0, dy))
+            cols_out = slice(max(0, -dx), W - max(0, dx))
+            rows_in = slice(max(0, dy), H + min(0, dy))
+            cols_in = slice(max(0, dx), W + min(0, dx))
+            yield k, (rows_out, cols_out), (rows_in, cols_in)
+
+def _accumulate(img_np, K, acc, tmp=None):
+    # acc = K (correlated) img, without a padded copy of the input; tmp is
+    # only needed (and allocated if missing) for weights other than +-1
+    H, W = img_np.shape[0], img_np.shape[1]
+    acc[...] = 0
+    for k, dst, src in _taps(K, H, W):
+        a, s = acc[dst], img_np[src]
+        if k == 1:
+            np.add(a, s, out=a, dtype=acc.dtype)
+        elif k == -1:
+            np.subtract(a, s, out=a, dtype=acc.dtype)
+        else:
+            if tmp is None:
+                tmp = np.empty_like(acc)
+            t = tmp[:a.shape[0], :a.shape[1]]
+            np.multiply(s, k, out=t, dtype=acc.dtype)
+            a += t
+    return acc
+
+def rational_kernel(K, max_den: int = 256):
+    # (N, d) with integer N >= 0 such that trunc(sum K * v) == (sum N * v) // d
+    # for every uint8 neighbourhood v, or None. float32 weights like 1/9 are
+    # slightly above the exact fraction; that is fine as long as the excess
+    # over a full 0..255 window stays below one step of 1/d.
+    K = np.asarray(K)
+    if np.issubdtype(K.dtype, np.integer) or (K < 0).any():
+        return None
+    K64 = K.astype(np.float64)
+    for d in range(1, max_den + 1):
+        N = np.rint(K64 * d)
+        excess = K64 * d - N  # exact: float32 weight times a small integer
+        if (excess >= 0).all() and excess.sum() * 255 < 1 and np.abs(excess).max() < 1e-3:
+            return N.astype(np.int64), d
+    return None
+
+def conv3x3_rational(img_np: np.ndarray, N: np.ndarray, d: int, out=None, scratch=None) -> np.ndarray:
+
+    # uint8 image, kernel N / d with N >= 0 and sum(N) <= d: integer sums in
+    # uint16 and a floor division, written into a uint8 `out`. scratch is a
+    # list of up to two uint16 arrays of the image shape, reused across calls.
+    assert img_np.dtype == np.uint8 and N.sum() <= d and N.sum() * 255 < 65536
+    if scratch is None:
+        scratch = []
+    if not scratch:
+        scratch.append(np.empty(img_np.shape, np.uint16))
+    if len(scratch) < 2 and not np.isin(N, (0, 1)).all():
+        scratch.append(np.empty(img_np.shape, np.uint16))
+    acc = scratch[0]
+    _accumulate(img_np, N, acc, scratch[1] if len(scratch) > 1 else None)
+    if d & (d - 1) == 0:
+        np.right_shift(acc, d.bit_length() - 1, out=acc)
+    else:
+        np.floor_divide(acc, d, out=acc)
+    if out is None:
+        out = np.empty(img_np.shape, np.uint8)
+    np.copyto(out, acc, casting="unsafe")
+    return out
+
+def conv3x3(img_np: np.ndarray, K: np.ndarray, out=None, dtype=None) -> np.ndarray:
+
+    # Whole-array 3x3 correlation with zero padding (same as the old per-pixel
+    # np.sum(region * K) loop). Works on (H, W) and (H, W, C) in one call.
+    # Integer kernels accumulate in int32 (or `dtype`, e.g. int16 when the
+    # sums fit), float kernels in float64 and are truncated toward zero like
+    # int(...) was. The result is int32 unless `out` / `dtype` say otherwise.
+    K = np.asarray(K)
+    integer = np.issubdtype(K.dtype, np.integer)
+    acc_dtype = np.dtype(dtype or np.int32) if integer else np.float64
+
+    acc = out if integer and out is not None and out.dtype == acc_dtype else \
+        np.empty(img_np.shape, dtype=acc_dtype)
+    _accumulate(img_np, K, acc)
+
+    if not integer:
+        np.trunc(acc, out=acc)
+    if acc is out:
+        return out
+    if out is not None:
+        np.copyto(out, acc, casting="unsafe")
+        return out
+    return acc if integer else acc.astype(dtype or np.int32)
@@ -0,0 +1,71 @@
+# algorithms/derivatives.py
+import os
+import threading
+import numpy as np
+from algorithms.convolve import conv3x3
+from algorithms.cache import ResultCache, cached_plane
+
+# Derivative planes per source image, shared by sharpening and edge
+# detection: changing the sharpen strength, or going from Laplacian Edge to
+# second-order sharpen on the same pixels, only redoes the blend. Planes are
+# keyed by the source's key (cache.plane_key) and stored as int16
+# (|values| <= 2040). Bands and tiles slice the whole image's planes, which
+# the band runner fetches once (planes(), registry._PLANES).
+
+SOBEL_X = np.array([[-1, 0, 1],
+                    [-2, 0, 2],
+                    [-1, 0, 1]], dtype=np.int32)
+
+SOBEL_Y = np.array([[-1, -2, -1],
+                    [ 0,  0,  0],
+                    [ 1,  2,  1]], dtype=np.int32)
+
+LAPLACIAN_4 = np.array([[0,  1, 0],
+                        [1, -4, 1],
+                        [0,  1, 0]], dtype=np.int32)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def plane_cache() -> ResultCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(int(os.environ.get("IMAGE_TOOLKIT_DERIV_CACHE_MB", "256")) << 20)
+    return _cache
+
+def _plane(kind, img_np, compute):
+    # two convolutions: worth hashing a writable source for
+    return cached_plane(plane_cache, kind, img_np, compute)
+
+def _acc_dtype(img_np):
+    # uint8 sums stay within +-2040, other inputs get the full int32
+    return np.int16 if img_np.dtype == np.uint8 else np.int32
+
+def _sobel_l1(img_np):
+    gx = conv3x3(img_np, SOBEL_X, dtype=_acc_dtype(img_np))
+    gy = conv3x3(img_np, SOBEL_Y, dtype=gx.dtype)
+    np.abs(gx, out=gx)
+    np.abs(gy, out=gy)
+    gx += gy
+    return gx.astype(np.int16, copy=False)
+
+def _laplacian(img_np):
+    return conv3x3(img_np, LAPLACIAN_4, dtype=_acc_dtype(img_np)).astype(np.int16, copy=False)
+
+def sobel_magnitude(img_np: np.ndarray) -> np.ndarray:
+
+    # |gx| + |gy| (L1 Sobel magnitude), read-only int16
+    return _plane("sobel_l1", img_np, _sobel_l1)
+
+def laplacian_plane(img_np: np.ndarray) -> np.ndarray:
+
+    # 4-neighbour Laplacian with zero padding, read-only int16
+    return _plane("laplacian4", img_np, _laplacian)
+
+_PLANE_FNS = {"sobel_l1": sobel_magnitude, "laplacian4": laplacian_plane}
+
+def planes(img_np: np.ndarray, *kinds) -> dict:
+
+    # {kind: plane} of the whole image, from the cache when it is there
+    return {kind: _PLANE_FNS[kind](img_np) for kind in kinds}
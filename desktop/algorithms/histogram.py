@@ -1,43 +1,138 @@
 # algorithms/histogram.py
 import io
+import warnings
 import numpy as np
-from PIL import Image
-import matplotlib
-matplotlib.use("Agg")  # render off-screen
-import matplotlib.pyplot as plt
+from PIL import Image, ImageDraw, ImageFont
+from algorithms import jit
+
+_CHUNK_PIXELS = 1 << 18  # bincount upcasts its input to intp, so go in bands
+
+def channel_histograms(img_np: np.ndarray, progress=None) -> np.ndarray:
+
+    # (256,) counts for a 2-D image, (C, 256) for a color image
+    if progress is None and img_np.dtype == np.uint8 and jit.enabled():
+        return jit.channel_histograms(img_np)
+    a = img_np if img_np.ndim == 3 else img_np[:, :, None]
+    H, W, C = a.shape
+    hist = np.zeros((C, 256), dtype=np.int64)
+    rows = max(1, _CHUNK_PIXELS // max(1, W))
+    if progress is not None:
+        progress.start(len(range(0, H, rows)))
+    for y in range(0, H, rows):
+        band = a[y:y + rows]
+        for ch in range(C):
+            hist[ch] += np.bincount(band[:, :, ch].ravel(), minlength=256)[:256]
+        if progress is not None:
+            progress.advance()
+    return hist if img_np.ndim == 3 else hist[0]
+
+def compute_histogram_manual(img_np: np.ndarray, progress=None):
 
-def compute_histogram_manual(img_np: np.ndarray):
-    
     if img_np.ndim == 2:
-        H, W = img_np.shape
-        hist = np.zeros(256, dtype=np.int64)
-        for i in range(H):
-            for j in range(W):
-                v = int(img_np[i, j])
-                hist[v] += 1
-        return {"mode": "gray", "gray": hist}
+        return {"mode": "gray", "gray": channel_histograms(img_np, progress)}
 
     # color (assume 3 channels)
     H, W, C = img_np.shape
     assert C == 3, "Only 3-channel color supported"
-    r_hist = np.zeros(256, dtype=np.int64)
-    g_hist = np.zeros(256, dtype=np.int64)
-    b_hist = np.zeros(256, dtype=np.int64)
-
-    for i in range(H):
-        for j in range(W):
-            r = int(img_np[i, j, 0])
-            g = int(img_np[i, j, 1])
-            b = int(img_np[i, j, 2])
-            r_hist[r] += 1
-            g_hist[g] += 1
-            b_hist[b] += 1
-
+    r_hist, g_hist, b_hist = channel_histograms(img_np, progress)
     return {"mode": "color", "r": r_hist, "g": g_hist, "b": b_hist}
 
-def render_histogram_image(img_np: np.ndarray, figsize=(8, 5)) -> Image.Image:
-    
-    h = compute_histogram_manual(img_np)
+# ---------- chart rendering ----------
+_BG = (255, 255, 255)
+_AXIS = (40, 40, 40)
+_GRID = (200, 200, 200)
+_LINE_COLORS = {"gray": (31, 119, 180), "r": (214, 39, 40), "g": (44, 160, 44), "b": (31, 119, 180)}
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+def _nice_step(vmax, target_ticks=5):
+    raw = max(vmax, 1) / target_ticks
+    mag = 10 ** max(0, int(np.floor(np.log10(raw))))  # counts: whole ticks
+    for m in (1, 2, 5, 10):
+        if m * mag >= raw:
+            return m * mag
+    return 10 * mag
+
+def _text_size(draw, text, font):
+    l, t, r, b = draw.textbbox((0, 0), text, font=font)
+    return r - l, b - t
+
+def _dashed_line(draw, p0, p1, fill, dash=4):
+    (x0, y0), (x1, y1) = p0, p1
+    length = max(abs(x1 - x0), abs(y1 - y0))
+    for s in range(0, int(length), dash * 2):
+        e = min(s + dash, length)
+        draw.line([(x0 + (x1 - x0) * s / length, y0 + (y1 - y0) * s / length),
+                   (x0 + (x1 - x0) * e / length, y0 + (y1 - y0) * e / length)], fill=fill)
+
+def _render_chart(h, figsize, dpi=120) -> Image.Image:
+    W, H = int(figsize[0] * dpi), int(figsize[1] * dpi)
+    img = Image.new("RGB", (W, H), _BG)
+    draw = ImageDraw.Draw(img)
+    f_title, f_label, f_tick = _font(18), _font(15), _font(12)
+
+    names = ["gray"] if h["mode"] == "gray" else ["r", "g", "b"]
+    vmax = max(int(h[n].max()) for n in names)
+    step = _nice_step(vmax)
+    ytop = max(step, int(np.ceil(vmax / step)) * step)
+
+    tick_w = max(_text_size(draw, str(v), f_tick)[0] for v in range(0, ytop + 1, step))
+    left, right, top, bottom = 40 + tick_w, 24, 44, 64
+    x0, y0, x1, y1 = left, top, W - right, H - bottom
+
+    def px(v): return x0 + (x1 - x0) * v / 255.0
+    def py(c): return y1 - (y1 - y0) * c / ytop
+
+    # grid + ticks
+    for v in range(0, 256, 50):
+        X = px(v)
+        _dashed_line(draw, (X, y0), (X, y1), _GRID)
+        tw, th = _text_size(draw, str(v), f_tick)
+        draw.text((X - tw / 2, y1 + 6), str(v), fill=_AXIS, font=f_tick)
+    for c in range(0, ytop + 1, step):
+        Y = py(c)
+        _dashed_line(draw, (x0, Y), (x1, Y), _GRID)
+        tw, th = _text_size(draw, str(c), f_tick)
+        draw.text((x0 - tw - 6, Y - th / 2 - 2), str(c), fill=_AXIS, font=f_tick)
+    draw.rectangle([x0, y0, x1, y1], outline=_AXIS)
+
+    # curves
+    xs = px(np.arange(256))
+    for n in names:
+        ys = py(h[n].astype(np.float64))
+        draw.line(list(zip(xs.tolist(), ys.tolist())), fill=_LINE_COLORS[n], width=2)
+
+    # labels
+    title = "Histogram (Grayscale)" if h["mode"] == "gray" else "Histogram (Color)"
+    tw, th = _text_size(draw, title, f_title)
+    draw.text(((x0 + x1 - tw) / 2, (top - th) / 2 - 2), title, fill=_AXIS, font=f_title)
+    xl = "Intensity (0-255)"
+    tw, th = _text_size(draw, xl, f_label)
+    draw.text(((x0 + x1 - tw) / 2, H - th - 14), xl, fill=_AXIS, font=f_label)
+    tw, th = _text_size(draw, "Count", f_label)
+    ylab = Image.new("RGB", (tw + 4, th + 6), _BG)
+    ImageDraw.Draw(ylab).text((2, 0), "Count", fill=_AXIS, font=f_label)
+    ylab = ylab.rotate(90, expand=True)
+    img.paste(ylab, (6, int((y0 + y1 - ylab.height) / 2)))
+
+    if len(names) > 1:
+        lx, ly = x1 - 60, y0 + 10
+        draw.rectangle([lx - 8, ly - 6, x1 - 10, ly + 22 * len(names) - 4], fill=_BG, outline=_GRID)
+        for i, n in enumerate(names):
+            yy = ly + 22 * i + 6
+            draw.line([(lx, yy), (lx + 20, yy)], fill=_LINE_COLORS[n], width=2)
+            draw.text((lx + 26, yy - 8), n.upper(), fill=_AXIS, font=f_tick)
+
+    return img
+
+def _render_matplotlib(h, figsize) -> Image.Image:
+    import matplotlib
+    matplotlib.use("Agg")  # render off-screen
+    import matplotlib.pyplot as plt
 
     fig = plt.figure(figsize=figsize, dpi=120)
     ax = fig.add_subplot(111)
@@ -65,3 +160,16 @@ def render_histogram_image(img_np: np.ndarray, figsize=(8, 5)) -> Image.Image:
     hist_pil = Image.open(buf).convert("RGB")
     buf.close()
     return hist_pil
+
+def render_chart(h, figsize=(8, 5), use_matplotlib: bool = False) -> Image.Image:
+    if use_matplotlib:
+        try:
+            return _render_matplotlib(h, figsize)
+        except ImportError as e:  # optional (pip install matplotlib)
+            warnings.warn(f"matplotlib unavailable, using the built-in chart: {e}")
+    return _render_chart(h, figsize)
+
+def render_histogram_image(img_np: np.ndarray, figsize=(8, 5), use_matplotlib: bool = False,
+                           progress=None) -> Image.Image:
+
+    return render_chart(compute_histogram_manual(img_np, progress), figsize, use_matplotlib)
@@ -0,0 +1,179 @@
+# algorithms/history.py
+import os
+import zlib
+import threading
+import numpy as np
+
+# Undo / redo history of results. Every entry keeps the recipe (Pipeline)
+# that produced it from the original, so its pixels are optional: within the
+# byte budget they are kept as they are; over it, the entries farthest from
+# the current one are first zlib-compressed (lossless), then dropped and
+# recomputed on demand from the nearest earlier entry that still has pixels
+# (or the original). The current entry and its neighbours are the last to
+# go, so one undo / redo is normally just a lookup or a decompression.
+
+LEVEL = 1  # zlib level: most of the gain on photos at a fraction of the time
+
+
+class _Entry:
+    __slots__ = ("recipe", "label", "raw", "packed")
+
+    def __init__(self, recipe, label, raw):
+        self.recipe, self.label, self.raw, self.packed = recipe, label, raw, None
+
+    @property
+    def nbytes(self) -> int:
+        if self.raw is not None:
+            return self.raw.nbytes
+        return len(self.packed[2]) if self.packed is not None else 0
+
+
+def _pack(arr):
+    a = np.ascontiguousarray(arr)
+    return a.shape, a.dtype.str, zlib.compress(memoryview(a).cast("B"), LEVEL)
+
+def _unpack(packed):
+    shape, dtype, data = packed
+    arr = np.frombuffer(zlib.decompress(data), dtype=dtype).reshape(shape)
+    arr.flags.writeable = False
+    return arr
+
+
+class History:
+
+    def __init__(self, max_bytes: int = 256 << 20):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self.clear()
+
+    @classmethod
+    def from_env(cls):
+        return cls(int(os.environ.get("IMAGE_TOOLKIT_HISTORY_MB", "256")) << 20)
+
+    def clear(self):
+        # back to a single entry: the original, with no result
+        with self._lock:
+            self._entries = [_Entry(None, "Original", None)]
+            self._index = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def current(self):
+        return self._entries[self._index]
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(e.nbytes for e in self._entries)
+
+    @property
+    def can_undo(self) -> bool:
+        return self._index > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self._index < len(self._entries) - 1
+
+    def push(self, recipe, label: str, img_np):
+        # new current entry; redo entries past the old current one are dropped.
+        # img_np None means "no result" (the original). Call trim() afterwards.
+        if img_np is not None:
+            img_np = np.asarray(img_np)
+            img_np.flags.writeable = False
+        with self._lock:
+            del self._entries[self._index + 1:]
+            self._entries.append(_Entry(recipe, label, img_np))
+            self._index += 1
+
+    def neighbour(self, delta: int):
+        # the entry delta steps from the current one, or None past either end
+        with self._lock:
+            i = self._index + delta
+            return self._entries[i] if 0 <= i < len(self._entries) else None
+
+    def step(self, delta: int):
+        # moves the current entry by delta (-1 undo, +1 redo); None at either end
+        with self._lock:
+            i = self._index + delta
+            if not 0 <= i < len(self._entries):
+                return None
+            self._index = i
+            return self._entries[i]
+
+    def peek(self, entry):
+        # the entry's pixels without recomputing: array, or None if dropped
+        with self._lock:
+            raw, packed = entry.raw, entry.packed
+        if raw is not None:
+            return raw
+        return _unpack(packed) if packed is not None else None
+
+    def image(self, entry, original, progress=None):
+
+        # The entry's pixels, recomputed if they were dropped: the rest of its
+        # recipe is run on the nearest earlier entry whose recipe is a prefix
+        # of it, or on the original. The result is kept again (see trim).
+        if entry.recipe is None:
+            return None
+        img = self.peek(entry)
+        if img is not None:
+            return img
+        from algorithms.pipeline import Pipeline
+        with self._lock:
+            i = self._entries.index(entry)
+            bases = self._entries[i - 1:0:-1]
+        base, done = original, 0
+        steps = entry.recipe.steps
+        for b in bases:
+            if b.recipe is None or b.raw is None and b.packed is None:
+                continue
+            n = len(b.recipe.steps)
+            if b.recipe.steps == steps[:n]:
+                img = self.peek(b)
+                if img is not None:
+                    base, done = img, n
+                    break
+        out = np.asarray(Pipeline(steps[done:]).run(base, progress))
+        out.flags.writeable = False
+        with self._lock:
+            if entry.raw is None and entry.packed is None:
+                entry.raw = out
+        return out
+
+    def trim(self):
+
+        # Brings the history inside the byte budget: compresses, then drops,
+        # entries in order of their distance from the current one. Compression
+        # runs outside the lock, so this can be called from a worker thread.
+        while True:
+            with self._lock:
+                total = sum(e.nbytes for e in self._entries)
+                if total <= self.max_bytes:
+                    return
+                cur = self._index
+                order = sorted((i for i in range(1, len(self._entries)) if i != cur),
+                               key=lambda i: -abs(i - cur))
+                raw = next((self._entries[i] for i in order if self._entries[i].raw is not None), None)
+                if raw is None:
+                    packed = next((self._entries[i] for i in order if self._entries[i].packed is not None), None)
+                    if packed is None:
+                        return  # only the current result is left; it stays
+                    packed.packed = None
+                    continue
+                arr = raw.raw
+            packed = _pack(arr)
+            if len(packed[2]) > arr.nbytes * 3 // 4:
+                packed = None  # noise-like: not worth keeping, the recipe brings it back
+            with self._lock:
+                if raw.raw is arr:
+                    raw.raw, raw.packed = None, packed
+
+    def stats(self) -> str:
+        with self._lock:
+            kept = sum(e.raw is not None for e in self._entries)
+            packed = sum(e.packed is not None for e in self._entries)
+            steps = len(self._entries) - 1
+        return (f"history {steps} step{'s' if steps != 1 else ''} ({kept} kept, {packed} compressed), "
+                f"{self.nbytes / (1 << 20):.0f} MB")
@@ -0,0 +1,169 @@
+# algorithms/jit.py
+import os
+import sys
+import threading
+import warnings
+import importlib.util
+import numpy as np
+
+# Optional Numba backend. The kernels below are the per-pixel loops the
+# algorithms were first written as, compiled on first use with rows spread
+# over all cores (prange) and the machine code cached on disk (cache=True,
+# in __pycache__ or NUMBA_CACHE_DIR), so later launches skip the compile.
+# Each one gives the same bytes as the numpy path it stands in for; the
+# callers keep using that path when Numba is not installed or cannot be
+# imported, with IMAGE_TOOLKIT_JIT=0, or inside a call the registry runs on
+# its "numpy" implementation (WithoutJit).
+#
+# Parallel kernels are launched one at a time: Numba's default thread pool
+# must not be entered from two threads at once, and one launch already uses
+# every core.
+
+_launch = threading.Lock()
+_state = {"kernels": None, "failed": False}
+_local = threading.local()
+
+def available() -> bool:
+    # Numba is imported on the first call, not at startup
+    if os.environ.get("IMAGE_TOOLKIT_JIT", "1") == "0":
+        return False
+    return _kernels() is not None
+
+def enabled() -> bool:
+    # available and not switched off for the calling thread
+    return not getattr(_local, "off", 0) and available()
+
+
+def limit_threads(n: int = 1):
+    # process pool initializer: at most n threads per kernel launch, so that
+    # workers x cores threads do not fight over the cores
+    os.environ["NUMBA_NUM_THREADS"] = str(n)
+    if "numba" in sys.modules:
+        sys.modules["numba"].set_num_threads(n)
+
+
+class WithoutJit:
+    # fn with the kernels switched off in the thread that calls it; a class,
+    # not a closure, so band functions still pickle for worker processes
+
+    def __init__(self, fn):
+        self.fn = self.__wrapped__ = fn  # inspect.signature follows __wrapped__
+
+    def __call__(self, *args, **kwargs):
+        _local.off = getattr(_local, "off", 0) + 1
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            _local.off -= 1
+
+    def __repr__(self):
+        return f"WithoutJit({self.fn!r})"
+
+
+def _build(cache: bool):
+    from numba import njit, prange
+    jit = njit(parallel=True, nogil=True, cache=cache)
+
+    @jit
+    def lut_apply(img, lut, out):
+        # out[y, x, c] = lut[c, img[y, x, c]]
+        H, W, C = img.shape
+        for y in prange(H):
+            for x in range(W):
+                for c in range(C):
+                    out[y, x, c] = lut[c, img[y, x, c]]
+
+    @jit
+    def histograms(img):
+        # (C, 256) counts; row blocks count on their own, then add up
+        H, W, C = img.shape
+        blocks = max(1, min(H, 64))
+        parts = np.zeros((blocks, C, 256), np.int64)
+        for b in prange(blocks):
+            for y in range(b * H // blocks, (b + 1) * H // blocks):
+                for x in range(W):
+                    for c in range(C):
+                        parts[b, c, img[y, x, c]] += 1
+        hist = np.zeros((C, 256), np.int64)
+        for b in range(blocks):
+            hist += parts[b]
+        return hist
+
+    @jit
+    def gather(img, ys, xs, out):
+        # nearest neighbour: out[y, x] = img[ys[y], xs[x]]
+        for y in prange(ys.shape[0]):
+            for x in range(xs.shape[0]):
+                for c in range(img.shape[2]):
+                    out[y, x, c] = img[ys[y], xs[x], c]
+
+    @jit
+    def weighted(img, iy, wy, ix, wx, out):
+        # separable weighted gather in float32, rows then columns, terms added
+        # in tap order as resize._along does; rounded half to even
+        H2, W, C = iy.shape[0], img.shape[1], img.shape[2]
+        rows = np.empty((H2, W, C), np.float32)
+        for y in prange(H2):
+            for x in range(W):
+                for c in range(C):
+                    acc = np.float32(img[iy[y, 0], x, c]) * wy[y, 0]
+                    for k in range(1, iy.shape[1]):
+                        acc += np.float32(img[iy[y, k], x, c]) * wy[y, k]
+                    rows[y, x, c] = acc
+        for y in prange(H2):
+            for x in range(ix.shape[0]):
+                for c in range(C):
+                    acc = rows[y, ix[x, 0], c] * wx[x, 0]
+                    for k in range(1, ix.shape[1]):
+                        acc += rows[y, ix[x, k], c] * wx[x, k]
+                    v = np.rint(acc)
+                    out[y, x, c] = 0 if v < 0 else 255 if v > 255 else np.uint8(v)
+
+    return {"lut_apply": lut_apply, "histograms": histograms, "gather": gather, "weighted": weighted}
+
+def _kernels():
+    if _state["kernels"] is None and not _state["failed"]:
+        if importlib.util.find_spec("numba") is None:
+            _state["failed"] = True
+            return None
+        try:
+            try:
+                _state["kernels"] = _build(cache=True)
+            except RuntimeError:  # no writable cache location (e.g. a frozen app)
+                _state["kernels"] = _build(cache=False)
+        except Exception as e:  # e.g. a Numba release that does not support this numpy
+            _state["failed"] = True
+            warnings.warn(f"Numba backend unavailable, using numpy: {e}")
+    return _state["kernels"]
+
+def _run(name, *args):
+    fn = _kernels()[name]
+    with _launch:
+        return fn(*args)
+
+def _hwc(a):
+    return a if a.ndim == 3 else a[:, :, None]
+
+# ---------- Entry points (same results as the numpy paths) ----------
+def apply_lut(img_np: np.ndarray, lut: np.ndarray, out=None) -> np.ndarray:
+    # uint8 image; lut (256,) or (C, 256)
+    if out is None:
+        out = np.empty_like(img_np)
+    src = _hwc(img_np)
+    lut = np.ascontiguousarray(np.broadcast_to(lut.reshape(-1, 256), (src.shape[2], 256)))
+    _run("lut_apply", src, lut, _hwc(out))
+    return out
+
+def channel_histograms(img_np: np.ndarray) -> np.ndarray:
+    hist = _run("histograms", _hwc(img_np))
+    return hist if img_np.ndim == 3 else hist[0]
+
+def gather(img_np: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    out = np.empty((len(ys), len(xs)) + img_np.shape[2:], dtype=img_np.dtype)
+    _run("gather", _hwc(img_np), ys, xs, _hwc(out))
+    return out
+
+def weighted(img_np: np.ndarray, iy, wy, ix, wx) -> np.ndarray:
+    out = np.empty((iy.shape[0], ix.shape[0]) + img_np.shape[2:], dtype=np.uint8)
+    _run("weighted", _hwc(img_np), iy, wy, ix, wx, _hwc(out))
+    return out
@@ -0,0 +1,104 @@
+# algorithms/loader.py
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from algorithms.preview import fit_image, _fit_size
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+def _normalize(img: Image.Image) -> Image.Image:
+    if img.mode not in ("L", "RGB"): img = img.convert("RGB")
+    return img
+
+def load_image(path: str) -> Image.Image:
+    # full decode, done here rather than lazily on first pixel access
+    img = Image.open(path)
+    img.load()
+    return _normalize(img)
+
+def _tiff_page(img: Image.Image, max_w: int, max_h: int):
+    # smallest reduced-resolution page (pyramidal TIFF) that still covers the
+    # fitted size of page 0, None if there is none: pages of other shapes are
+    # other images, not reductions
+    W, H = img.size
+    tw, th, _ = _fit_size(W, H, max_w, max_h)
+    best = None
+    for i in range(1, getattr(img, "n_frames", 1)):
+        img.seek(i)
+        w, h = img.size
+        if tw <= w < W and th <= h < H and abs(w * H - h * W) <= max(W, H):
+            if best is None or w < best[1]:
+                best = (i, w)
+    return None if best is None else best[0]
+
+def load_draft(path: str, max_w: int, max_h: int):
+    # JPEGs can be decoded at 1/2..1/8 scale (DCT scaling via draft), and
+    # pyramidal TIFFs have reduced pages; both are far cheaper than a full
+    # decode. Other files (PNG, BMP, flat TIFF) only decode at full size,
+    # which the full load is already doing: None.
+    img = Image.open(path)
+    if img.format == "JPEG":
+        img.draft(img.mode if img.mode in ("L", "RGB") else None, (max_w, max_h))
+    elif img.format == "TIFF" and (page := _tiff_page(img, max_w, max_h)) is not None:
+        img.seek(page)
+    else:
+        img.close()
+        return None
+    img.load()
+    return fit_image(_normalize(img), max_w, max_h)
+
+def folder_images(path: str):
+    # image files next to `path`, in name order
+    folder = os.path.dirname(os.path.abspath(path))
+    names = [n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTS)]
+    return [os.path.join(folder, n) for n in sorted(names, key=str.lower)]
+
+def neighbours(path: str, files=None):
+    # (previous, next) image in the folder, None at either end
+    files = files if files is not None else folder_images(path)
+    path = os.path.abspath(path)
+    if path not in files:
+        return None, None
+    i = files.index(path)
+    return (files[i - 1] if i > 0 else None), (files[i + 1] if i + 1 < len(files) else None)
+
+
+class ImageLoader:
+    # Background decoding. Full decodes are kept for the last few paths asked
+    # for, so prefetched neighbours open without a decode stall; an entry is
+    # dropped when the file changes on disk.
+
+    def __init__(self, workers: int = 2, keep: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._keep = keep
+        self._full = OrderedDict()  # (abspath, mtime) -> Future
+        self._lock = threading.Lock()
+
+    def draft(self, path: str, max_w: int, max_h: int):
+        return self._pool.submit(load_draft, path, max_w, max_h)
+
+    def full(self, path: str):
+        path = os.path.abspath(path)
+        try:
+            key = (path, os.path.getmtime(path))
+        except OSError:
+            key = (path, None)  # let the decode report the error
+        with self._lock:
+            fut = self._full.get(key)
+            if fut is None or (fut.done() and fut.exception() is not None):
+                fut = self._full[key] = self._pool.submit(load_image, path)
+            self._full.move_to_end(key)
+            while len(self._full) > self._keep:
+                _, old = self._full.popitem(last=False)
+                old.cancel()
+        return fut
+
+    def prefetch(self, paths):
+        for p in paths:
+            if p:
+                self.full(p)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,177 @@
+# algorithms/parallel.py
+import os
+import functools
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from multiprocessing import shared_memory
+from algorithms import jit, registry, trace
+from algorithms.cache import partial
+from algorithms.tiling import read_tile, point_tile_fn, run_banded
+
+# Runs a registry operation on row bands (with the halo the op needs) on a
+# worker pool. Threads suit the vectorized NumPy kernels, which release the
+# GIL inside their loops; processes are for code that holds the GIL, and get
+# the pixels through shared memory instead of pickling them.
+
+MIN_BAND_ROWS = 64
+BANDS_PER_WORKER = 4
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+def mp_context():
+    # Worker processes start from a fresh interpreter (forkserver, or spawn
+    # where there is none), never by forking this one: a fork taken after
+    # Numba's thread pool has run leaves the parent hanging at exit.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _init_worker(spec: str):
+    # the implementation choice (registry.use) of the parent when the pool
+    # started: a forkserver started earlier would hand down its own
+    if spec != registry.current_spec():
+        registry.use(spec or None)
+    jit.limit_threads()
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    # one compiled-kernel thread per worker: the pool already fills the cores
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context(),
+                               initializer=_init_worker, initargs=(registry.current_spec(),))
+
+def _pool(backend: str, workers: int):
+    # process pools are kept per implementation choice, since their workers
+    # fix it when they start; one left over from an earlier choice is closed
+    spec = registry.current_spec() if backend == "process" else ""
+    key = (backend, workers)
+    with _pools_lock:
+        pool, pool_spec = _pools.get(key, (None, None))
+        if pool is not None and pool_spec != spec:
+            pool.shutdown(wait=False)
+            pool = None
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=workers) if backend == "thread" \
+                else process_pool(workers)
+            _pools[key] = pool, spec
+        return pool
+
+def shutdown():
+    with _pools_lock:
+        for pool, _ in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+def bands(H: int, workers: int, halo: int = 0):
+    n = max(1, min(workers * BANDS_PER_WORKER, H // max(MIN_BAND_ROWS, 2 * halo + 1)))
+    edges = np.linspace(0, H, n + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+def _band_fn(name, img_np, params, progress=None):
+    # picklable callable producing the exact full-image result on any band
+    op = registry.point_op(name, **params)
+    if op is not None:
+        return registry.with_impl(point_tile_fn(img_np, [op], progress=progress), name)
+    return functools.partial(registry.call, name, **params)
+
+def _run_band(fn, img_np, out, y0, y1, halo, planes=None):
+    block, inner = read_tile(img_np, y0, y1, 0, img_np.shape[1], halo)
+    with partial(planes, (y0 - inner[0].start, 0)):
+        out[y0:y1] = fn(block)[inner]
+
+def _attach(desc):
+    name, shape, dtype = desc
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _process_band(fn, in_desc, out_desc, y0, y1, halo):
+    shm_in, a = _attach(in_desc)
+    shm_out, out = _attach(out_desc)
+    try:
+        _run_band(fn, a, out, y0, y1, halo)
+    finally:
+        del a, out
+        shm_in.close(); shm_out.close()
+
+def _shared_copy(arr):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+    view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    if arr.size:
+        view[...] = arr
+    return shm, view
+
+def _collect(futures, progress):
+    # wait for all bands; on error or cancel drop the queued ones and let the
+    # running ones finish before the buffers they write into are released
+    try:
+        for f in as_completed(futures):
+            f.result()
+            if progress is not None:
+                progress.advance()
+    except BaseException:
+        for f in futures:
+            f.cancel()
+        wait(futures)
+        raise
+
+def run_parallel(name: str, img_np: np.ndarray, workers: int = None, backend: str = "thread",
+                 progress=None, **params) -> np.ndarray:
+
+    # Same result as registry.call(name, img_np, **params). Operations that
+    # cannot be split into bands (histogram, resize) run as one call.
+    workers = workers or cpu_count()
+    with trace.span(name, img_np, cat="parallel", backend=backend, workers=workers, **params) as rec:
+        out = _run_parallel(name, img_np, workers, backend, progress, **params)
+        rec["out"] = trace.shape_of(out)
+    return out
+
+def _run_parallel(name, img_np, workers, backend, progress, **params):
+    halo = registry.halo(name, **params)
+    H = img_np.shape[0]
+    if halo is None:
+        if progress is not None:
+            return registry.call(name, img_np, progress=progress, **params)
+        return registry.call(name, img_np, **params)
+    if workers <= 1 or H < 2 * MIN_BAND_ROWS:
+        if progress is not None:
+            return run_banded(name, img_np, progress, **params)
+        return registry.call(name, img_np, **params)
+
+    # whole-image planes (cached under the caller's source key) for the
+    # threads to share; worker processes make their own
+    planes = registry.planes(name, img_np, **params) if backend == "thread" else None
+    img_np = np.ascontiguousarray(img_np)
+    fn = _band_fn(name, img_np, params, progress)
+    with partial():
+        probe = fn(img_np[:1, :1])  # output channels / dtype
+    out_shape = img_np.shape[:2] + probe.shape[2:]
+    work = bands(H, workers, halo)
+    if progress is not None:
+        progress.start(len(work))
+
+    if backend == "thread":
+        out = np.empty(out_shape, dtype=probe.dtype)
+        pool = _pool("thread", workers)
+        _collect([pool.submit(_run_band, fn, img_np, out, y0, y1, halo, planes) for y0, y1 in work],
+                 progress)
+        return out
+
+    if backend != "process":
+        raise ValueError(f"Unknown backend: {backend!r}")
+    shm_in, a = _shared_copy(img_np)
+    shm_out = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(out_shape)) * probe.itemsize))
+    try:
+        out = np.ndarray(out_shape, dtype=probe.dtype, buffer=shm_out.buf)
+        in_desc = (shm_in.name, a.shape, a.dtype.str)
+        out_desc = (shm_out.name, out_shape, probe.dtype.str)
+        pool = _pool("process", workers)
+        _collect([pool.submit(_process_band, fn, in_desc, out_desc, y0, y1, halo) for y0, y1 in work],
+                 progress)
+        return out.copy()
+    finally:
+        out = a = None  # views must go before the segments are closed
+        shm_in.close(); shm_in.unlink()
+        shm_out.close(); shm_out.unlink()
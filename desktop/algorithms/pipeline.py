@@ -0,0 +1,198 @@
+# algorithms/pipeline.py
+import json
+import numpy as np
+from PIL import Image
+from algorithms import registry, trace
+from algorithms.progress import check
+
+# A recipe of registry operations that is only evaluated when a result is
+# needed. Evaluation goes straight from the source array to the final one,
+# without PIL round trips in between, and consecutive point ops fold into one
+# lookup pass (apply_point_ops). Neighbourhood filters run one after the
+# other as they are: their integer 3x3 passes are cheaper than one combined
+# larger kernel, and give the same bytes as running the steps by hand.
+#
+# With a ResultCache, the longest already computed prefix of the recipe is
+# reused, so growing a recipe one step at a time only runs the new step.
+# Recipes are plain JSON and can be saved and replayed on other images.
+
+FORMAT = 1
+
+
+class Pipeline:
+
+    def __init__(self, steps=()):
+        self.steps = tuple((str(name).strip().lower(), dict(params)) for name, params in steps)
+        for name, _ in self.steps:
+            if name not in registry.names():
+                raise ValueError(f"Unknown operation: {name!r}")
+
+    def then(self, name: str, **params) -> "Pipeline":
+        # a new pipeline with one more step; pipelines are never changed in place
+        return Pipeline(self.steps + ((name, params),))
+
+    def __add__(self, other: "Pipeline") -> "Pipeline":
+        return Pipeline(self.steps + tuple(other.steps))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __eq__(self, other):
+        return isinstance(other, Pipeline) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Pipeline({self.describe()!r})"
+
+    def describe(self) -> str:
+        return " → ".join(name for name, _ in self.steps) or "(empty)"
+
+    # ---------- Planning ----------
+    def stages(self):
+        # ("point", [PointOp, ...], steps) for runs of point ops, ("op", name, params) otherwise
+        plan = []
+        for name, params in self.steps:
+            op = registry.point_op(name, **params)
+            if op is None:
+                plan.append(("op", name, params))
+            elif plan and plan[-1][0] == "point":
+                plan[-1][1].append(op)
+                plan[-1][2].append((name, params))
+            else:
+                plan.append(("point", [op], [(name, params)]))
+        return plan
+
+    # ---------- Evaluation ----------
+    def keys(self, src_key: str):
+        # cache key of the result after each step
+        from algorithms.cache import derive_key
+        keys, key = [], src_key
+        for name, params in self.steps:
+            key = derive_key(key, name, params)
+            keys.append(key)
+        return keys
+
+    def run(self, img_np, progress=None, cache=None, parallel: bool = False):
+
+        # Final result of all steps on img_np (an array, or a PIL image if the
+        # last step renders one). progress: cancel token checked between and
+        # inside the steps; parallel: neighbourhood ops run on row bands
+        # across all cores (algorithms.parallel).
+        if not self.steps:
+            return img_np
+        start, keys, key = 0, None, None
+        if cache is not None:
+            from algorithms.cache import content_key
+            key = content_key(np.asarray(img_np))
+            keys = self.keys(key)
+            for i in range(len(keys), 0, -1):
+                hit = cache.get(keys[i - 1])
+                if hit is not None:
+                    img_np, start, key = hit, i, keys[i - 1]
+                    break
+            if start == len(keys):
+                return img_np
+
+        rest = Pipeline(self.steps[start:])
+        with trace.span("pipeline", img_np, cat="pipeline", steps=rest.describe()) as rec:
+            out = rest._evaluate(img_np, progress, parallel, key)
+            rec["out"] = trace.shape_of(out)
+        if cache is not None:
+            cache.put(keys[-1], np.asarray(out))
+        return out
+
+    def _evaluate(self, img, progress, parallel, key=None):
+        # key: cache key of img if known, passed on so that per-source planes
+        # (gray, derivatives) do not hash each intermediate again
+        from algorithms.cache import derive_key, source_key
+        for kind, what, arg in self.stages():
+            check(progress)
+            if isinstance(img, Image.Image):
+                img = np.asarray(img)
+            with source_key(img, key):
+                img = self._stage(img, kind, what, arg, progress, parallel)
+            if key is not None:
+                for name, params in (arg if kind == "point" else [(what, arg)]):
+                    key = derive_key(key, name, params)
+        return img
+
+    @staticmethod
+    def _stage(img, kind, what, arg, progress, parallel):
+        if kind == "point":
+            return registry.with_impl(_run_point, *(name for name, _ in arg))(img, what, progress)
+        if parallel:
+            from algorithms.parallel import run_parallel
+            return run_parallel(what, img, progress=progress, **arg)
+        if progress is not None and registry.halo(what, **arg) is not None:
+            return registry.call(what, img, progress=progress, **arg)
+        return registry.call(what, img, **arg)
+
+    def preview(self, img_np: np.ndarray, max_w: int = 600, max_h: int = 600):
+
+        # Quick look at the result on a proxy sized for a max_w x max_h canvas,
+        # step by step with the parameters scaled to the proxy. A leading
+        # point op uses the full image's stats, as run_preview does. None if
+        # some step has no preview (histogram).
+        from algorithms.preview import make_proxy
+        from algorithms.tiling import point_tile_fn
+        if not all(registry.has_preview(name) for name, _ in self.steps):
+            return None
+        proxy, scale = make_proxy(img_np, max_w, max_h)
+        full_w = img_np.shape[1]
+        lead = []
+        for name, params in self.steps:
+            op = registry.point_op(name, **params)
+            if op is None:
+                break
+            lead.append(op)
+        if lead:
+            proxy = point_tile_fn(img_np, lead)(proxy)
+        for name, params in self.steps[len(lead):]:
+            p = registry.preview_params(name, scale, (max_w, max_h), **params)
+            if p is not None:
+                proxy = np.asarray(registry.call(name, proxy, **p))
+            if name == "resize":
+                full_w = params["new_w"]
+            scale = proxy.shape[1] / max(1, full_w)
+        return proxy
+
+    # ---------- Serialization ----------
+    def to_dict(self) -> dict:
+        return {"format": FORMAT, "steps": [{"op": name, "params": params} for name, params in self.steps]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Pipeline":
+        if data.get("format", FORMAT) > FORMAT:
+            raise ValueError(f"Recipe format {data['format']} is newer than this version ({FORMAT})")
+        steps = [(s["op"], s.get("params", {})) for s in data.get("steps", [])]
+        return cls(steps)
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Pipeline":
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str) -> "Pipeline":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_json(f.read())
+
+
+def _run_point(img, ops, progress):
+    from algorithms.point_ops import apply_point_ops
+    with trace.span("+".join(type(op).__name__.lower() for op in ops), img, cat="point_ops") as rec:
+        if progress is None:
+            img = apply_point_ops(img, ops)
+        else:
+            from algorithms.tiling import point_tile_fn
+            img = point_tile_fn(img, ops, progress=progress)(img)
+        rec["out"] = trace.shape_of(img)
+    return img
@@ -0,0 +1,214 @@
+# algorithms/point_ops.py
+from abc import ABC, abstractmethod
+import numpy as np
+from algorithms import jit
+from algorithms.histogram import channel_histograms
+from algorithms.color import luminance, gray_plane
+
+# Point operations map one uint8 value to one uint8 value, so every one of
+# them is a 256-entry lookup table. A chain of them folds into a single table
+# (lut2[lut1]) and costs one indexing pass over the pixels.
+
+_RAMP = np.arange(256, dtype=np.int32)
+
+# lookup scratch (intp indices) is bounded to this many pixels per chunk
+CHUNK_PIXELS = 1 << 16
+
+# gray of an already replicated (g, g, g) image, the float weights do not
+# always add back up to g exactly
+_STACKED_GRAY_LUT = luminance(np.stack([_RAMP, _RAMP, _RAMP], axis=1)[None, :, :].astype(np.uint8))[0]
+
+def _max_present(present: np.ndarray) -> int:
+    idx = np.flatnonzero(present)
+    return int(idx[-1]) if idx.size else 0
+
+def _l_minus_1(max_pixel: int) -> int:
+    if max_pixel <= 0:
+        return 255
+    return int((2 ** (np.ceil(np.log2(max_pixel)))) - 1)
+
+
+class PointOp(ABC):
+    # gray=True: color input is reduced to luminance first and the result is
+    # returned as a 3-channel gray image (Negative / Threshold behaviour)
+    gray = False
+    # needs_stats=True: the table depends on which values occur in the input
+    needs_stats = False
+
+    def lut(self, present: np.ndarray) -> np.ndarray:
+        # present: (256,) bool for a gray plane, (C, 256) for a color image;
+        # returns a uint8 table of the same shape
+        if present.ndim == 1:
+            return self._lut(present, color=False)
+        return np.stack([self._lut(p, color=True) for p in present])
+
+    @abstractmethod
+    def _lut(self, present: np.ndarray, color: bool) -> np.ndarray:
+        # table for one plane; color: present is one channel of a color image
+        ...
+
+
+class Negative(PointOp):
+    needs_stats = True
+
+    def __init__(self, force_gray: bool = True):
+        self.gray = bool(force_gray)
+
+    def _lut(self, present, color):
+        L_minus_1 = _l_minus_1(_max_present(present))
+        return ((L_minus_1 - _RAMP) & 0xFF).astype(np.uint8)
+
+
+class Threshold(PointOp):
+    gray = True
+
+    def __init__(self, t: int = 150):
+        self.t = int(t)
+
+    def _lut(self, present, color):
+        return np.where(_RAMP < self.t, 0, 255).astype(np.uint8)
+
+
+class Log(PointOp):
+    needs_stats = True
+
+    def _lut(self, present, color):
+        m = float(_max_present(present))
+        c = 255.0 / np.log1p(m if m > 0 else 255.0)
+        if color:
+            c = np.float32(c)  # per-channel constants are kept in float32
+        out = np.empty(256, dtype=np.uint8)
+        for v in range(256):
+            s = c * np.log1p(np.float32(v))
+            if s < 0: s = 0
+            elif s > 255: s = 255
+            out[v] = int(round(s))
+        return out
+
+
+class Gamma(PointOp):
+
+    def __init__(self, gamma: float = 2.2):
+        self.gamma = gamma if gamma > 0 else 1.0
+
+    def _lut(self, present, color):
+        inv = 1.0 / self.gamma
+        out = np.empty(256, dtype=np.uint8)
+        for v in range(256):
+            s = 255.0 * ((np.float32(v) / 255.0) ** inv)
+            if s < 0: s = 0
+            elif s > 255: s = 255
+            out[v] = int(round(s))
+        return out
+
+
+def _present(img_np: np.ndarray) -> np.ndarray:
+    return channel_histograms(img_np) > 0
+
+def _map_present(present: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    if present.ndim == 1:
+        out = np.zeros(256, dtype=bool)
+        out[lut[present]] = True
+        return out
+    return np.stack([_map_present(p, l) for p, l in zip(present, lut)])
+
+def _is_identity(lut: np.ndarray) -> bool:
+    return bool((lut == np.arange(256, dtype=np.uint8)).all())
+
+def _lookup(lut, img_np, out):
+    # lut[img] written into out a few rows at a time (np.take would widen
+    # the uint8 indices to intp for the whole image)
+    H = img_np.shape[0]
+    rows = max(1, CHUNK_PIXELS // max(1, img_np[:1].size))
+    for y0 in range(0, H, rows):
+        out[y0:y0 + rows] = lut[img_np[y0:y0 + rows]]
+    return out
+
+def apply_lut(img_np: np.ndarray, lut: np.ndarray, out=None) -> np.ndarray:
+    if img_np.dtype == np.uint8 and jit.enabled():
+        return jit.apply_lut(img_np, lut, out)
+    if lut.ndim == 1 or img_np.ndim == 2 or (lut == lut[0]).all():
+        lut = lut if lut.ndim == 1 else lut[0]
+        return lut[img_np] if out is None else _lookup(lut, img_np, out)
+    if out is None:
+        out = np.empty_like(img_np)
+    for ch in range(img_np.shape[2]):
+        _lookup(lut[ch], img_np[..., ch], out[..., ch])
+    return out
+
+def split_at_gray(ops, ndim: int):
+    # On a color image the first gray op mixes channels, so the chain is cut
+    # there: head runs per channel, tail runs on the luminance plane.
+    ops = list(ops)
+    if ndim == 3:
+        for k, op in enumerate(ops):
+            if op.gray:
+                return ops[:k], ops[k:]
+    return ops, []
+
+def chain_lut(ops, base_present, ndim: int):
+
+    # Folds ops into one table for an input with `ndim` dims; base_present()
+    # is only called if some op needs stats. Returns (lut, stacked) where
+    # stacked means the table yields a gray plane standing for (g, g, g).
+    stacked = False
+    lut = np.tile(np.arange(256, dtype=np.uint8), (3, 1)) if ndim == 3 \
+        else np.arange(256, dtype=np.uint8)
+    cached = []
+
+    def present():
+        if not cached:
+            cached.append(base_present())
+        return _map_present(cached[0], lut)
+
+    for op in ops:
+        if op.gray:
+            if ndim == 3:
+                raise ValueError("gray op on a color image, use split_at_gray() first")
+            if stacked:
+                lut = _STACKED_GRAY_LUT[lut]
+            op_lut = op.lut(present()) if op.needs_stats else op.lut(np.ones(256, dtype=bool))
+            lut = op_lut[lut]
+            stacked = True
+        elif stacked or (isinstance(op, Negative) and ndim == 2):
+            # per-channel op on a replicated gray image: all channels see the
+            # same values, so one color-semantics table covers them
+            p = present() if op.needs_stats else np.ones(256, dtype=bool)
+            lut = op.lut(np.stack([p, p, p]))[0][lut]
+            stacked = True
+        else:
+            p = present() if op.needs_stats else np.ones(lut.shape, dtype=bool)
+            op_lut = op.lut(p)
+            if lut.ndim == 1:
+                lut = op_lut[lut]
+            else:
+                lut = np.stack([op_lut[ch][lut[ch]] for ch in range(lut.shape[0])])
+    return lut, stacked
+
+def apply_point_ops(img_np: np.ndarray, ops, out=None) -> np.ndarray:
+
+    # Runs ops in order with the same result as calling them one by one, but
+    # folds everything into one table. Only a gray op on a real color image
+    # forces an intermediate pass (the luminance step mixes channels).
+    base = np.asarray(img_np)
+    if base.dtype != np.uint8:
+        base = base.astype(np.uint8)
+    head, tail = split_at_gray(ops, base.ndim)
+
+    lut, stacked = chain_lut(head, lambda: _present(base), base.ndim)
+    if tail:
+        # a gray op first: the cached luminance of the source is used as is
+        base = gray_plane(base) if _is_identity(lut) else luminance(apply_lut(base, lut))
+        lut, stacked = chain_lut(tail, lambda: _present(base), 2)
+
+    if not stacked:
+        return apply_lut(base, lut, out)
+    # the gray plane is written straight into each channel of the result
+    if out is None:
+        out = np.empty(base.shape[:2] + (3,), dtype=np.uint8)
+    rows = max(1, CHUNK_PIXELS // max(1, base[:1].size))
+    for y0 in range(0, base.shape[0], rows):
+        g = lut[base[y0:y0 + rows]]
+        for ch in range(3):
+            out[y0:y0 + rows, :, ch] = g
+    return out
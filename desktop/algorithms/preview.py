@@ -0,0 +1,50 @@
+# algorithms/preview.py
+import numpy as np
+from PIL import Image
+from algorithms import registry
+
+PREVIEW_MAX = (600, 600)
+
+def _fit_size(W: int, H: int, max_w: int, max_h: int):
+    scale = min(max_w / W, max_h / H, 1.0)
+    return max(1, int(W * scale)), max(1, int(H * scale)), scale
+
+def _shrink(pil: Image.Image, tw: int, th: int) -> Image.Image:
+    # integer box reduce first (fast), then one LANCZOS step to the exact size
+    factor = min(pil.width // tw, pil.height // th) // 2
+    if factor >= 2:
+        pil = pil.reduce(factor)
+    return pil.resize((tw, th), Image.LANCZOS)
+
+def fit_image(pil_img: Image.Image, max_w: int, max_h: int) -> Image.Image:
+    # PIL image scaled down (never up) to fit max_w x max_h, for display
+    tw, th, scale = _fit_size(pil_img.width, pil_img.height, max_w, max_h)
+    if scale >= 1.0:
+        return pil_img
+    return _shrink(pil_img, tw, th)
+
+def make_proxy(img_np: np.ndarray, max_w: int = PREVIEW_MAX[0], max_h: int = PREVIEW_MAX[1]):
+    # downscaled copy that fits max_w x max_h. Returns (proxy, scale).
+    H, W = img_np.shape[0], img_np.shape[1]
+    tw, th, scale = _fit_size(W, H, max_w, max_h)
+    if scale >= 1.0:
+        return img_np, 1.0
+    pil = _shrink(Image.fromarray(np.ascontiguousarray(img_np)), tw, th)
+    return np.asarray(pil), tw / W
+
+def run_preview(name: str, img_np: np.ndarray, max_w: int = PREVIEW_MAX[0],
+                max_h: int = PREVIEW_MAX[1], **params):
+
+    # Quick look at registry.call(name, img_np, **params) on a proxy sized for
+    # the preview canvas. Point ops use tables from the full image's stats so
+    # the preview has the same tones as the final result.
+    proxy, scale = make_proxy(img_np, max_w, max_h)
+    op = registry.point_op(name, **params)
+    if op is not None:
+        from algorithms.tiling import point_tile_fn
+        return point_tile_fn(img_np, [op])(proxy)
+
+    proxy_params = registry.preview_params(name, scale, (max_w, max_h), **params)
+    if proxy_params is None:
+        return proxy
+    return registry.call(name, proxy, **proxy_params)
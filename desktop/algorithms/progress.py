@@ -0,0 +1,58 @@
+# algorithms/progress.py
+import threading
+import time
+
+class Cancelled(Exception):
+    pass
+
+
+class Progress:
+    # Progress / cancel token. Long operations call start(total) once, then
+    # advance() after each row band or tile and check() between them; the UI
+    # reads fraction / eta() and calls cancel() from its own thread.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self.total = 0
+        self.done = 0
+        self.t0 = None
+
+    def start(self, total: int):
+        with self._lock:
+            self.total += max(0, int(total))
+            if self.t0 is None:
+                self.t0 = time.perf_counter()
+
+    def advance(self, n: int = 1):
+        with self._lock:
+            self.done += n
+        self.check()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    @property
+    def fraction(self) -> float:
+        with self._lock:
+            return min(1.0, self.done / self.total) if self.total else 0.0
+
+    def eta(self):
+        # seconds left, None until there is something to extrapolate from
+        f = self.fraction
+        if self.t0 is None or f <= 0:
+            return None
+        elapsed = time.perf_counter() - self.t0
+        return elapsed * (1 - f) / f
+
+def check(progress):
+    if progress is not None:
+        progress.check()
@@ -0,0 +1,439 @@
+# algorithms/reference.py
+import math
+import numpy as np
+from algorithms.progress import check
+
+# The "reference" implementation of every registered operation: the
+# per-pixel loops the algorithms were first written as (the same code, with
+# progress and out added), plus loops of the same kind for what was added
+# later (box mean, Gaussian, bilinear / area / pyramid resize). Too slow for
+# real images; they are the ground truth the numpy and numba implementations
+# are checked against (tools/check_implementations.py). Same signatures as
+# the functions in registry._OPS.
+
+def _rows(n, progress):
+    # range(n), reporting every row and checking the cancel token
+    if progress is not None:
+        progress.start(n)
+    for i in range(n):
+        check(progress)
+        yield i
+        if progress is not None:
+            progress.advance()
+
+def _into(res, out):
+    if out is None:
+        return res
+    out[...] = res
+    return out
+
+def _clip_u8(x):
+    x = np.clip(x, 0, 255)
+    return x.astype(np.uint8)
+
+def _channels(img_np):
+    # (H, W) -> [plane], (H, W, C) -> [plane per channel]
+    if img_np.ndim == 2:
+        return [img_np]
+    return [img_np[:, :, ch] for ch in range(img_np.shape[2])]
+
+def _stack(planes, like):
+    return planes[0] if like.ndim == 2 else np.stack(planes, axis=2)
+
+def _to_grayscale_manual(rgb: np.ndarray) -> np.ndarray:
+    r, g, b = rgb[:, :, 0], rgb[:, :, 1], rgb[:, :, 2]
+    return (0.299 * r + 0.587 * g + 0.114 * b).astype(np.uint8)
+
+def _l_minus_1(max_pixel: int) -> int:
+    if max_pixel <= 0:
+        return 255
+    return int((2 ** (np.ceil(np.log2(max_pixel)))) - 1)
+
+# ---------- Point operations ----------
+def image_negative_exact(img_np: np.ndarray, force_gray: bool = True, progress=None,
+                         out=None) -> np.ndarray:
+
+    if force_gray:
+        img_gray = _to_grayscale_manual(img_np) if img_np.ndim == 3 else img_np.copy()
+        L_minus_1 = _l_minus_1(int(np.max(img_gray)))
+        h, w = img_gray.shape
+        neg = img_gray.copy()
+        for i in _rows(h, progress):
+            for j in range(w):
+                neg[i, j] = (L_minus_1 - int(img_gray[i, j])) & 0xFF
+        return _into(np.stack([neg, neg, neg], axis=2), out)
+
+    a = img_np if img_np.ndim == 3 else np.stack([img_np, img_np, img_np], axis=2)
+    h, w, c = a.shape
+    res = np.zeros_like(a, dtype=np.uint8)
+    for ch in range(c):
+        L_minus_1 = _l_minus_1(int(np.max(a[:, :, ch])))
+        for i in _rows(h, progress):
+            for j in range(w):
+                res[i, j, ch] = (L_minus_1 - int(a[i, j, ch])) & 0xFF
+    return _into(res, out)
+
+def threshold_loop(img_np: np.ndarray, t: int = 150, progress=None, out=None) -> np.ndarray:
+
+    gray = _to_grayscale_manual(img_np) if img_np.ndim == 3 else img_np.astype(np.uint8)
+    h, w = gray.shape
+    res = gray.copy()
+    for i in _rows(h, progress):
+        for j in range(w):
+            res[i, j] = 0 if res[i, j] < t else 255
+    # replicate to RGB for the GUI
+    return _into(np.stack([res, res, res], axis=2), out)
+
+def log_transform_manual(img_np: np.ndarray, progress=None, out=None) -> np.ndarray:
+
+    if img_np.ndim == 2:
+        src = img_np.astype(np.float32)
+        max_v = float(src.max()) if src.size else 255.0
+        c = 255.0 / np.log1p(max_v if max_v > 0 else 255.0)
+        H, W = src.shape
+        res = np.empty((H, W), dtype=np.uint8)
+        for i in _rows(H, progress):
+            for j in range(W):
+                s = c * np.log1p(src[i, j])
+                if s < 0: s = 0
+                elif s > 255: s = 255
+                res[i, j] = int(round(s))
+        return _into(res, out)
+
+    a = img_np.astype(np.float32)
+    H, W, C = a.shape
+    res = np.empty((H, W, C), dtype=np.uint8)
+    maxs = a.reshape(-1, C).max(axis=0)
+    cs = np.empty(C, dtype=np.float32)
+    for ch in range(C):
+        m = float(maxs[ch]) if maxs[ch] > 0 else 255.0
+        cs[ch] = 255.0 / np.log1p(m)
+    for ch in range(C):
+        for i in _rows(H, progress):
+            for j in range(W):
+                s = cs[ch] * np.log1p(a[i, j, ch])
+                if s < 0: s = 0
+                elif s > 255: s = 255
+                res[i, j, ch] = int(round(s))
+    return _into(res, out)
+
+def gamma_transform_manual(img_np: np.ndarray, gamma: float = 2.2, progress=None,
+                           out=None) -> np.ndarray:
+
+    if gamma <= 0:
+        gamma = 1.0
+    inv = 1.0 / gamma
+    a = img_np.astype(np.float32)
+    res = np.empty(a.shape, dtype=np.uint8)
+    for plane, dst in zip(_channels(a), _channels(res)):
+        H, W = plane.shape
+        for i in _rows(H, progress):
+            for j in range(W):
+                s = 255.0 * ((plane[i, j] / 255.0) ** inv)
+                if s < 0: s = 0
+                elif s > 255: s = 255
+                dst[i, j] = int(round(s))
+    return _into(res, out)
+
+# ---------- 3x3 kernels ----------
+def _conv3x3_channel(ch_img: np.ndarray, K: np.ndarray, progress=None) -> np.ndarray:
+    # int32 sums for integer kernels; float kernels sum in float64 and are
+    # truncated by int()
+    H, W = ch_img.shape
+    padded = np.pad(ch_img.astype(np.int32), 1, mode="constant", constant_values=0)
+    res = np.empty((H, W), dtype=np.int32)
+    for i in _rows(H, progress):
+        for j in range(W):
+            region = padded[i:i + 3, j:j + 3]
+            res[i, j] = int(np.sum(region * K))
+    return res
+
+def _apply_kernel_int32(img_np: np.ndarray, K: np.ndarray, progress=None) -> np.ndarray:
+    return _stack([_conv3x3_channel(p, K, progress) for p in _channels(img_np)], img_np)
+
+SOBEL_X = np.array([[-1, 0, 1],
+                    [-2, 0, 2],
+                    [-1, 0, 1]], dtype=np.int32)
+
+SOBEL_Y = np.array([[-1, -2, -1],
+                    [ 0,  0,  0],
+                    [ 1,  2,  1]], dtype=np.int32)
+
+LAPLACIAN_4 = np.array([[0,  1, 0],
+                        [1, -4, 1],
+                        [0,  1, 0]], dtype=np.int32)
+
+def laplacian_manual(img_np: np.ndarray, progress=None, out=None) -> np.ndarray:
+
+    lap = _apply_kernel_int32(img_np.astype(np.int32), LAPLACIAN_4, progress)
+    return _into(_clip_u8(lap), out)
+
+_STRENGTH_ALPHA = {
+    "low": 0.5,
+    "medium": 1.0,
+    "high": 1.5,
+}
+
+def sharpen_image(img_np: np.ndarray, kind: str = "first", strength: str = "medium",
+                  progress=None, out=None) -> np.ndarray:
+
+    kind = (kind or "first").strip().lower()
+    strength = (strength or "medium").strip().lower()
+    alpha = _STRENGTH_ALPHA.get(strength, 1.0)
+    a = img_np.astype(np.int32)
+
+    if kind == "first":
+        gx = _apply_kernel_int32(a, SOBEL_X, progress)
+        gy = _apply_kernel_int32(a, SOBEL_Y, progress)
+        edge = np.abs(gx).astype(np.int32) + np.abs(gy).astype(np.int32)  # simple L1 magnitude
+        sharpened = a + (alpha * edge)
+    else:
+        if kind != "second":
+            alpha = 1.0
+        lap = _apply_kernel_int32(a, LAPLACIAN_4, progress)
+        sharpened = a - (alpha * lap)
+    return _into(_clip_u8(sharpened), out)
+
+# ---------- Smoothing ----------
+_STRENGTH_TO_PASSES = {
+    "low": 1,
+    "medium": 2,
+    "high": 3,
+}
+
+def _box_channel(plane, r, progress):
+    # floor of the (2r+1)^2 window sum over the window size, zero padding
+    H, W = plane.shape
+    n = (2 * r + 1) ** 2
+    padded = np.pad(plane.astype(np.int64), r, mode="constant", constant_values=0)
+    res = np.empty((H, W), dtype=np.uint8)
+    for i in _rows(H, progress):
+        for j in range(W):
+            res[i, j] = int(padded[i:i + 2 * r + 1, j:j + 2 * r + 1].sum()) // n
+    return res
+
+def _fir_line(line, taps):
+    # float32 correlation of one row / column with symmetric taps, zero
+    # padding; the mirrored pair of taps is added first, then weighted
+    r, n = len(taps) // 2, len(line)
+    p = np.concatenate([np.zeros(r, np.float32), line, np.zeros(r, np.float32)])
+    res = np.empty(n, dtype=np.float32)
+    for x in range(n):
+        acc = p[x + r] * taps[r]
+        for i in range(r):
+            acc += (p[x + i] + p[x + 2 * r - i]) * taps[i]
+        res[x] = acc
+    return res
+
+def _iir_line(line, coeffs, M):
+    # Young & van Vliet recursive Gaussian along one row / column, float32:
+    # forward, then backward from start values for a signal that is zero
+    # past the end (see smoothing._yvv_tail)
+    B, a1, a2, a3 = coeffs
+    N = len(line)
+    w = np.empty(N, dtype=np.float32)
+    for n in range(N):
+        acc = line[n] * B
+        for coef, k in ((a1, 1), (a2, 2), (a3, 3)):
+            if n - k >= 0:
+                acc += w[n - k] * coef
+        w[n] = acc
+    last = [float(w[N - 1 - k]) if N - 1 - k >= 0 else 0.0 for k in range(3)]
+    tail = [np.float32(sum(float(M[i, j]) * last[j] for j in range(3))) for i in range(3)]
+    y = np.empty(N, dtype=np.float32)
+    for n in range(N - 1, -1, -1):
+        acc = w[n] * B
+        for coef, k in ((a1, 1), (a2, 2), (a3, 3)):
+            acc += (y[n + k] if n + k < N else tail[n + k - N]) * coef
+        y[n] = acc
+    return y
+
+def _gaussian_channel(plane, sigma, progress):
+    # along columns, then along rows, then rounded to uint8
+    from algorithms.smoothing import IIR_MIN_SIGMA, _gaussian_taps, _yvv_coeffs, _yvv_tail
+    if sigma < IIR_MIN_SIGMA:
+        taps = _gaussian_taps(sigma)
+        line = lambda v: _fir_line(v, taps)
+    else:
+        coeffs, M = _yvv_coeffs(sigma), _yvv_tail(sigma)
+        line = lambda v: _iir_line(v, coeffs, M)
+    a = plane.astype(np.float32)
+    H, W = a.shape
+    for j in range(W):
+        a[:, j] = line(a[:, j])
+    res = np.empty((H, W), dtype=np.uint8)
+    for i in _rows(H, progress):
+        row = line(a[i])
+        for j in range(W):
+            v = np.rint(row[j])
+            res[i, j] = 0 if v < 0 else 255 if v > 255 else int(v)
+    return res
+
+def mean_kernel() -> np.ndarray:
+    return (np.ones((3, 3), dtype=np.float32) / 9.0)
+
+def weighted_kernel() -> np.ndarray:
+    return (np.array([[1, 2, 1],
+                      [2, 4, 2],
+                      [1, 2, 1]], dtype=np.float32) / 16.0)
+
+def smooth_image(img_np: np.ndarray, mode: str = "mean", strength: str = "medium",
+                 radius: int = None, sigma: float = None, progress=None, out=None) -> np.ndarray:
+
+    mode = (mode or "mean").strip().lower()
+    if radius is not None and mode != "mean":
+        raise ValueError("radius applies to mode='mean' only")
+    if sigma is not None and mode != "gaussian":
+        raise ValueError("sigma applies to mode='gaussian' only")
+    if radius is not None:
+        r = int(radius)
+        res = [_box_channel(p, r, progress) if r else p.astype(np.uint8) for p in _channels(img_np)]
+        return _into(_stack(res, img_np), out)
+    if sigma is not None:
+        assert float(sigma) > 0, "sigma must be > 0"
+        res = [_gaussian_channel(p, float(sigma), progress) for p in _channels(img_np)]
+        return _into(_stack(res, img_np), out)
+
+    strength = (strength or "medium").strip().lower()
+    passes = _STRENGTH_TO_PASSES.get(strength, 2)
+    K = weighted_kernel() if mode in ("weighted", "gaussian") else mean_kernel()
+    res = img_np.copy()
+    for _ in range(max(1, passes)):
+        res = _stack([_clip_u8(_conv3x3_channel(p, K, progress)) for p in _channels(res)], res)
+    return _into(res, out)
+
+# ---------- Histogram ----------
+def compute_histogram_manual(img_np: np.ndarray, progress=None):
+
+    if img_np.ndim == 2:
+        H, W = img_np.shape
+        hist = np.zeros(256, dtype=np.int64)
+        for i in _rows(H, progress):
+            for j in range(W):
+                hist[int(img_np[i, j])] += 1
+        return {"mode": "gray", "gray": hist}
+
+    H, W, C = img_np.shape
+    assert C == 3, "Only 3-channel color supported"
+    r_hist = np.zeros(256, dtype=np.int64)
+    g_hist = np.zeros(256, dtype=np.int64)
+    b_hist = np.zeros(256, dtype=np.int64)
+    for i in _rows(H, progress):
+        for j in range(W):
+            r_hist[int(img_np[i, j, 0])] += 1
+            g_hist[int(img_np[i, j, 1])] += 1
+            b_hist[int(img_np[i, j, 2])] += 1
+    return {"mode": "color", "r": r_hist, "g": g_hist, "b": b_hist}
+
+def render_histogram_image(img_np: np.ndarray, figsize=(8, 5), use_matplotlib: bool = False,
+                           progress=None):
+
+    # counted here, drawn by the same chart code as the other implementations
+    from algorithms.histogram import render_chart
+    return render_chart(compute_histogram_manual(img_np, progress), figsize, use_matplotlib)
+
+# ---------- Resize ----------
+def _linear_taps(i, src_len, dst_len):
+    # two (index, float32 weight) pairs, pixel-center aligned
+    pos = (i + 0.5) * src_len / dst_len - 0.5
+    pos = min(max(pos, 0.0), src_len - 1.0)
+    i0 = math.floor(pos)
+    w1 = np.float32(pos - i0)
+    return [(i0, np.float32(1) - w1), (min(i0 + 1, src_len - 1), w1)]
+
+def _area_taps(i, src_len, dst_len):
+    # (index, float32 weight) covering [i*r, (i+1)*r) with r = src/dst
+    r = src_len / dst_len
+    start = i * r
+    end = start + r
+    first = math.floor(start)
+    taps = []
+    for k in range(math.ceil(r) + 1):
+        idx = first + k
+        w = max(min(idx + 1, end) - max(idx, start), 0.0) / r
+        taps.append((min(idx, src_len - 1), np.float32(w)))
+    return taps
+
+def _weighted_resize(a, new_w, new_h, taps_for, progress):
+    # float32 sums over rows first, then over columns, rounded half to even
+    H, W, C = a.shape
+    rows = np.empty((new_h, W, C), dtype=np.float32)
+    for y in range(new_h):
+        ty = taps_for(y, H, new_h)
+        for x in range(W):
+            for c in range(C):
+                acc = np.float32(a[ty[0][0], x, c]) * ty[0][1]
+                for iy, wy in ty[1:]:
+                    acc += np.float32(a[iy, x, c]) * wy
+                rows[y, x, c] = acc
+    res = np.empty((new_h, new_w, C), dtype=np.uint8)
+    tx = [taps_for(x, W, new_w) for x in range(new_w)]
+    for y in _rows(new_h, progress):
+        for x in range(new_w):
+            for c in range(C):
+                acc = rows[y, tx[x][0][0], c] * tx[x][0][1]
+                for ix, wx in tx[x][1:]:
+                    acc += rows[y, ix, c] * wx
+                v = np.rint(acc)
+                res[y, x, c] = 0 if v < 0 else 255 if v > 255 else int(v)
+    return res
+
+def _area(a, new_w, new_h, progress):
+    H, W, C = a.shape
+    if H % new_h or W % new_w:
+        return _weighted_resize(a, new_w, new_h, _area_taps, progress)
+    # whole blocks: the plain mean of each block
+    fy, fx = H // new_h, W // new_w
+    res = np.empty((new_h, new_w, C), dtype=np.uint8)
+    for y in _rows(new_h, progress):
+        for x in range(new_w):
+            for c in range(C):
+                s = int(a[y * fy:(y + 1) * fy, x * fx:(x + 1) * fx, c].astype(np.int64).sum())
+                v = np.rint(np.float32(s) / np.float32(fy * fx))
+                res[y, x, c] = 0 if v < 0 else 255 if v > 255 else int(v)
+    return res
+
+def _half(a):
+    # 2x2 box average rounded up at .5, odd edges replicated
+    H, W, C = a.shape
+    h, w = (H + 1) // 2, (W + 1) // 2
+    res = np.empty((h, w, C), dtype=np.uint8)
+    for y in range(h):
+        for x in range(w):
+            ys, xs = (2 * y, min(2 * y + 1, H - 1)), (2 * x, min(2 * x + 1, W - 1))
+            for c in range(C):
+                s = sum(int(a[i, j, c]) for i in ys for j in xs)
+                res[y, x, c] = (s + 2) >> 2
+    return res
+
+def resize_image(img_np: np.ndarray, new_w: int, new_h: int, mode: str = "nearest",
+                 progress=None) -> np.ndarray:
+
+    assert new_w >= 1 and new_h >= 1, "new size must be >= 1"
+    new_w, new_h = int(new_w), int(new_h)
+    mode = (mode or "nearest").strip().lower()
+    a = img_np.astype(np.uint8)
+    a = a if a.ndim == 3 else a[:, :, None]
+    H, W, C = a.shape
+
+    if mode == "nearest":
+        res = np.empty((new_h, new_w, C), dtype=np.uint8)
+        for y in _rows(new_h, progress):
+            src_y = int(y * H / new_h)
+            if src_y >= H: src_y = H - 1
+            for x in range(new_w):
+                src_x = int(x * W / new_w)
+                if src_x >= W: src_x = W - 1
+                res[y, x, :] = a[src_y, src_x, :]
+    elif mode == "bilinear":
+        res = _weighted_resize(a, new_w, new_h, _linear_taps, progress)
+    elif mode == "area":
+        res = _area(a, new_w, new_h, progress)
+    elif mode == "pyramid":
+        while a.shape[0] >= 2 * new_h and a.shape[1] >= 2 * new_w:
+            check(progress)
+            a = _half(a)
+        res = a if a.shape[:2] == (new_h, new_w) else _area(a, new_w, new_h, progress)
+    else:
+        raise ValueError(f"Unknown resize mode: {mode!r}")
+    return res if img_np.ndim == 3 else res[:, :, 0]
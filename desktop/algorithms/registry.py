@@ -0,0 +1,214 @@
+# algorithms/registry.py
+import os
+import warnings
+import importlib
+from algorithms import jit, trace
+
+# Operation name -> (module, function). Modules are imported the first time an
+# operation is used, so starting the app does not pay for all of them. The
+# freezer cannot see these imports: the Windows build passes every module in
+# algorithms/ as a hidden import.
+_OPS = {
+    "negative":  ("algorithms.negative",   "image_negative_exact"),
+    "threshold": ("algorithms.threshold",  "threshold_loop"),
+    "smooth":    ("algorithms.smoothing",  "smooth_image"),
+    "sharpen":   ("algorithms.sharpening", "sharpen_image"),
+    "laplacian": ("algorithms.edges",      "laplacian_manual"),
+    "histogram": ("algorithms.histogram",  "render_histogram_image"),
+    "log":       ("algorithms.log_gamma",  "log_transform_manual"),
+    "gamma":     ("algorithms.log_gamma",  "gamma_transform_manual"),
+    "resize":    ("algorithms.resize",     "resize_image"),
+}
+
+# Point operations also exist as lookup-table ops (algorithms.point_ops);
+# the parameter names match the functions above.
+_POINT_OPS = {
+    "negative":  "Negative",
+    "threshold": "Threshold",
+    "log":       "Log",
+    "gamma":     "Gamma",
+}
+
+# Neighborhood operations: function giving the halo (in pixels) a tile needs
+# so that its interior matches the untiled result.
+_HALOS = {
+    "smooth":    ("algorithms.smoothing",  "smooth_halo"),
+    "sharpen":   ("algorithms.sharpening", "sharpen_halo"),
+    "laplacian": ("algorithms.edges",      "laplacian_halo"),
+}
+# For operations that reach the whole image (no exact halo): a halo after which
+# each tile is within one level of the untiled result. Tiled and banded runs
+# accept that (halo(..., approx=True)); parallel runs stay exact.
+_APPROX_HALOS = {
+    "smooth":    ("algorithms.smoothing",  "smooth_approx_halo"),
+}
+
+# Operations that blend the image with derivative planes: function giving
+# {kind: plane} for the whole image. Band and tile runs fetch these once
+# (cached per source) and every block uses its part of them.
+_PLANES = {
+    "sharpen":   ("algorithms.sharpening", "sharpen_planes"),
+    "laplacian": ("algorithms.edges",      "laplacian_planes"),
+}
+
+# How an operation's parameters change when it runs on a downscaled preview
+# proxy (scale < 1). Missing entries keep their parameters as they are.
+_PREVIEWS = {
+    "smooth": ("algorithms.smoothing", "smooth_preview_params"),
+    "resize": ("algorithms.resize",    "resize_preview_params"),
+}
+# Results that do not make sense on a proxy (the chart is already small)
+_NO_PREVIEW = {"histogram"}
+
+# Implementations of every operation, fastest first. "numpy" is the table
+# above; "numba" is the same code with the compiled loop kernels of
+# algorithms.jit, for the operations that have them; "reference" is the
+# original per-pixel loops (algorithms.reference), far too slow for real
+# images and never picked on its own: it is what tools/check_implementations.py
+# compares the others with, byte for byte. The fastest one available is used
+# unless IMAGE_TOOLKIT_IMPL (or use()) asks for another, for every operation
+# ("numpy") or some of them ("resize=reference,smooth=reference").
+IMPLEMENTATIONS = ("numba", "numpy", "reference")
+_JIT_OPS = {"negative", "threshold", "log", "gamma", "histogram", "resize"}
+_REFERENCE = "algorithms.reference"
+
+_loaded = {}
+_chosen = {"spec": "", "impl": {}}
+
+def names():
+    return list(_OPS)
+
+def _spec(name: str):
+    try:
+        return _OPS[name]
+    except KeyError:
+        raise KeyError(f"Unknown operation: {name!r}") from None
+
+def parse_impl(spec: str) -> dict:
+    # "numpy,resize=reference" -> {None: "numpy", "resize": "reference"}
+    chosen = {}
+    for item in filter(None, (a.strip() for a in (spec or "").split(","))):
+        name, _, impl = item.rpartition("=")
+        name, impl = name.strip().lower() or None, impl.strip().lower()
+        if impl not in IMPLEMENTATIONS:
+            raise ValueError(f"Unknown implementation {impl!r} (choose from {', '.join(IMPLEMENTATIONS)})")
+        if name is not None and name not in _OPS:
+            raise ValueError(f"Unknown operation {name!r} in {spec!r}")
+        chosen[name] = impl
+    return chosen
+
+def use(spec: str = None):
+    # Overrides the automatic choice, e.g. use("numpy") or
+    # use("smooth=reference"); None goes back to it. Kept in the environment,
+    # so worker processes started afterwards make the same choice.
+    if spec:
+        parse_impl(spec)
+        os.environ["IMAGE_TOOLKIT_IMPL"] = spec
+    else:
+        os.environ.pop("IMAGE_TOOLKIT_IMPL", None)
+
+def current_spec() -> str:
+    # the choice in force, as use() takes it ("" for the automatic one)
+    return os.environ.get("IMAGE_TOOLKIT_IMPL", "")
+
+def _asked(name: str):
+    asked = current_spec()
+    if asked != _chosen["spec"]:
+        try:
+            impl = parse_impl(asked)
+        except ValueError as e:
+            warnings.warn(f"IMAGE_TOOLKIT_IMPL ignored: {e}")
+            impl = {}
+        _chosen["spec"], _chosen["impl"] = asked, impl
+    impl = _chosen["impl"]
+    return impl.get(name, impl.get(None))
+
+def implementations(name: str):
+    # the implementations of `name` usable here, fastest first
+    _spec(name)
+    have = ["numba"] if name in _JIT_OPS and jit.available() else []
+    return have + ["numpy", "reference"]
+
+def implementation(name: str) -> str:
+    # the one get(name) uses: the one asked for if `name` has it here,
+    # otherwise the fastest
+    have = implementations(name)
+    impl = _asked(name)
+    return impl if impl in have else have[0]
+
+def get(name: str, impl: str = None):
+    impl = impl or implementation(name)
+    fn = _loaded.get((name, impl))
+    if fn is None:
+        module, attr = _spec(name)
+        if impl not in implementations(name):
+            raise ValueError(f"{name} has no {impl!r} implementation here "
+                             f"(choose from {', '.join(implementations(name))})")
+        fn = getattr(importlib.import_module(_REFERENCE if impl == "reference" else module), attr)
+        if impl == "numpy" and name in _JIT_OPS and jit.available():
+            fn = jit.WithoutJit(fn)
+        _loaded[(name, impl)] = fn
+    return fn
+
+def with_impl(fn, *op_names):
+    # fn (a point-op chain or band of these operations) with the compiled
+    # kernels switched off unless all of them run on "numba"
+    if any(name in _JIT_OPS and implementation(name) == "numpy" for name in op_names) \
+            and jit.available():
+        return jit.WithoutJit(fn)
+    return fn
+
+def point_op(name: str, **params):
+    # lookup-table form of a point operation, None for anything else (and
+    # for the reference loops, which are only ever called as they are)
+    cls = _POINT_OPS.get(name)
+    if cls is None or _asked(name) == "reference":
+        return None
+    return getattr(importlib.import_module("algorithms.point_ops"), cls)(**params)
+
+def halo(name: str, approx: bool = False, **params):
+    # pixels of context a neighborhood op needs, 0 for point ops, None if the
+    # operation cannot be split into tiles (histogram, resize, and point ops
+    # on the reference loops: their stats come from the whole image).
+    # approx: fall back to _APPROX_HALOS where there is no exact halo.
+    if name in _POINT_OPS:
+        return None if _asked(name) == "reference" else 0
+    for table in (_HALOS, _APPROX_HALOS) if approx else (_HALOS,):
+        spec = table.get(name)
+        if spec is None:
+            continue
+        module, attr = spec
+        h = getattr(importlib.import_module(module), attr)(**params)
+        if h is not None:
+            return int(h)
+    return None
+
+def planes(name: str, img_np, **params):
+    # whole-image planes the bands of name(img_np, **params) can share, None
+    # if there are none (or the reference loops, which make their own)
+    op = point_op(name, **params)
+    if op is not None:
+        from algorithms.point_ops import split_at_gray
+        head, tail = split_at_gray([op], img_np.ndim)
+        return importlib.import_module("algorithms.color").gray_planes(img_np) if tail and not head else None
+    spec = _PLANES.get(name)
+    if spec is None or _asked(name) == "reference":
+        return None
+    module, attr = spec
+    return getattr(importlib.import_module(module), attr)(img_np, **params)
+
+def has_preview(name: str) -> bool:
+    return name in _OPS and name not in _NO_PREVIEW
+
+def preview_params(name: str, scale: float, box=(600, 600), **params):
+    # parameters for running `name` on a proxy scaled by `scale` that is shown
+    # in a box of box=(w, h); None means the effect is invisible at that scale
+    # and the proxy is shown unchanged
+    spec = _PREVIEWS.get(name)
+    if spec is None:
+        return dict(params)
+    module, attr = spec
+    return getattr(importlib.import_module(module), attr)(scale, box, **params)
+
+def call(name: str, img_np, **params):
+    return trace.traced_call(name, get(name), img_np, **params)
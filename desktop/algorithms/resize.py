@@ -1,35 +1,170 @@
 # algorithms/resize.py
+import functools
 import numpy as np
+from algorithms import jit
 
-def resize_nearest_manual(img_np: np.ndarray, new_w: int, new_h: int) -> np.ndarray:
-    
-    assert new_w >= 1 and new_h >= 1, "new size must be >= 1"
+MODES = ("nearest", "bilinear", "area", "pyramid")
+_BAND_ROWS = 256
+
+# Index maps and weights depend only on (source length, target length) per
+# axis, so they are computed once and shared by every resize with that shape.
+
+def _readonly(*arrays):
+    for a in arrays:
+        a.flags.writeable = False
+    return arrays if len(arrays) > 1 else arrays[0]
+
+@functools.lru_cache(maxsize=128)
+def _nearest_index(src_len: int, dst_len: int) -> np.ndarray:
+    # same as int(y * H / new_h) clamped to H - 1
+    idx = np.floor(np.arange(dst_len, dtype=np.int64) * src_len / dst_len).astype(np.intp)
+    np.minimum(idx, src_len - 1, out=idx)
+    return _readonly(idx)
 
-    if img_np.ndim == 2:
-        src = img_np.astype(np.uint8)
-        H, W = src.shape
-        out = np.empty((new_h, new_w), dtype=np.uint8)
+@functools.lru_cache(maxsize=128)
+def _linear_weights(src_len: int, dst_len: int):
+    # pixel-center aligned sample positions
+    pos = (np.arange(dst_len, dtype=np.float64) + 0.5) * src_len / dst_len - 0.5
+    np.clip(pos, 0, src_len - 1, out=pos)
+    i0 = np.floor(pos).astype(np.intp)
+    i1 = np.minimum(i0 + 1, src_len - 1)
+    w1 = (pos - i0).astype(np.float32)
+    return _readonly(i0, i1, w1)
 
-        for y in range(new_h):
-            src_y = int(y * H / new_h)
-            if src_y >= H: src_y = H - 1
-            for x in range(new_w):
-                src_x = int(x * W / new_w)
-                if src_x >= W: src_x = W - 1
-                out[y, x] = src[src_y, src_x]
+@functools.lru_cache(maxsize=128)
+def _area_weights(src_len: int, dst_len: int):
+    # output i averages source interval [i*r, (i+1)*r) with r = src/dst;
+    # returned as (dst_len, k) source indices and weights summing to 1
+    r = src_len / dst_len
+    k = int(np.ceil(r)) + 1
+    start = np.arange(dst_len, dtype=np.float64) * r
+    end = start + r
+    first = np.floor(start).astype(np.intp)
+    idx = first[:, None] + np.arange(k, dtype=np.intp)[None, :]
+    lo = np.maximum(idx, start[:, None])
+    hi = np.minimum(idx + 1, end[:, None])
+    w = np.clip(hi - lo, 0, None) / r
+    np.minimum(idx, src_len - 1, out=idx)
+    return _readonly(idx, w.astype(np.float32))
 
+def _round_u8(x: np.ndarray) -> np.ndarray:
+    np.rint(x, out=x)
+    np.clip(x, 0, 255, out=x)
+    return x.astype(np.uint8)
+
+def _along(a: np.ndarray, axis: int, idx, weights) -> np.ndarray:
+    # weighted gather along one axis: sum_k weights[:, k] * a[idx[:, k]]
+    shape = [1] * a.ndim
+    shape[axis] = -1
+    acc = None
+    for k in range(idx.shape[1]):
+        term = np.take(a, idx[:, k], axis=axis).astype(np.float32, copy=False)
+        term *= weights[:, k].reshape(shape)
+        if acc is None:
+            acc = term
+        else:
+            acc += term
+    return acc
+
+def _nearest(a, new_w, new_h, progress=None):
+    ys = _nearest_index(a.shape[0], new_h)
+    xs = _nearest_index(a.shape[1], new_w)
+    if jit.enabled():
+        if progress is not None:
+            progress.start(1)
+        out = jit.gather(a, ys, xs)
+        if progress is not None:
+            progress.advance()
         return out
+    out = np.empty((new_h, new_w) + a.shape[2:], dtype=np.uint8)
+    starts = range(0, new_h, _BAND_ROWS)
+    if progress is not None:
+        progress.start(len(starts))
+    for y0 in starts:
+        rows = a[ys[y0:y0 + _BAND_ROWS]]
+        out[y0:y0 + _BAND_ROWS] = rows[:, xs]
+        if progress is not None:
+            progress.advance()
+    return out
+
+def _bilinear(a, new_w, new_h):
+    y0, y1, wy = _linear_weights(a.shape[0], new_h)
+    x0, x1, wx = _linear_weights(a.shape[1], new_w)
+    idx_y, w_y = np.stack([y0, y1], axis=1), np.stack([1 - wy, wy], axis=1)
+    idx_x, w_x = np.stack([x0, x1], axis=1), np.stack([1 - wx, wx], axis=1)
+    if jit.enabled():
+        return jit.weighted(a, idx_y, w_y, idx_x, w_x)
+    rows = _along(a, 0, idx_y, w_y)
+    return _round_u8(_along(rows, 1, idx_x, w_x))
 
-    a = img_np.astype(np.uint8)
-    H, W, C = a.shape
-    out = np.empty((new_h, new_w, C), dtype=np.uint8)
+def _area(a, new_w, new_h):
+    H, W = a.shape[0], a.shape[1]
+    if H % new_h == 0 and W % new_w == 0:
+        # whole blocks: plain block mean
+        fy, fx = H // new_h, W // new_w
+        blocks = a.reshape((new_h, fy, new_w, fx) + a.shape[2:])
+        return _round_u8(blocks.mean(axis=(1, 3), dtype=np.float32))
+    if jit.enabled():
+        return jit.weighted(a, *_area_weights(H, new_h), *_area_weights(W, new_w))
+    rows = _along(a, 0, *_area_weights(H, new_h))
+    return _round_u8(_along(rows, 1, *_area_weights(W, new_w)))
 
-    for y in range(new_h):
-        src_y = int(y * H / new_h)
-        if src_y >= H: src_y = H - 1
-        for x in range(new_w):
-            src_x = int(x * W / new_w)
-            if src_x >= W: src_x = W - 1
-            out[y, x, :] = a[src_y, src_x, :]
+def _half(a: np.ndarray) -> np.ndarray:
+    # 2x2 box average, odd edges replicated
+    if a.shape[0] % 2 or a.shape[1] % 2:
+        pad = [(0, a.shape[0] % 2), (0, a.shape[1] % 2)] + [(0, 0)] * (a.ndim - 2)
+        a = np.pad(a, pad, mode="edge")
+    s = a[0::2, 0::2].astype(np.uint16)
+    s += a[1::2, 0::2]
+    s += a[0::2, 1::2]
+    s += a[1::2, 1::2]
+    s += 2
+    s >>= 2
+    return s.astype(np.uint8)
 
+def _pyramid(a, new_w, new_h, progress=None):
+    while a.shape[0] >= 2 * new_h and a.shape[1] >= 2 * new_w:
+        if progress is not None:
+            progress.check()
+        a = _half(a)
+    if a.shape[0] == new_h and a.shape[1] == new_w:
+        return a
+    return _area(a, new_w, new_h)
+
+def resize_image(img_np: np.ndarray, new_w: int, new_h: int, mode: str = "nearest",
+                 progress=None) -> np.ndarray:
+
+    # nearest:  same pixels as resize_nearest_manual
+    # bilinear: pixel-center aligned linear interpolation
+    # area:     exact box average over each output pixel's footprint
+    # pyramid:  repeated 2x box halving, then an area step to the exact size
+    assert new_w >= 1 and new_h >= 1, "new size must be >= 1"
+    new_w, new_h = int(new_w), int(new_h)
+    mode = (mode or "nearest").strip().lower()
+    a = img_np if img_np.dtype == np.uint8 else img_np.astype(np.uint8)
+
+    if mode == "nearest":
+        return _nearest(a, new_w, new_h, progress)
+    if progress is not None:
+        progress.start(1)
+    if mode == "bilinear":
+        out = _bilinear(a, new_w, new_h)
+    elif mode == "area":
+        out = _area(a, new_w, new_h)
+    elif mode == "pyramid":
+        out = _pyramid(a, new_w, new_h, progress)
+    else:
+        raise ValueError(f"Unknown resize mode: {mode!r} (choose from {', '.join(MODES)})")
+    if progress is not None:
+        progress.advance()
     return out
+
+def resize_nearest_manual(img_np: np.ndarray, new_w: int, new_h: int, progress=None) -> np.ndarray:
+
+    return resize_image(img_np, new_w, new_h, "nearest", progress)
+
+def resize_preview_params(scale: float, box, new_w: int, new_h: int, mode: str = "nearest"):
+    # the final result is shown fitted into the box, so that is the size
+    # worth producing from the proxy
+    fit = min(box[0] / new_w, box[1] / new_h, 1.0)
+    return {"new_w": max(1, int(new_w * fit)), "new_h": max(1, int(new_h * fit)), "mode": mode}
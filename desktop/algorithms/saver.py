@@ -0,0 +1,189 @@
+# algorithms/saver.py
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+from PIL import Image, ImageFile
+from algorithms.progress import check
+
+# Writing results to disk. save_image goes through a temp file and a rename,
+# so a cancelled or failed save never leaves a half-written file behind.
+# PNGs are encoded here, band by band from any array-like that slices
+# cheaply (np.load(path, mmap_mode="r"), the memmap run_tiled returns), so an
+# out-of-core result is never fully in memory and progress is reported per
+# band. Rows get the usual adaptive filter (smallest sum of residuals), which
+# keeps files as small as PIL's. Other formats go through PIL.
+
+BAND_ROWS = 64
+
+FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".bmp": "BMP", ".tif": "TIFF", ".tiff": "TIFF"}
+
+# option -> values it takes, per format; options of other formats are ignored
+_OPTIONS = {
+    "PNG":  {"compress_level": range(10), "optimize": (False, True)},
+    "JPEG": {"quality": range(1, 96), "progressive": (False, True), "optimize": (False, True),
+             "subsampling": ("4:4:4", "4:2:2", "4:2:0")},
+    "TIFF": {"compression": ("raw", "tiff_lzw", "tiff_deflate", "packbits")},
+}
+_DEFAULTS = {
+    "PNG":  {"compress_level": 6},
+    "JPEG": {"quality": 90, "subsampling": "4:2:0"},
+    "TIFF": {"compression": "tiff_deflate"},
+}
+_TIFF_ALIASES = {"none": "raw", "lzw": "tiff_lzw", "deflate": "tiff_deflate", "zip": "tiff_deflate"}
+
+# Choices offered when saving from the app; the first one is the default.
+PRESETS = {
+    "PNG":  {"Balanced (level 6)": {"compress_level": 6},
+             "Fast (level 1)": {"compress_level": 1},
+             "Smallest (level 9)": {"compress_level": 9, "optimize": True}},
+    "JPEG": {"High (quality 92, 4:4:4)": {"quality": 92, "subsampling": "4:4:4"},
+             "Standard (quality 85)": {"quality": 85},
+             "Web (quality 75, progressive)": {"quality": 75, "progressive": True, "optimize": True}},
+    "TIFF": {"Deflate": {"compression": "tiff_deflate"},
+             "LZW": {"compression": "tiff_lzw"},
+             "Uncompressed": {"compression": "raw"}},
+}
+
+def format_for(path: str) -> str:
+    # PIL format name from the extension; anything else PIL can write works
+    # too, with its default settings
+    ext = os.path.splitext(path)[1].lower()
+    fmt = FORMATS.get(ext)
+    if fmt is None:
+        fmt = Image.registered_extensions().get(ext)  # loads all plugins
+        fmt = fmt if fmt in Image.SAVE else None
+    if fmt is None:
+        raise ValueError(f"Unsupported file type: {os.path.basename(path)!r} "
+                         f"(use {', '.join(sorted(FORMATS))})")
+    return fmt
+
+def encoder_options(fmt: str, **opts) -> dict:
+    # defaults for fmt updated with the options that apply to it, checked
+    known = set().union(*_OPTIONS.values())
+    unknown = sorted(set(opts) - known)
+    if unknown:
+        raise ValueError(f"Unknown encoder option {unknown[0]!r} (choose from {', '.join(sorted(known))})")
+    allowed = _OPTIONS.get(fmt, {})
+    out = dict(_DEFAULTS.get(fmt, {}))
+    for key, value in opts.items():
+        if key not in allowed:
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+            value = _TIFF_ALIASES.get(value, value) if key == "compression" else value
+        choices = allowed[key]
+        if value not in choices:
+            allowed_text = f"{choices.start}..{choices.stop - 1}" if isinstance(choices, range) else list(choices)
+            raise ValueError(f"{fmt} {key} must be in {allowed_text}, not {value!r}")
+        out[key] = bool(value) if choices == (False, True) else int(value) if isinstance(choices, range) else value
+    return out
+
+# ---------- Streaming PNG ----------
+_COLOR_TYPE = {1: 0, 3: 2, 4: 6}  # channels -> gray / RGB / RGBA
+
+def _chunk(f, tag: bytes, data: bytes):
+    f.write(struct.pack(">I", len(data)))
+    f.write(tag)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+def _filter_rows(band, prev, bpp):
+    # (h, W*bpp) uint8 -> (h, 1 + W*bpp) with each row's filter byte; all five
+    # filters work on the unfiltered bytes, so a whole band is done at once
+    x = band.astype(np.int16)
+    up = np.empty_like(x)
+    up[0] = prev
+    up[1:] = x[:-1]
+    left = np.zeros_like(x)
+    left[:, bpp:] = x[:, :-bpp]
+    up_left = np.zeros_like(x)
+    up_left[:, bpp:] = up[:, :-bpp]
+    pa, pb, pc = np.abs(up - up_left), np.abs(left - up_left), np.abs(left + up - 2 * up_left)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left))
+    cand = np.stack([x, x - left, x - up, x - ((left + up) >> 1), x - paeth]).astype(np.uint8)
+    cost = np.minimum(cand, 256 - cand.astype(np.int16)).sum(axis=2)  # |residual| as signed bytes
+    best = cost.argmin(axis=0)
+    out = np.empty((band.shape[0], band.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = best
+    out[:, 1:] = cand[best, np.arange(band.shape[0])]
+    return out
+
+def write_png(img, f, progress=None, compress_level: int = 6, optimize: bool = False,
+              band_rows: int = BAND_ROWS):
+
+    # img: (H, W) or (H, W, 1|3|4) array-like of 0..255, read band_rows at a
+    # time; f: binary file object. optimize trades time for the best zlib
+    # settings, as PIL's optimize does.
+    H, W = img.shape[0], img.shape[1]
+    C = 1 if len(img.shape) == 2 else img.shape[2]
+    if C not in _COLOR_TYPE:
+        raise ValueError(f"PNG needs 1, 3 or 4 channels, not {C}")
+    f.write(b"\x89PNG\r\n\x1a\n")
+    _chunk(f, b"IHDR", struct.pack(">IIBBBBB", W, H, 8, _COLOR_TYPE[C], 0, 0, 0))
+    z = zlib.compressobj(9 if optimize else compress_level, zlib.DEFLATED, 15, 9 if optimize else 8)
+    prev = np.zeros(W * C, dtype=np.int16)
+    starts = range(0, H, band_rows)
+    if progress is not None:
+        progress.start(len(starts))
+    for y0 in starts:
+        check(progress)
+        band = np.asarray(img[y0:y0 + band_rows]).astype(np.uint8, copy=False).reshape(-1, W * C)
+        data = z.compress(_filter_rows(band, prev, C).tobytes())
+        if data:
+            _chunk(f, b"IDAT", data)
+        prev = band[-1]
+        if progress is not None:
+            progress.advance()
+    _chunk(f, b"IDAT", z.flush())
+    _chunk(f, b"IEND", b"")
+
+# ---------- Any format ----------
+_MAXBLOCK_LOCK = threading.Lock()
+
+def _save_pil(img, path, fmt, params):
+    # progressive / optimized JPEGs are written in one shot into a buffer PIL
+    # sizes at W*H bytes, which noisy 4:4:4 images overflow ("Suspension not
+    # allowed here"); the floor for that buffer (a PIL global, there is no
+    # per-save option) is raised for this save only, one such save at a time
+    if not (fmt == "JPEG" and (params.get("progressive") or params.get("optimize"))):
+        img.save(path, fmt, **params)
+        return
+    with _MAXBLOCK_LOCK:
+        block = ImageFile.MAXBLOCK
+        ImageFile.MAXBLOCK = max(block, 3 * img.size[0] * img.size[1] + (1 << 16))
+        try:
+            img.save(path, fmt, **params)
+        finally:
+            ImageFile.MAXBLOCK = block
+
+def save_image(img, path: str, progress=None, **opts):
+
+    # Saves a PIL image or an array-like (memmaps stay on disk for PNG) in the
+    # format given by the extension, with encoder options (see _OPTIONS).
+    # Returns the file size in bytes.
+    fmt = format_for(path)
+    params = encoder_options(fmt, **opts)
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.part{ext}"
+    try:
+        if fmt == "PNG" and not (isinstance(img, Image.Image) and img.mode not in ("L", "RGB", "RGBA")):
+            arr = np.asarray(img) if isinstance(img, Image.Image) else img
+            with open(tmp, "wb") as f:
+                write_png(arr, f, progress, **params)
+        else:
+            if not isinstance(img, Image.Image):
+                img = Image.fromarray(np.asarray(img).astype(np.uint8, copy=False))
+            if progress is not None:
+                progress.start(1)
+            check(progress)
+            _save_pil(img, tmp, fmt, params)
+            if progress is not None:
+                progress.advance()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return os.path.getsize(path)
@@ -1,78 +1,71 @@
 # algorithms/sharpening.py
 import numpy as np
+from algorithms.derivatives import SOBEL_X, SOBEL_Y, LAPLACIAN_4, sobel_magnitude, laplacian_plane, planes
 
 def _clip_u8(x):
     x = np.clip(x, 0, 255)
     return x.astype(np.uint8)
 
-def _conv3x3_channel(ch_img: np.ndarray, K: np.ndarray) -> np.ndarray:
-    H, W = ch_img.shape
-    padded = np.pad(ch_img.astype(np.int32), 1, mode="constant", constant_values=0)
-    out = np.empty((H, W), dtype=np.int32)
-    for i in range(1, H + 1):
-        for j in range(1, W + 1):
-            region = padded[i-1:i+2, j-1:j+2]
-            out[i-1, j-1] = int(np.sum(region * K))
-    return out  # keep int32 for further math
-
-def _apply_kernel_int32(img_np: np.ndarray, K: np.ndarray) -> np.ndarray:
-    if img_np.ndim == 2:
-        return _conv3x3_channel(img_np, K)
-    else:
-        H, W, C = img_np.shape
-        out = np.empty((H, W, C), dtype=np.int32)
-        for ch in range(C):
-            out[..., ch] = _conv3x3_channel(img_np[..., ch], K)
-        return out
-
-def _abs(x):
-    return np.abs(x).astype(np.int32)
-
-# Kernels
-SOBEL_X = np.array([[-1, 0, 1],
-                    [-2, 0, 2],
-                    [-1, 0, 1]], dtype=np.int32)
-
-SOBEL_Y = np.array([[-1, -2, -1],
-                    [ 0,  0,  0],
-                    [ 1,  2,  1]], dtype=np.int32)
-
-LAPLACIAN_4 = np.array([[0,  1, 0],
-                        [1, -4, 1],
-                        [0,  1, 0]], dtype=np.int32)
-
 _STRENGTH_ALPHA = {
     "low": 0.5,
     "medium": 1.0,
     "high": 1.5,
 }
 
-def _first_order_sharpen(img_np: np.ndarray, alpha: float) -> np.ndarray:
-    
-    a = img_np.astype(np.int32)
-    gx = _apply_kernel_int32(a, SOBEL_X)
-    gy = _apply_kernel_int32(a, SOBEL_Y)
+# The derivative planes are cached per source image (algorithms.derivatives),
+# so a different strength costs one blend pass and no convolution.
 
-    edge = _abs(gx) + _abs(gy)  # simple L1 magnitude
-    sharpened = a + (alpha * edge)
-    return _clip_u8(sharpened)
+def _blend(img_np, plane, alpha, sign, out=None):
+    # clip(img + sign * alpha * plane) truncated to uint8. The preset alphas
+    # are halves, so it is done exactly in int16 as (2 img + 2 alpha plane) >> 1:
+    # the floor equals the truncation wherever the clip does not apply.
+    m = 2 * alpha
+    if out is None:
+        out = np.empty(img_np.shape, np.uint8)
+    if m == int(m) and 0 <= m <= 4 and img_np.dtype == np.uint8 and plane.dtype == np.int16:
+        t = np.multiply(plane, sign * int(m), dtype=np.int16)
+        t += img_np
+        t += img_np
+        t >>= 1
+        np.clip(t, 0, 255, out=t)
+        np.copyto(out, t, casting="unsafe")
+        return out
+    sharpened = img_np.astype(np.int32) + (sign * alpha * plane)
+    np.copyto(out, _clip_u8(sharpened))
+    return out
 
-def _second_order_sharpen(img_np: np.ndarray, alpha: float) -> np.ndarray:
-    
-    a = img_np.astype(np.int32)
-    lap = _apply_kernel_int32(a, LAPLACIAN_4)
-    sharpened = a - (alpha * lap)
-    return _clip_u8(sharpened)
+def _first_order_sharpen(img_np: np.ndarray, alpha: float, out=None) -> np.ndarray:
+
+    edge = sobel_magnitude(img_np)  # simple L1 magnitude
+    return _blend(img_np, edge, alpha, +1, out)
+
+def _second_order_sharpen(img_np: np.ndarray, alpha: float, out=None) -> np.ndarray:
+
+    lap = laplacian_plane(img_np)
+    return _blend(img_np, lap, alpha, -1, out)
+
+def sharpen_image(img_np: np.ndarray, kind: str = "first", strength: str = "medium",
+                  progress=None, out=None) -> np.ndarray:
+
+    if progress is not None:
+        from algorithms.tiling import run_banded
+        return run_banded("sharpen", img_np, progress, out=out, kind=kind, strength=strength)
 
-def sharpen_image(img_np: np.ndarray, kind: str = "first", strength: str = "medium") -> np.ndarray:
-    
     kind = (kind or "first").strip().lower()
     strength = (strength or "medium").strip().lower()
     alpha = _STRENGTH_ALPHA.get(strength, 1.0)
 
     if kind == "first":
-        return _first_order_sharpen(img_np, alpha=alpha)
+        return _first_order_sharpen(img_np, alpha=alpha, out=out)
     elif kind == "second":
-        return _second_order_sharpen(img_np, alpha=alpha)
+        return _second_order_sharpen(img_np, alpha=alpha, out=out)
     else:
-        return _second_order_sharpen(img_np, alpha=1.0)
+        return _second_order_sharpen(img_np, alpha=1.0, out=out)
+
+def sharpen_halo(kind: str = "first", strength: str = "medium") -> int:
+    return 1
+
+def sharpen_planes(img_np: np.ndarray, kind: str = "first", strength: str = "medium") -> dict:
+    # derivative planes the bands blend with (registry._PLANES)
+    kind = (kind or "first").strip().lower()
+    return planes(img_np, "sobel_l1" if kind == "first" else "laplacian4")
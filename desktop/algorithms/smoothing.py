@@ -1,33 +1,44 @@
 # algorithms/smoothing.py
+import math
+import functools
 import numpy as np
+from algorithms.convolve import conv3x3, conv3x3_rational, rational_kernel, _pad_zero
+from algorithms.progress import check
+
+MAX_RADIUS = 1000  # keeps a full window sum (255 * (2r+1)^2) inside int32
+IIR_MIN_SIGMA = 3.0  # from here on the recursive Gaussian is cheaper than the kernel
+IIR_HALO_SIGMAS = 4  # tile context for the recursive Gaussian (within one level)
+IIR_STEP_ROWS = 256  # rows per progress step of the recursive Gaussian
+STRIP_PIXELS = 1 << 18  # float32 scratch of the small-sigma Gaussian, per buffer
 
 def _clip_u8(x):
     x = np.clip(x, 0, 255)
     return x.astype(np.uint8)
 
-def _conv3x3_channel(ch_img: np.ndarray, K: np.ndarray) -> np.ndarray:
-    H, W = ch_img.shape
-    padded = np.pad(ch_img.astype(np.int32), 1, mode="constant", constant_values=0)
-    out = np.empty((H, W), dtype=np.int32)
-    # explicit loops (manual implementation)
-    for i in range(1, H + 1):
-        for j in range(1, W + 1):
-            region = padded[i-1:i+2, j-1:j+2]
-            out[i-1, j-1] = int(np.sum(region * K))
-    return _clip_u8(out)
-
-def _apply_kernel(img_np: np.ndarray, K: np.ndarray, passes: int = 1) -> np.ndarray:
-    out = img_np.copy()
-    for _ in range(max(1, passes)):
-        if out.ndim == 2:
-            out = _conv3x3_channel(out, K)
-        else:
-            H, W, C = out.shape
-            tmp = np.empty_like(out)
-            for ch in range(C):
-                tmp[..., ch] = _conv3x3_channel(out[..., ch], K)
-            out = tmp
-    return out
+def _apply_kernel(img_np: np.ndarray, K: np.ndarray, passes: int = 1, out=None) -> np.ndarray:
+    # Kernels like 1/9 and 1-2-1/16 on uint8 take the integer path (same bytes
+    # as the float one): uint16 sums, and the passes alternate between `out`
+    # and one spare uint8 buffer. `out` must not overlap the input.
+    passes = max(1, passes)
+    rk = rational_kernel(K)
+    if rk is None or img_np.dtype != np.uint8 or rk[0].sum() > rk[1]:
+        res = img_np
+        for _ in range(passes):
+            res = _clip_u8(conv3x3(res, K))
+        if out is None:
+            return res
+        out[...] = res
+        return out
+
+    N, d = rk
+    final = out if out is not None else np.empty(img_np.shape, np.uint8)
+    spare = np.empty(img_np.shape, np.uint8) if passes > 1 else None
+    scratch = []
+    res = img_np
+    for p in range(passes):
+        dst = final if (passes - 1 - p) % 2 == 0 else spare
+        res = conv3x3_rational(res, N, d, out=dst, scratch=scratch)
+    return res
 
 def mean_kernel() -> np.ndarray:
     return (np.ones((3, 3), dtype=np.float32) / 9.0)
@@ -41,16 +52,215 @@ def gaussian_kernel() -> np.ndarray:
     # Per your requirement: same as weighted averaging
     return weighted_kernel()
 
+def _box_plane(plane, r, out):
+    H, W = plane.shape
+    a = _pad_zero(plane.astype(np.int32), r)
+    np.cumsum(a, axis=1, out=a)
+    rows = a[:, 2 * r:].copy()           # sum of columns j-r .. j+r
+    rows[:, 1:] -= a[:, :W - 1]
+    del a
+    np.cumsum(rows, axis=0, out=rows)
+    res = rows[2 * r:].copy()            # then of rows i-r .. i+r
+    res[1:] -= rows[:H - 1]
+    del rows
+    np.floor_divide(res, (2 * r + 1) ** 2, out=res)
+    np.copyto(out, res, casting="unsafe")
+
+def box_mean(img_np: np.ndarray, radius: int, out=None) -> np.ndarray:
+
+    # Mean over a (2r+1)x(2r+1) window with zero padding, floor(sum / n) like
+    # the 3x3 mean kernel (radius 1 gives exactly one mean pass). The window
+    # sums come from running sums (a summed-area table, one axis at a time),
+    # so the cost per pixel is the same for every radius. The running sums
+    # may wrap around in int32; differences of them are still exact.
+    # Channels are done one at a time to keep the int32 scratch small.
+    r = int(radius)
+    assert 0 <= r <= MAX_RADIUS, f"radius must be 0..{MAX_RADIUS}"
+    if out is None:
+        out = np.empty(img_np.shape, np.uint8)
+    if r == 0 or img_np.size == 0:
+        np.copyto(out, img_np, casting="unsafe")
+        return out
+    if img_np.ndim == 2:
+        _box_plane(img_np, r, out)
+    else:
+        for c in range(img_np.shape[2]):
+            _box_plane(img_np[:, :, c], r, out[:, :, c])
+    return out
+
+def _gaussian_taps(sigma: float) -> np.ndarray:
+    r = max(1, int(math.ceil(3 * sigma)))
+    x = np.arange(-r, r + 1, dtype=np.float64)
+    k = np.exp(-0.5 * (x / sigma) ** 2)
+    return (k / k.sum()).astype(np.float32)
+
+def _fir_valid(p: np.ndarray, taps: np.ndarray, axis: int, out: np.ndarray, tmp: np.ndarray):
+    # correlation with symmetric `taps` along one axis of p, which already
+    # carries r pixels of context (or zeros) on both sides of that axis;
+    # out and tmp have p's shape less those 2r
+    r, n = len(taps) // 2, out.shape[axis]
+    lead = (slice(None),) * axis
+    win = lambda i: p[lead + (slice(i, i + n),)]
+    np.multiply(win(r), taps[r], out=out)
+    for i in range(r):  # add the mirrored pair, multiply once
+        np.add(win(i), win(2 * r - i), out=tmp)
+        tmp *= taps[i]
+        out += tmp
+    return out
+
+def _yvv_coeffs(sigma: float):
+    # Young & van Vliet (1995) third-order recursive Gaussian:
+    # w[n] = B x[n] + a1 w[n-1] + a2 w[n-2] + a3 w[n-3], then the same backwards
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * math.sqrt(1 - 0.26891 * sigma)
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b3 = 0.422205 * q ** 3
+    return 1 - (b1 + b2 + b3) / b0, b1 / b0, b2 / b0, b3 / b0
+
+@functools.lru_cache(maxsize=32)
+def _yvv_tail(sigma: float) -> np.ndarray:
+    # 3x3 matrix giving the backward pass's start values y[N], y[N+1], y[N+2]
+    # from the last forward values w[N-1], w[N-2], w[N-3] when the signal is
+    # zero past the end (exact zero boundary without padding the image)
+    B, a1, a2, a3 = _yvv_coeffs(sigma)
+    L = int(40 * sigma) + 64
+    M = np.zeros((3, 3))
+    for j in range(3):
+        w = np.zeros(L + 3)
+        w[2 - j] = 1.0  # w[0..2] stand for w[N-3], w[N-2], w[N-1]
+        for n in range(3, L + 3):
+            w[n] = a1 * w[n - 1] + a2 * w[n - 2] + a3 * w[n - 3]
+        y = np.zeros(L + 6)
+        for n in range(L + 2, 2, -1):
+            y[n] = B * w[n] + a1 * y[n + 1] + a2 * y[n + 2] + a3 * y[n + 3]
+        M[:, j] = y[3:6]
+    return M
+
+def _iir_axis0(a: np.ndarray, sigma: float, progress=None) -> np.ndarray:
+    # recursive Gaussian along axis 0 of a float32 array, in place; each
+    # step works on a whole row, so the cost does not depend on sigma
+    B, a1, a2, a3 = _yvv_coeffs(sigma)
+    N = a.shape[0]
+    tmp = np.empty_like(a[0])
+
+    def step(n, prev):
+        cur = a[n]
+        cur *= B
+        for coef, row in zip((a1, a2, a3), prev):
+            if row is not None:
+                np.multiply(row, coef, out=tmp)
+                cur += tmp
+
+    def tick(i):
+        if progress is not None and (i % IIR_STEP_ROWS == IIR_STEP_ROWS - 1 or i == N - 1):
+            progress.advance()
+
+    for n in range(N):
+        step(n, [a[n - k] if n - k >= 0 else None for k in (1, 2, 3)])
+        tick(n)
+
+    M = _yvv_tail(sigma)
+    last = [a[N - 1 - k] if N - 1 - k >= 0 else np.zeros_like(tmp) for k in range(3)]
+    tail = [sum(M[i, j] * last[j] for j in range(3)).astype(np.float32) for i in range(3)]
+    for n in range(N - 1, -1, -1):
+        step(n, [a[n + k] if n + k < N else tail[n + k - N] for k in (1, 2, 3)])
+        tick(N - 1 - n)
+    return a
+
+def _iir_steps(n: int) -> int:
+    # progress steps of _iir_axis0 over n rows (forward and backward)
+    return 2 * -(-n // IIR_STEP_ROWS)
+
+def _gaussian_plane(plane, sigma, out):
+    # a strip of rows at a time, read with r rows of context and r zero
+    # columns on each side into float32 scratch that is reused for every
+    # strip; the values are the same as filtering the whole plane at once
+    taps = _gaussian_taps(sigma)
+    r = len(taps) // 2
+    H, W = plane.shape
+    rows = max(1, STRIP_PIXELS // (W + 2 * r))
+    a = np.zeros((min(rows, H) + 2 * r, W + 2 * r), np.float32)
+    v = np.empty((min(rows, H), W + 2 * r), np.float32)
+    h = np.empty((min(rows, H), W), np.float32)
+    tmp = np.empty_like(v)
+    for y0 in range(0, H, rows):
+        y1 = min(H, y0 + rows)
+        n, ya, yb = y1 - y0, max(0, y0 - r), min(H, y1 + r)
+        src = a[:n + 2 * r]
+        top, bottom = ya - (y0 - r), yb - (y0 - r)  # rows of src inside the image
+        src[:top] = 0
+        src[bottom:] = 0
+        src[top:bottom, r:r + W] = plane[ya:yb]
+        _fir_valid(src, taps, 0, v[:n], tmp[:n])
+        res = _fir_valid(v[:n], taps, 1, h[:n], tmp[:n, :W])
+        np.rint(res, out=res)
+        np.clip(res, 0, 255, out=res)
+        np.copyto(out[y0:y1], res, casting="unsafe")
+
+def gaussian_blur(img_np: np.ndarray, sigma: float, progress=None, out=None) -> np.ndarray:
+
+    # Gaussian of standard deviation sigma, zero padding, rounded to uint8.
+    # Small sigma: separable kernel out to 3 sigma, float32 scratch for a
+    # strip of one channel at a time. Large sigma: recursive filter, forward
+    # and backward along each axis at a fixed cost per pixel, over all
+    # channels at once (each step is a whole row, so fewer and larger steps
+    # are faster).
+    sigma = float(sigma)
+    assert sigma > 0, "sigma must be > 0"
+    if out is None:
+        out = np.empty(img_np.shape, np.uint8)
+    if sigma < IIR_MIN_SIGMA:
+        planes = [(img_np, out)] if img_np.ndim == 2 else \
+            [(img_np[:, :, c], out[:, :, c]) for c in range(img_np.shape[2])]
+        for plane, dst in planes:
+            _gaussian_plane(plane, sigma, dst)
+        return out
+
+    a = img_np.astype(np.float32)
+    if progress is not None:
+        progress.start(_iir_steps(img_np.shape[0]) + _iir_steps(img_np.shape[1]))
+    check(progress)
+    _iir_axis0(a, sigma, progress)
+    t = np.ascontiguousarray(np.swapaxes(a, 0, 1))
+    del a
+    a = np.swapaxes(_iir_axis0(t, sigma, progress), 0, 1)
+    np.rint(a, out=a)
+    np.clip(a, 0, 255, out=a)
+    np.copyto(out, a, casting="unsafe")
+    return out
+
 _STRENGTH_TO_PASSES = {
     "low": 1,
     "medium": 2,
     "high": 3,
 }
 
-def smooth_image(img_np: np.ndarray, mode: str = "mean", strength: str = "medium") -> np.ndarray:
-    
+def smooth_image(img_np: np.ndarray, mode: str = "mean", strength: str = "medium",
+                 radius: int = None, sigma: float = None, progress=None, out=None) -> np.ndarray:
+
+    # radius (mean) or sigma (gaussian) replace the strength presets
     mode = (mode or "mean").strip().lower()
+    if radius is not None and mode != "mean":
+        raise ValueError("radius applies to mode='mean' only")
+    if sigma is not None and mode != "gaussian":
+        raise ValueError("sigma applies to mode='gaussian' only")
+
+    if progress is not None:
+        if sigma is not None and sigma >= IIR_MIN_SIGMA:
+            return gaussian_blur(img_np, sigma, progress, out)  # recursive: whole image, exact
+        from algorithms.tiling import run_banded
+        return run_banded("smooth", img_np, progress, out=out, mode=mode, strength=strength,
+                          radius=radius, sigma=sigma)
+
     strength = (strength or "medium").strip().lower()
+    if radius is not None:
+        return box_mean(img_np, radius, out)
+    if sigma is not None:
+        return gaussian_blur(img_np, sigma, out=out)
     passes = _STRENGTH_TO_PASSES.get(strength, 2)
 
     if mode == "mean":
@@ -63,4 +273,38 @@ def smooth_image(img_np: np.ndarray, mode: str = "mean", strength: str = "medium
         # default to mean if unknown
         K = mean_kernel()
 
-    return _apply_kernel(img_np, K, passes=passes)
+    return _apply_kernel(img_np, K, passes=passes, out=out)
+
+def smooth_halo(mode: str = "mean", strength: str = "medium", radius: int = None,
+                sigma: float = None):
+    # every 3x3 pass reaches one pixel further; the recursive Gaussian reaches
+    # the whole image, so it has no exact halo (None, see smooth_approx_halo)
+    if radius is not None:
+        return int(radius)
+    if sigma is not None:
+        return len(_gaussian_taps(float(sigma))) // 2 if float(sigma) < IIR_MIN_SIGMA else None
+    strength = (strength or "medium").strip().lower()
+    return _STRENGTH_TO_PASSES.get(strength, 2)
+
+def smooth_approx_halo(mode: str = "mean", strength: str = "medium", radius: int = None,
+                       sigma: float = None):
+    # the recursive Gaussian's weights past 4 sigma add up to well under one
+    # level, so tiles with that much context are within one level of the
+    # whole-image result (float32 recursion, rounded to uint8)
+    h = smooth_halo(mode, strength, radius, sigma)
+    return h if h is not None else int(math.ceil(IIR_HALO_SIGMAS * float(sigma)))
+
+def smooth_preview_params(scale: float, box, mode: str = "mean", strength: str = "medium",
+                          radius: int = None, sigma: float = None):
+    if sigma is not None:
+        sigma = float(sigma) * scale
+        return {"mode": mode, "sigma": sigma} if sigma >= 0.3 else None
+    # n passes reach n pixels at full size, n * scale pixels on the proxy
+    reach = smooth_halo(mode, strength, radius) * scale
+    if reach < 0.5:
+        return None
+    if radius is not None:
+        return {"mode": mode, "radius": int(round(reach))}
+    passes = min(3, max(1, int(round(reach))))
+    strength = {p: s for s, p in _STRENGTH_TO_PASSES.items()}[passes]
+    return {"mode": mode, "strength": strength}
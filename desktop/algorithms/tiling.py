@@ -0,0 +1,162 @@
+# algorithms/tiling.py
+import tempfile
+import numpy as np
+from algorithms import registry
+from algorithms.cache import partial
+from algorithms.histogram import channel_histograms
+from algorithms.point_ops import split_at_gray, chain_lut, apply_lut, _is_identity
+from algorithms.color import luminance, gray_plane
+from algorithms.progress import check
+
+# Tiled (out-of-core) execution. The input can be any array-like that slices
+# cheaply, e.g. np.load(path, mmap_mode="r"); the result is written tile by
+# tile into a memory-mapped .npy, so peak memory is bounded by the tile size
+# (plus its halo) instead of the image size.
+
+DEFAULT_TILE = 1024
+
+def tiles(H: int, W: int, tile: int = DEFAULT_TILE):
+    for y0 in range(0, H, tile):
+        for x0 in range(0, W, tile):
+            yield y0, min(y0 + tile, H), x0, min(x0 + tile, W)
+
+def read_tile(img_np, y0, y1, x0, x1, halo=0):
+    # tile plus up to `halo` pixels of context (clamped at the image edge, the
+    # op zero-pads there exactly as it does on the full image); also returns
+    # where the tile itself sits inside the returned block
+    H, W = img_np.shape[0], img_np.shape[1]
+    ya, yb = max(0, y0 - halo), min(H, y1 + halo)
+    xa, xb = max(0, x0 - halo), min(W, x1 + halo)
+    block = np.asarray(img_np[ya:yb, xa:xb])
+    return block, (slice(y0 - ya, y0 - ya + (y1 - y0)), slice(x0 - xa, x0 - xa + (x1 - x0)))
+
+def open_output(shape, dtype=np.uint8, out_path=None):
+    if out_path is None:
+        # nameless temp file: the mapping keeps it alive, and the OS removes it
+        # once the returned array is gone (nothing is left behind on disk)
+        with tempfile.TemporaryFile(prefix="tiled_") as f:
+            return np.memmap(f, dtype=dtype, mode="w+", shape=tuple(shape))
+    return np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=tuple(shape))
+
+def _tiled_histogram(img_np, tile, fn=None, progress=None):
+    hist = None
+    for y0, y1, x0, x1 in tiles(img_np.shape[0], img_np.shape[1], tile):
+        check(progress)
+        block = np.asarray(img_np[y0:y1, x0:x1])
+        with partial():
+            h = channel_histograms(block if fn is None else fn(block))
+        hist = h if hist is None else hist + h
+    return hist
+
+class PointTileFn:
+    # Applies a point-op chain whose tables were built from the stats of the
+    # whole image, so every tile (or band) gives the same pixels as the full
+    # run. Plain arrays only, so it pickles cheaply for worker processes.
+
+    def __init__(self, head_lut, tail_lut=None, stacked=False):
+        self.head_lut, self.tail_lut, self.stacked = head_lut, tail_lut, stacked
+        self.plain_gray = _is_identity(head_lut)  # gray op first: the source's gray plane
+
+    def gray(self, block):
+        if self.plain_gray:
+            return gray_plane(block.astype(np.uint8, copy=False))
+        return luminance(apply_lut(block.astype(np.uint8, copy=False), self.head_lut))
+
+    def __call__(self, block):
+        if self.tail_lut is None:
+            out = apply_lut(block.astype(np.uint8, copy=False), self.head_lut)
+        else:
+            out = apply_lut(self.gray(block), self.tail_lut)
+        return np.stack([out, out, out], axis=2) if self.stacked else out
+
+def point_tile_fn(img_np, ops, tile: int = DEFAULT_TILE, progress=None) -> PointTileFn:
+    # global stats come from a histogram pass over the tiles, after that every
+    # tile is one table lookup
+    head, tail = split_at_gray(ops, img_np.ndim)
+    lut, stacked = chain_lut(head, lambda: _tiled_histogram(img_np, tile, None, progress) > 0,
+                             img_np.ndim)
+    if not tail:
+        return PointTileFn(lut, None, stacked)
+    fn = PointTileFn(lut)
+    if fn.plain_gray and isinstance(img_np, np.ndarray) and not isinstance(img_np, np.memmap):
+        # in memory: the stats come from the (cached) gray plane of the source
+        present = lambda: _tiled_histogram(gray_plane(np.asarray(img_np)), tile, None, progress) > 0
+    else:
+        present = lambda: _tiled_histogram(img_np, tile, fn.gray, progress) > 0
+    tail_lut, stacked = chain_lut(tail, present, 2)
+    return PointTileFn(lut, tail_lut, stacked)
+
+def run_tiled(name: str, img_np, tile: int = DEFAULT_TILE, out=None, out_path=None,
+              progress=None, **params):
+
+    # Same result as registry.call(name, img_np, **params), computed tile by
+    # tile (within one level for the recursive Gaussian, which has only an
+    # approximate halo). Returns `out`, or a new memmap at out_path (without
+    # one, on a temp file that goes away with the array).
+    halo = registry.halo(name, approx=True, **params)
+    if halo is None:
+        raise ValueError(f"{name} cannot run tiled")
+    H, W = img_np.shape[0], img_np.shape[1]
+
+    op = registry.point_op(name, **params)
+    if op is not None:
+        fn = point_tile_fn(img_np, [op], tile, progress)
+    else:
+        fn = lambda block: registry.call(name, block, **params)
+
+    work = list(tiles(H, W, tile))
+    if progress is not None:
+        progress.start(len(work))
+    for y0, y1, x0, x1 in work:
+        check(progress)
+        block, inner = read_tile(img_np, y0, y1, x0, x1, halo)
+        with partial():
+            res = fn(block)[inner]
+        if out is None:
+            out = open_output((H, W) + res.shape[2:], res.dtype, out_path)
+        out[y0:y1, x0:x1] = res
+        del block, res
+        if progress is not None:
+            progress.advance()
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+BAND_ROWS = 256
+
+def run_banded(name: str, img_np: np.ndarray, progress=None, band_rows: int = BAND_ROWS, out=None,
+               **params):
+
+    # In-memory version of run_tiled over full-width row bands, checking the
+    # progress token between bands. This is what the algorithm entry points
+    # use when they are given progress=...
+    halo = registry.halo(name, approx=True, **params)
+    if halo is None:
+        raise ValueError(f"{name} cannot run in bands")
+    H, W = img_np.shape[0], img_np.shape[1]
+    op = registry.point_op(name, **params)
+    fn = point_tile_fn(img_np, [op], progress=progress) if op is not None \
+        else (lambda block: registry.call(name, block, **params))
+    planes = registry.planes(name, img_np, **params)
+
+    starts = range(0, H, band_rows)
+    if progress is not None:
+        progress.start(len(starts))
+    for y0 in starts:
+        check(progress)
+        y1 = min(H, y0 + band_rows)
+        block, inner = read_tile(img_np, y0, y1, 0, W, halo)
+        with partial(planes, (y0 - inner[0].start, 0)):
+            res = fn(block)[inner]
+        if out is None:
+            out = np.empty((H, W) + res.shape[2:], dtype=res.dtype)
+        out[y0:y1] = res
+        if progress is not None:
+            progress.advance()
+    if not starts:  # empty image
+        res = registry.call(name, img_np, **params)
+        if out is None:
+            return res
+        out[...] = res
+    return out
@@ -0,0 +1,157 @@
+# algorithms/trace.py
+import os
+import json
+import atexit
+import threading
+import time
+import tracemalloc
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+
+# Timing spans around operations. Every span measures wall and CPU time and
+# the input / output shapes, and is handed back to the caller (status bar,
+# logs). While tracing is enabled spans are also kept, with the peak memory
+# allocated inside the outermost one (tracemalloc), and can be written as
+# Chrome trace-event JSON for chrome://tracing, Perfetto or speedscope.
+#
+# IMAGE_TOOLKIT_TRACE=trace.json enables tracing for a whole run (app or
+# headless) and writes the file at exit.
+
+MAX_EVENTS = 100_000
+
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+_state = {"on": False, "memory": False, "depth": 0, "own_tracemalloc": False}
+
+def enabled() -> bool:
+    return _state["on"]
+
+def enable(memory: bool = True):
+    with _lock:
+        _state["on"] = True
+        _state["memory"] = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _state["own_tracemalloc"] = True
+
+def disable():
+    with _lock:
+        _state["on"] = _state["memory"] = False
+        _state["depth"] = 0
+        if _state["own_tracemalloc"]:
+            tracemalloc.stop()
+            _state["own_tracemalloc"] = False
+
+def events():
+    with _lock:
+        return list(_events)
+
+def clear():
+    with _lock:
+        _events.clear()
+
+def drain():
+    # recorded spans, removed from the buffer (worker processes send these back)
+    with _lock:
+        out = list(_events)
+        _events.clear()
+        return out
+
+def extend(records):
+    with _lock:
+        _events.extend(records)
+
+def shape_of(obj):
+    shape = getattr(obj, "shape", None)
+    if shape is not None:
+        return list(shape)
+    size = getattr(obj, "size", None)  # PIL image
+    if size is not None and hasattr(obj, "mode"):
+        return [size[1], size[0]] + ([] if obj.mode in ("L", "1", "P") else [len(obj.getbands())])
+    return None
+
+def _memory_enter():
+    # tracemalloc has one global peak, so only the outermost span measures it
+    if not _state["memory"]:
+        return None
+    with _lock:
+        _state["depth"] += 1
+        if _state["depth"] > 1:
+            return False
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+def _memory_leave(base):
+    if base is None:
+        return None
+    with _lock:
+        _state["depth"] = max(0, _state["depth"] - 1)
+        if base is False or not tracemalloc.is_tracing():
+            return None
+        return max(0, tracemalloc.get_traced_memory()[1] - base)
+
+@contextmanager
+def span(name: str, img=None, cat: str = "op", **args):
+    # with span("smooth", img, mode="mean") as rec: ...; rec["out"] = shape_of(result)
+    rec = {"name": name, "cat": cat, "in": shape_of(img), "out": None,
+           "args": {k: v for k, v in args.items() if k not in ("progress", "out")}}
+    base = _memory_enter()
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield rec
+    except BaseException as e:
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        rec["wall"] = time.perf_counter() - t0
+        rec["cpu"] = time.process_time() - c0
+        rec["peak"] = _memory_leave(base)
+        rec["ts"] = t0
+        rec["pid"] = os.getpid()
+        rec["tid"] = threading.get_ident()
+        if _state["on"]:
+            with _lock:
+                _events.append(rec)
+
+def traced_call(name: str, fn, img, **params):
+    with span(name, img, **params) as rec:
+        out = fn(img, **params)
+        rec["out"] = shape_of(out)
+    return out
+
+def _dims(shape):
+    return "×".join(str(d) for d in shape) if shape else "?"
+
+def summary(rec) -> str:
+    text = f"{rec['wall']:.2f}s wall, {rec['cpu']:.2f}s CPU"
+    if rec.get("peak") is not None:
+        text += f", peak {rec['peak'] / (1 << 20):.0f} MB"
+    if rec.get("in") or rec.get("out"):
+        text += f", {_dims(rec.get('in'))} → {_dims(rec.get('out'))}"
+    return text
+
+def chrome_trace(records=None) -> dict:
+    # complete ("X") events; perf_counter is system-wide, so spans from worker
+    # processes line up with the parent's
+    records = events() if records is None else records
+    out = []
+    for r in records:
+        args = dict(r["args"], cpu_ms=round(r["cpu"] * 1e3, 3))
+        if r.get("in") is not None: args["in"] = r["in"]
+        if r.get("out") is not None: args["out"] = r["out"]
+        if r.get("peak") is not None: args["peak_mb"] = round(r["peak"] / (1 << 20), 2)
+        if r.get("error"): args["error"] = r["error"]
+        out.append({"name": r["name"], "cat": r["cat"], "ph": "X",
+                    "ts": round(r["ts"] * 1e6, 1), "dur": round(r["wall"] * 1e6, 1),
+                    "pid": r["pid"], "tid": r["tid"], "args": args})
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+def write(path: str, records=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(records), f, default=str)
+
+_env_path = os.environ.get("IMAGE_TOOLKIT_TRACE")
+if _env_path and multiprocessing.parent_process() is None:
+    enable(memory=os.environ.get("IMAGE_TOOLKIT_TRACE_MEMORY", "1") != "0")
+    atexit.register(lambda: write(_env_path))
@@ -1,10 +1,11 @@
-import sys, os
+import time
+_T_START = time.perf_counter()
+
+import sys, os, json
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
 from PIL import Image, ImageTk
-import numpy as np
-import matplotlib.pyplot as plt
 
 # Optional modern UI (ttkbootstrap)
 USING_TTKBOOTSTRAP = False
@@ -17,19 +18,15 @@ except Exception:
     import tkinter.ttk as ttk
     PRIMARY = SUCCESS = INFO = WARNING = DANGER = SECONDARY = None
 
-# Algorithms
-from algorithms.negative import image_negative_exact
-from algorithms.threshold import threshold_loop
-from algorithms.smoothing import smooth_image   
-from algorithms.sharpening import sharpen_image 
-from algorithms.edges import laplacian_manual
-from algorithms.histogram import render_histogram_image
-from algorithms.log_gamma import log_transform_manual, gamma_transform_manual
-from algorithms.resize import resize_nearest_manual
+# Algorithms are imported on first use (algorithms.registry / algorithms.parallel)
+
+_T_IMPORTS = time.perf_counter()
 
 # Constants
 APP_TITLE = "Image Processing Toolkit"
 DEV_PHOTO_SIZE = 160
+PREVIEW_SIZE = 600       # fallback fit box before the canvases are laid out
+SYNC_FIT_PIXELS = 2_000_000  # larger images are fitted on a worker thread
 NAME_FONT = ("Segoe UI", 18, "bold")
 ID_FONT   = ("Segoe UI", 14)
 BTN_FONT  = ("Segoe UI", 13, "bold")
@@ -40,6 +37,13 @@ def resource_path(rel_path: str) -> str:
     base = getattr(sys, "_MEIPASS", os.path.abspath("."))
     return os.path.join(base, rel_path)
 
+def load_dev_photo(size=DEV_PHOTO_SIZE):
+    # assets ship a pre-sized copy; only fall back to resizing the full photo
+    sized = resource_path(f"assets/Dev_{size}.png")
+    if os.path.exists(sized):
+        return Image.open(sized)
+    return Image.open(resource_path("assets/Dev.png")).resize((size, size), Image.LANCZOS)
+
 
 class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
     def __init__(self):
@@ -59,11 +63,35 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         self.resizable(True, True)
 
         self.original_img_pil = None
+        self.original_preview_pil = None  # reduced-resolution draft shown while the file decodes
+        self.current_path = None
+        self._loader = None
+        self._loading = None  # path being decoded, if any
+        self._load_seq = 0
         self.result_img_pil = None
+        self.result_recipe = None  # Pipeline from the original to the result
         self.left_tk = None
         self.right_tk = None
+        self.result_cache = None  # created on first operation
+        self.history = None  # undo / redo, created on first operation
+        self.result_preview_pil = None  # quick proxy shown while the full result is computed
+        self._pending = None  # background full-resolution job, if any
+        self._job_seq = 0
+        self.progressive = tk.BooleanVar(value=True)
+        self.browse_folder = tk.BooleanVar(value=False)
+        self.tracing = tk.BooleanVar(value=False)
+        self._src_array = None  # (original_img_pil, its read-only array)
+        self._display = {"left": None, "right": None}  # fitted thumbnail + PhotoImage per canvas
+        self._fit_pool = None
+        self._refit_after = None
 
         self._build_ui()
+        self.bind("<Escape>", self.cancel_pending)
+        self.bind("<Control-z>", self.undo)
+        self.bind("<Control-y>", self.redo)
+        self.bind("<Control-Z>", self.redo)  # Ctrl+Shift+Z
+        self.bind("<Left>", lambda e: self.step_image(-1))
+        self.bind("<Right>", lambda e: self.step_image(+1))
 
     def _build_ui(self):
         style = ttk.Style()
@@ -103,12 +131,17 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
             theme_box.bind("<<ComboboxSelected>>", on_theme_change)
             apply_big_style(self.style)
 
+        ttk.Checkbutton(top, text="Progressive preview", variable=self.progressive).pack(side=tk.LEFT, padx=12)
+        ttk.Checkbutton(top, text="Browse folder (← →)", variable=self.browse_folder,
+                        command=self._prefetch_neighbours).pack(side=tk.LEFT, padx=12)
+        ttk.Checkbutton(top, text="Record trace", variable=self.tracing,
+                        command=self._toggle_trace).pack(side=tk.LEFT, padx=12)
+
         # Developer card
         dev = ttk.Frame(top)
         dev.pack(side=tk.RIGHT, padx=20)
-        photo_path = resource_path("assets/Dev.png")
         try:
-            img = Image.open(photo_path).resize((DEV_PHOTO_SIZE, DEV_PHOTO_SIZE), Image.LANCZOS)
+            img = load_dev_photo()
             self.dev_photo_tk = ImageTk.PhotoImage(img)
             ttk.Label(dev, image=self.dev_photo_tk).grid(row=0, column=0, rowspan=2, padx=(0, 14))
         except Exception:
@@ -139,6 +172,8 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         add_btn(bar2, "Log Transform", self.apply_log, WARNING)
         add_btn(bar2, "Gamma Transform", self.apply_gamma, WARNING)
         add_btn(bar2, "Resize", self.apply_resize, SECONDARY)
+        add_btn(bar2, "Undo", self.undo, SECONDARY)
+        add_btn(bar2, "Redo", self.redo, SECONDARY)
         add_btn(bar2, "Reset", self.reset_result, DANGER)
 
         ttk.Separator(self, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=6)
@@ -160,6 +195,8 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         self.right_canvas = tk.Label(right_card, bg="#1c1f26" if USING_TTKBOOTSTRAP else "#222",
                                      fg="white", text="(no result yet)", font=("Segoe UI", 15))
         self.right_canvas.pack(fill=tk.BOTH, expand=True, padx=12, pady=12)
+        self.left_canvas.bind("<Configure>", self._on_canvas_resize)
+        self.right_canvas.bind("<Configure>", self._on_canvas_resize)
 
         # Status
         status_wrap = ttk.Frame(self); status_wrap.pack(side=tk.BOTTOM, fill=tk.X)
@@ -169,28 +206,83 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         )
 
     # ---------- Small helpers ----------
-    def _fit_preview(self, pil_img, max_w=600, max_h=600):
-        w, h = pil_img.size
-        scale = min(max_w / w, max_h / h, 1.0)
-        return pil_img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
-
-    def _pil_to_np(self, pil_img): return np.array(pil_img)
-    def _np_to_pil(self, arr):    return Image.fromarray(arr.astype(np.uint8))
+    def _pil_to_np(self, pil_img):
+        # one read-only array per source image, so its content hash is computed
+        # once (PIL images are not hashable: the memo holds the last one asked for)
+        memo = self._src_array
+        if memo is None or memo[0] is not pil_img:
+            import numpy as np
+            arr = np.array(pil_img)
+            arr.flags.writeable = False
+            memo = self._src_array = (pil_img, arr)
+        return memo[1]
+
+    def _np_to_pil(self, arr):
+        import numpy as np
+        return Image.fromarray(arr.astype(np.uint8))
 
     def _refresh_canvases(self):
-        if self.original_img_pil:
-            left = self._fit_preview(self.original_img_pil)
-            self.left_tk = ImageTk.PhotoImage(left)
-            self.left_canvas.configure(image=self.left_tk, text="")
+        # only a side whose image or canvas size changed is fitted again
+        self._show("left", self.left_canvas, self.original_preview_pil or self.original_img_pil,
+                   "Open an image…")
+        self._show("right", self.right_canvas, self.result_preview_pil or self.result_img_pil,
+                   "(no result yet)")
+
+    # ---------- Display cache ----------
+    def _canvas_box(self, canvas):
+        w, h = canvas.winfo_width() - 8, canvas.winfo_height() - 8
+        if w < 32 or h < 32:  # not laid out yet
+            return PREVIEW_SIZE, PREVIEW_SIZE
+        return w, h
+
+    def _show(self, side, canvas, img, placeholder):
+        entry = self._display[side]
+        if img is None:
+            self._display[side] = None
+            canvas.configure(image="", text=placeholder)
+            return
+        box = self._canvas_box(canvas)
+        if entry is not None and entry["src"] is img and entry["box"] == box:
+            return
+
+        from algorithms.preview import fit_image
+        entry = {"src": img, "box": box}
+        self._display[side] = entry
+        if img.width * img.height <= SYNC_FIT_PIXELS:
+            self._set_photo(side, canvas, entry, fit_image(img, *box))
+            return
+
+        # big image: fit on a worker, keep showing the previous thumbnail meanwhile
+        if self._fit_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._fit_pool = ThreadPoolExecutor(max_workers=2)
+        img.load()  # decode here; the worker only reads pixels
+        future = self._fit_pool.submit(fit_image, img, *box)
+        def poll():
+            if not future.done():
+                self.after(15, poll)
+            elif self._display[side] is entry and future.exception() is None:
+                self._set_photo(side, canvas, entry, future.result())
+        self.after(15, poll)
+
+    def _set_photo(self, side, canvas, entry, thumb):
+        photo = ImageTk.PhotoImage(thumb)  # Tk objects only on the main thread
+        entry["photo"] = photo
+        if side == "left":
+            self.left_tk = photo
         else:
-            self.left_canvas.configure(image="", text="Open an image…")
+            self.right_tk = photo
+        canvas.configure(image=photo, text="")
 
-        if self.result_img_pil:
-            right = self._fit_preview(self.result_img_pil)
-            self.right_tk = ImageTk.PhotoImage(right)
-            self.right_canvas.configure(image=self.right_tk, text="")
-        else:
-            self.right_canvas.configure(image="", text="(no result yet)")
+    def _on_canvas_resize(self, event=None):
+        # refit once the window has settled rather than on every drag step
+        if self._refit_after is not None:
+            self.after_cancel(self._refit_after)
+        self._refit_after = self.after(150, self._refit)
+
+    def _refit(self):
+        self._refit_after = None
+        self._refresh_canvases()
 
     # ---------- Centering helper ----------
     def _center_on_parent(self, win, pad=(0, 0)):
@@ -238,32 +330,58 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         return chosen["value"]
 
     # ---------- Source chooser ----------
-    def _choose_source_array(self):
+    def _current_recipe(self):
+        # steps from the original to the result shown, or to the one still
+        # being computed
+        job = self._pending
+        return job["recipe"] if job is not None else self.result_recipe
+
+    def _choose_source_recipe(self, name, params):
         if self.original_img_pil is None:
-            messagebox.showinfo("No image", "Open an image first.")
+            if self._loading:
+                messagebox.showinfo("Loading", "The image is still loading.")
+            else:
+                messagebox.showinfo("No image", "Open an image first.")
             return None, None
-        src_pil, src_label = self.original_img_pil, "Original"
-        if self.result_img_pil is not None:
+        from algorithms.pipeline import Pipeline
+        recipe, src_label = Pipeline(), "Original"
+        current = self._current_recipe()
+        if current:
             use_result = messagebox.askyesno(
                 "Apply To",
                 "Apply to last RESULT instead of ORIGINAL?\n\nYes = Result (last output)\nNo  = Original (input)"
             )
             if use_result:
-                src_pil, src_label = self.result_img_pil, "Result"
-        return self._pil_to_np(src_pil), src_label
+                recipe, src_label = current, "Result"
+        return recipe.then(name, **params), src_label
 
     # ---------- Progress (modal) ----------
-    def _run_with_progress(self, title, worker_fn, callback_on_done):
+    def _run_with_progress(self, title, worker_fn, callback_on_done, progress=None):
+        # with a progress token the bar is determinate, shows percent / ETA and
+        # the dialog gets a Cancel button; the worker raises Cancelled
         modal = tk.Toplevel(self)
         modal.title(title)
-        modal.geometry("380x120")
+        modal.geometry("380x170" if progress is not None else "380x120")
         modal.resizable(False, False)
         modal.transient(self)
         modal.grab_set()
 
         ttk.Label(modal, text=title, font=("Segoe UI", 12, "bold")).pack(pady=(12, 6))
-        pb = ttk.Progressbar(modal, mode="indeterminate", length=300)
-        pb.pack(pady=8); pb.start(10)
+        if progress is None:
+            pb = ttk.Progressbar(modal, mode="indeterminate", length=300)
+            pb.pack(pady=8); pb.start(10)
+        else:
+            pb = ttk.Progressbar(modal, mode="determinate", length=300, maximum=100)
+            pb.pack(pady=(8, 2))
+            detail = tk.StringVar(value="Starting…")
+            ttk.Label(modal, textvariable=detail, font=("Segoe UI", 10)).pack()
+            def cancel():
+                progress.cancel()
+                detail.set("Cancelling…")
+                cancel_btn.configure(state="disabled")
+            cancel_btn = ttk.Button(modal, text="Cancel", width=12, command=cancel)
+            cancel_btn.pack(pady=(8, 10))
+            modal.protocol("WM_DELETE_WINDOW", cancel)
 
         # center the modal after layout
         self._center_on_parent(modal)
@@ -281,63 +399,386 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
 
         def poll():
             if t.is_alive():
+                if progress is not None and not progress.cancelled:
+                    pb["value"] = progress.fraction * 100
+                    detail.set(self._progress_text(progress))
                 modal.after(100, poll)
             else:
                 pb.stop(); modal.grab_release(); modal.destroy()
                 if result_container["ok"]:
                     callback_on_done(result_container["value"])
+                elif self._is_cancelled(result_container["error"]):
+                    self.status.set(f"Cancelled: {title.rstrip('…')}")
                 else:
                     messagebox.showerror("Operation failed", str(result_container["error"]))
         modal.after(150, poll)
 
+    @staticmethod
+    def _progress_text(progress):
+        eta = progress.eta()
+        text = f"{progress.fraction * 100:.0f}%"
+        if eta is not None:
+            text += f"   ·   about {eta:.0f}s left" if eta >= 1 else "   ·   almost done"
+        return text
+
+    @staticmethod
+    def _is_cancelled(error):
+        from algorithms.progress import Cancelled
+        return isinstance(error, Cancelled)
+
+    # ---------- Progressive (preview first, full resolution in background) ----------
+    def _run_progressive(self, label, preview_fn, worker_fn, callback_on_done, progress=None,
+                         recipe=None):
+        self._job_seq += 1
+        seq = self._job_seq
+        state = {"preview": None, "value": None, "error": None, "shown": False, "finished": False}
+
+        def run():
+            try:
+                state["preview"] = preview_fn()
+            except Exception:
+                pass  # no preview; the full result still comes
+            try:
+                state["value"] = worker_fn()
+            except Exception as e:
+                state["error"] = e
+
+        t = threading.Thread(target=run, daemon=True)
+
+        def finish():
+            # idempotent; also called right after a forced wait on the thread
+            if state["finished"]:
+                return
+            state["finished"] = True
+            self._pending = None
+            self.result_preview_pil = None
+            if seq != self._job_seq:
+                return  # superseded by open/reset
+            if state["error"] is None:
+                callback_on_done(state["value"])
+            elif self._is_cancelled(state["error"]):
+                self._refresh_canvases()
+                self.status.set(f"Cancelled: {label}")
+            else:
+                self._refresh_canvases()
+                messagebox.showerror("Operation failed", str(state["error"]))
+
+        def poll():
+            if state["finished"]:
+                return
+            if seq == self._job_seq and state["preview"] is not None and not state["shown"]:
+                state["shown"] = True
+                p = state["preview"]
+                self.result_preview_pil = p if isinstance(p, Image.Image) else self._np_to_pil(p)
+                self._refresh_canvases()
+            if state["shown"] and progress is not None and not progress.cancelled:
+                self.status.set(f"{label}: preview shown, full resolution "
+                                f"{self._progress_text(progress)}   (Esc to cancel)")
+            if t.is_alive():
+                self.after(50, poll)
+            else:
+                finish()
+
+        self._pending = {"thread": t, "finish": finish, "label": label, "progress": progress,
+                         "recipe": recipe}
+        self.status.set(f"{label}…")
+        t.start()
+        self.after(30, poll)
+
+    def _wait_for_pending(self, then):
+        # Save and chained operations always need the full-resolution result;
+        # returns True if `then` was deferred until the running job is done
+        job = self._pending
+        if job is None or not job["thread"].is_alive():
+            if job is not None:
+                job["finish"]()
+            return False
+        def done(_):
+            job["finish"]()
+            if job["progress"] is None or not job["progress"].cancelled:
+                then()
+        self._run_with_progress(f"Finishing {job['label']}…", lambda: job["thread"].join(), done,
+                                job["progress"])
+        return True
+
+    def _drop_pending(self):
+        job = self._pending
+        if job is not None and job["progress"] is not None:
+            job["progress"].cancel()  # stop computing a result nobody will see
+        self._job_seq += 1
+        self._pending = None
+        self.result_preview_pil = None
+
+    def cancel_pending(self, event=None):
+        job = self._pending
+        if job is not None and job["progress"] is not None:
+            job["progress"].cancel()
+
     # ---------- Actions ----------
     def open_image(self):
-        path = filedialog.askopenfilename(filetypes=[("Images","*.png;*.jpg;*.jpeg;*.bmp")])
+        path = filedialog.askopenfilename(filetypes=[("Images","*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff"),
+                                                     ("Recipe","*.json")])
         if not path: return
+        if path.lower().endswith(".json"):
+            self.open_recipe(path)
+        else:
+            self._open_path(path)
+
+    def open_recipe(self, path):
+        # replay a saved recipe on the current original
+        if self.original_img_pil is None:
+            return messagebox.showinfo("No image", "Open an image first, then the recipe.")
+        from algorithms.pipeline import Pipeline
         try:
-            img = Image.open(path)
-            if img.mode not in ("L","RGB"): img = img.convert("RGB")
-            self.original_img_pil, self.result_img_pil = img, None
+            recipe = Pipeline.load(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return messagebox.showerror("Open failed", f"Not a recipe: {e}")
+        self._apply_recipe(recipe, f"Recipe {os.path.basename(path)}")
+
+    def _get_loader(self):
+        if self._loader is None:
+            from algorithms.loader import ImageLoader
+            self._loader = ImageLoader()
+        return self._loader
+
+    def _open_path(self, path):
+        # decoding runs in the background: JPEGs show a reduced-resolution
+        # draft first, the full image replaces it when ready
+        loader = self._get_loader()
+        self._load_seq += 1
+        seq = self._load_seq
+        self._loading = path
+        full = loader.full(path)
+        draft = None if full.done() else loader.draft(path, *self._canvas_box(self.left_canvas))
+        state = {"draft_shown": False}
+        self.status.set(f"Opening: {path}…")
+
+        def show(original, preview):
+            self._drop_pending()
+            self.original_img_pil, self.original_preview_pil = original, preview
+            self._src_array = None
+            self.result_img_pil = None
+            self.result_recipe = None
+            if self.history is not None:
+                self.history.clear()
             self._refresh_canvases()
+
+        def poll():
+            if seq != self._load_seq:
+                return  # another file was opened meanwhile
+            if draft is not None and not state["draft_shown"] and draft.done() and not full.done():
+                state["draft_shown"] = True
+                if draft.exception() is None and draft.result() is not None:
+                    show(None, draft.result())
+            if not full.done():
+                self.after(20, poll)
+                return
+            self._loading = None
+            if full.exception() is not None:
+                if state["draft_shown"]:
+                    show(None, None)
+                messagebox.showerror("Open failed", str(full.exception()))
+                return
+            show(full.result(), None)
+            self.current_path = path
             self.status.set(f"Opened: {path}")
-        except Exception as e:
-            messagebox.showerror("Open failed", str(e))
+            self._prefetch_neighbours()
+        poll()
+
+    def step_image(self, delta):
+        # previous / next image in the folder of the current one
+        if not self.browse_folder.get(): return
+        current = self._loading or self.current_path
+        if not current: return
+        from algorithms.loader import neighbours
+        target = neighbours(current)[0 if delta < 0 else 1]
+        if target: self._open_path(target)
+
+    def _prefetch_neighbours(self):
+        if self.browse_folder.get() and self.current_path:
+            from algorithms.loader import neighbours
+            self._get_loader().prefetch(neighbours(self.current_path))
 
     def save_result(self):
+        if self._wait_for_pending(self.save_result): return
         if not self.result_img_pil:
             messagebox.showinfo("No result","No processed image yet."); return
         path = filedialog.asksaveasfilename(defaultextension=".png",
-                filetypes=[("PNG","*.png"),("JPEG","*.jpg;*.jpeg"),("BMP","*.bmp")])
+                filetypes=[("PNG","*.png"),("JPEG","*.jpg;*.jpeg"),("BMP","*.bmp"),("TIFF","*.tif;*.tiff"),
+                           ("Recipe (JSON)","*.json")])
         if not path: return
+        if path.lower().endswith(".json"):
+            try:
+                self.result_recipe.save(path)
+                self.status.set(f"Saved recipe ({self.result_recipe.describe()}): {path}")
+            except Exception as e:
+                messagebox.showerror("Save failed", str(e))
+            return
+
+        # encoding runs in the background; big PNGs report progress per band
+        from algorithms.saver import PRESETS, format_for, save_image
         try:
-            self.result_img_pil.save(path); self.status.set(f"Saved: {path}")
-        except Exception as e:
-            messagebox.showerror("Save failed", str(e))
+            fmt = format_for(path)
+        except ValueError as e:
+            return messagebox.showerror("Save failed", str(e))
+        opts = {}
+        presets = PRESETS.get(fmt)
+        if presets:
+            choice = self._ask_choice("Save As", f"{fmt} encoding:", list(presets), initial=0)
+            if choice is None: return
+            opts = presets[choice]
+
+        from algorithms.progress import Progress
+        progress = Progress()
+        img = self.result_img_pil
+        t0 = time.perf_counter()
+        def done(size):
+            self.status.set(f"Saved: {path} ({size / (1 << 20):.1f} MB in {time.perf_counter() - t0:.1f}s)")
+        self._run_with_progress("Saving…", lambda: save_image(img, path, progress, **opts), done, progress)
 
     def reset_result(self):
+        self._drop_pending()
+        if self.result_recipe is not None:
+            self._get_history().push(None, "Reset", None)
         self.result_img_pil = None
+        self.result_recipe = None
         self._refresh_canvases()
         self.status.set("Reset to original")
 
-    # Generic apply with source + progress
-    def _apply_with_source(self, compute_func, label):
-        src_arr, src_label = self._choose_source_array()
-        if src_arr is None: return
+    # ---------- Undo / redo ----------
+    def undo(self, event=None):
+        self._step_history(-1)
+
+    def redo(self, event=None):
+        self._step_history(+1)
 
-        def worker(): return compute_func(src_arr)
+    def _step_history(self, delta):
+        # a running job is cancelled first; otherwise stored results are shown
+        # at once and dropped ones recomputed from their recipe
+        if self._pending is not None:
+            label = self._pending["label"]
+            self._drop_pending()
+            self._refresh_canvases()
+            self.status.set(f"Cancelled: {label}")
+            return
+        word = "Undo" if delta < 0 else "Redo"
+        history = self.history
+        entry = history.neighbour(delta) if history is not None else None
+        if entry is None or self.original_img_pil is None:
+            self.status.set(f"Nothing to {word.lower()}")
+            return
+        label = (history.current if delta < 0 else entry).label  # the step undone / redone
+
+        def show(arr):
+            history.step(delta)
+            self.result_recipe = entry.recipe
+            self.result_img_pil = None if arr is None else self._np_to_pil(arr)
+            self._refresh_canvases()
+            self.status.set(f"{word}: {label}   ·   {history.stats()}")
+            self._trim_history()
+
+        arr = history.peek(entry)
+        if arr is not None or entry.recipe is None:
+            show(arr)
+            return
+        from algorithms.progress import Progress
+        progress = Progress()
+        src_arr = self._pil_to_np(self.original_img_pil)
+        self._run_with_progress(f"{word}: recomputing {entry.label}…",
+                                lambda: history.image(entry, src_arr, progress), show, progress)
+
+    def _get_history(self):
+        if self.history is None:
+            from algorithms.history import History
+            self.history = History.from_env()
+        return self.history
+
+    def _trim_history(self):
+        # compressing old steps takes a moment on big images; keep it off the UI thread
+        threading.Thread(target=self.history.trim, daemon=True).start()
+
+    # Generic apply: a recipe on the original, with progress
+    def _apply_recipe(self, recipe, label, src_label="Original"):
+        # The result is always the recipe evaluated on the original. Every
+        # result is cached by source content + steps, so a recipe that extends
+        # the current one only computes its new steps; a job still computing
+        # an older result is dropped rather than waited for.
+        self._drop_pending()
+        src_arr = self._pil_to_np(self.original_img_pil)
+        cache = self._get_cache()
+
+        from algorithms.progress import Progress
+        from algorithms import registry, trace
+        progress = Progress()
+        timing = {}
+        def worker():
+            with trace.span(label, src_arr, cat="ui", source=src_label, steps=len(recipe)) as rec:
+                out = recipe.run(src_arr, progress, cache=cache, parallel=True)
+                rec["out"] = trace.shape_of(out)
+            timing.update(rec)
+            return out
         def on_done(out):
             if isinstance(out, Image.Image):
                 self.result_img_pil = out
             else:
                 self.result_img_pil = self._np_to_pil(out)
+            self.result_recipe = recipe
+            self._get_history().push(recipe, label, out)
+            self._trim_history()
             self._refresh_canvases()
-            self.status.set(f"Applied {label} (on {src_label})")
+            steps = f", {len(recipe)} steps" if len(recipe) > 1 else ""
+            self.status.set(f"Applied {label} (on {src_label}{steps})   ·   {trace.summary(timing)}"
+                            + self._cache_status())
+
+        box = self._canvas_box(self.right_canvas)
+        if all(registry.has_preview(name) for name, _ in recipe) and self.progressive.get() and \
+                max(src_arr.shape[:2]) > PREVIEW_SIZE:
+            self._run_progressive(label, lambda: recipe.preview(src_arr, *box), worker, on_done,
+                                  progress, recipe)
+        else:
+            self._run_with_progress(f"{label}…", worker, on_done, progress)
+
+    def _apply_op(self, name, label, **params):
+        # registry operation added to the original's or the result's recipe
+        recipe, src_label = self._choose_source_recipe(name, params)
+        if recipe is None: return
+        self._apply_recipe(recipe, label, src_label)
+
+    def _toggle_trace(self):
+        # on: record every operation (time, CPU, peak memory, shapes);
+        # off: save what was recorded as Chrome trace-event JSON
+        from algorithms import trace
+        if self.tracing.get():
+            trace.clear()
+            trace.enable(memory=True)
+            self.status.set("Recording trace…")
+            return
+        trace.disable()
+        records = trace.events()
+        if not records:
+            self.status.set("Trace stopped (nothing recorded)"); return
+        path = filedialog.asksaveasfilename(title="Save trace", defaultextension=".json",
+                                            initialfile="image-toolkit-trace.json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if not path: return
+        try:
+            trace.write(path, records)
+            self.status.set(f"Trace saved: {path} (open in chrome://tracing or ui.perfetto.dev)")
+        except Exception as e:
+            messagebox.showerror("Save failed", str(e))
 
-        self._run_with_progress(f"{label}…", worker, on_done)
+    def _get_cache(self):
+        if self.result_cache is None:
+            from algorithms.cache import ResultCache
+            self.result_cache = ResultCache.from_env()
+        return self.result_cache
+
+    def _cache_status(self):
+        return f"   ·   {self.result_cache.stats()}" if self.result_cache is not None else ""
 
     # Operations
     def apply_negative_exact(self):
-        self._apply_with_source(lambda a: image_negative_exact(a, True), "Negative")
+        self._apply_op("negative", "Negative", force_gray=True)
 
     def apply_threshold(self):
         if self.original_img_pil is None and self.result_img_pil is None:
@@ -345,7 +786,7 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         t = simpledialog.askinteger("Threshold", "Enter threshold (0–255):",
                                     minvalue=0, maxvalue=255, initialvalue=150)
         if t is None: return
-        self._apply_with_source(lambda a: threshold_loop(a, t=int(t)), f"Threshold (t={t})")
+        self._apply_op("threshold", f"Threshold (t={t})", t=int(t))
 
     # ----- Smoothing with choices (Mean / Weighted / Gaussian + Low/Med/High) -----
     def apply_smoothing(self):
@@ -366,14 +807,27 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         strength = self._ask_choice(
             "Strength",
             "Choose smoothing strength:",
-            ["Low", "Medium", "High"],
+            ["Low", "Medium", "High"] + {"mean": ["Custom radius…"],
+                                         "gaussian": ["Custom sigma…"]}.get(mode, []),
             initial=1
         )
         if strength is None: return
+        if strength == "Custom radius…":
+            r = simpledialog.askinteger("Box radius", "Radius in pixels (window is 2r+1 wide):",
+                                        minvalue=1, maxvalue=1000, initialvalue=5)
+            if r is None: return
+            self._apply_op("smooth", f"Smoothing - Mean box / radius {r}", mode=mode, radius=int(r))
+            return
+        if strength == "Custom sigma…":
+            sg = simpledialog.askfloat("Gaussian sigma", "Sigma in pixels:",
+                                       minvalue=0.1, maxvalue=500.0, initialvalue=2.0)
+            if sg is None: return
+            self._apply_op("smooth", f"Smoothing - Gaussian / σ={sg:.3g}", mode=mode, sigma=float(sg))
+            return
         strength = strength.lower()
 
-        self._apply_with_source(lambda a: smooth_image(a, mode=mode, strength=strength),
-                                f"Smoothing - {filt} / {strength.capitalize()}")
+        self._apply_op("smooth", f"Smoothing - {filt} / {strength.capitalize()}",
+                       mode=mode, strength=strength)
 
     # ----- Sharpening with choices (First/Second order + Low/Med/High) -----
     def apply_sharpening(self):
@@ -395,24 +849,24 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
         if strength is None: return
         strength = strength.lower()
 
-        self._apply_with_source(lambda a: sharpen_image(a, kind=kind, strength=strength),
-                                f"Sharpening - {kind_label} / {strength.capitalize()}")
+        self._apply_op("sharpen", f"Sharpening - {kind_label} / {strength.capitalize()}",
+                       kind=kind, strength=strength)
 
     def apply_laplacian(self):
-        self._apply_with_source(laplacian_manual, "Laplacian Edge")
+        self._apply_op("laplacian", "Laplacian Edge")
 
     def apply_histogram_to_result(self):
-        self._apply_with_source(lambda a: render_histogram_image(a, figsize=(8, 5)), "Histogram")
+        self._apply_op("histogram", "Histogram", figsize=(8, 5))
 
     def apply_log(self):
-        self._apply_with_source(log_transform_manual, "Log Transform")
+        self._apply_op("log", "Log Transform")
 
     def apply_gamma(self):
         if self.original_img_pil is None and self.result_img_pil is None:
             return messagebox.showinfo("No image","Open an image first.")
         g = simpledialog.askfloat("Gamma","Enter gamma (>0):",minvalue=0.01,maxvalue=20.0,initialvalue=2.2)
         if g is None: return
-        self._apply_with_source(lambda a: gamma_transform_manual(a, g), f"Gamma Transform (γ={g:.3g})")
+        self._apply_op("gamma", f"Gamma Transform (γ={g:.3g})", gamma=g)
 
     def apply_resize(self):
         if self.original_img_pil is None and self.result_img_pil is None:
@@ -424,8 +878,50 @@ class App(tk.Tk if not USING_TTKBOOTSTRAP else tb.Window):
             if w < 1 or h < 1 or w > 10000 or h > 10000: raise ValueError
         except Exception:
             return messagebox.showerror("Resize","Invalid size, e.g. 800,600")
-        self._apply_with_source(lambda a: resize_nearest_manual(a, w, h), f"Resize {w}x{h}")
+
+        method = self._ask_choice(
+            "Resize",
+            "Choose resampling method:",
+            ["Nearest neighbour", "Bilinear", "Area average", "Pyramid (2× box)"],
+            initial=0
+        )
+        if method is None: return
+        mode = {"Nearest neighbour": "nearest", "Bilinear": "bilinear",
+                "Area average": "area", "Pyramid (2× box)": "pyramid"}[method]
+        self._apply_op("resize", f"Resize {w}x{h} ({method})", new_w=w, new_h=h, mode=mode)
+
+
+def _profile_startup(app, target=None):
+    # --profile-startup[=FILE]: report cold-start timings once the first frame
+    # is drawn, then quit. FILE gets one JSON line per run for tracking.
+    t_ui = time.perf_counter()
+
+    def report():
+        t_idle = time.perf_counter()
+        timings = {
+            "imports_ms": round((_T_IMPORTS - _T_START) * 1000, 1),
+            "build_ui_ms": round((t_ui - _T_IMPORTS) * 1000, 1),
+            "first_frame_ms": round((t_idle - t_ui) * 1000, 1),
+            "total_ms": round((t_idle - _T_START) * 1000, 1),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        line = json.dumps(timings)
+        if sys.stdout is not None:
+            print(line, flush=True)
+        if target:
+            with open(target, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        app.destroy()
+
+    app.after_idle(lambda: app.after(0, report))
 
 
 if __name__ == "__main__":
-    App().mainloop()
+    import multiprocessing
+    multiprocessing.freeze_support()  # worker processes in the PyInstaller build
+    app = App()
+    for arg in sys.argv[1:]:
+        if arg == "--profile-startup" or arg.startswith("--profile-startup="):
+            _profile_startup(app, arg.partition("=")[2] or None)
+    app.mainloop()
@@ -0,0 +1,257 @@
+"""Headless batch runner: apply an operation pipeline to every image matching a glob.
+
+    python batch.py "shoot/*.jpg" -o out --op gamma:gamma=2.2 --op threshold:t=128 -j 8
+    python batch.py "shoot/*.jpg" -o out --pipeline recipe.json
+
+A recipe saved from the app (Save Result As → Recipe) replays with
+--pipeline; --op steps given as well are appended to it.
+
+Operations (applied in the given order):
+    negative[:force_gray=1]   threshold:t=150        log
+    gamma:gamma=2.2           smooth:mode=mean,strength=medium
+    smooth:mode=mean,radius=15  smooth:mode=gaussian,sigma=4.5
+    sharpen:kind=first,strength=medium               laplacian
+    resize:w=800,h=600[,mode=nearest|bilinear|area|pyramid]     histogram
+
+Encoder options go in --encode, e.g. --encode compress_level=9 for smaller
+PNGs or --encode quality=85,progressive=1 for JPEGs.
+
+Finished files are written atomically, so an interrupted run can be started
+again with the same arguments and only the missing outputs are computed.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, wait
+
+STATE_FILE = ".batch.json"
+_ALIASES = {"resize": {"w": "new_w", "h": "new_h", "width": "new_w", "height": "new_h"}}
+
+def _value(text):
+    for conv in (int, float):
+        try:
+            return conv(text)
+        except ValueError:
+            pass
+    low = text.lower()
+    if low in ("true", "yes", "on"): return True
+    if low in ("false", "no", "off"): return False
+    return text
+
+def parse_params(text: str, aliases=None) -> dict:
+    # "k=v,k2=v2" -> {k: v, k2: v2} with numbers / booleans converted
+    params = {}
+    for item in filter(None, (a.strip() for a in text.split(","))):
+        key, eq, val = item.partition("=")
+        if not eq:
+            raise ValueError(f"Bad parameter {item!r} in {text!r} (expected key=value)")
+        key = (aliases or {}).get(key.strip(), key.strip())
+        params[key] = _value(val.strip())
+    return params
+
+def parse_op(spec: str):
+    name, _, args = spec.partition(":")
+    name = name.strip().lower()
+    params = parse_params(args, _ALIASES.get(name))
+    if name == "negative" and "force_gray" in params:
+        params["force_gray"] = bool(params["force_gray"])
+    return name, params
+
+def run_steps(img_np, steps, cache_dir=None):
+    # the steps as a Pipeline: consecutive point ops are folded into one
+    # lookup table; with cache_dir the result of the longest already computed
+    # prefix is looked up by source content + steps first
+    from algorithms.pipeline import Pipeline
+    cache = None
+    if cache_dir:
+        from algorithms.cache import ResultCache
+        cache = ResultCache(0, cache_dir)
+    return Pipeline(steps).run(img_np, cache=cache)
+
+def _process_file(src, dst, steps, save_params, cache_dir=None, traced=False):
+    # returns (pixels, seconds, trace records); records only with traced=True
+    from PIL import Image
+    from algorithms import trace
+
+    if traced:
+        trace.enable(memory=True)
+    t0 = time.perf_counter()
+    with trace.span(os.path.basename(src), cat="file", path=src):
+        with trace.span("decode", cat="io") as rec:
+            img = Image.open(src)
+            if img.mode not in ("L", "RGB"): img = img.convert("RGB")
+            arr = np.array(img)
+            rec["out"] = trace.shape_of(arr)
+        with trace.span("pipeline", arr, cat="steps", steps=len(steps)) as rec:
+            out = run_steps(arr, steps, cache_dir)
+            rec["out"] = trace.shape_of(out)
+
+        with trace.span("encode", out, cat="io"):
+            from algorithms.saver import save_image
+            os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+            save_image(out, dst, **save_params)
+    return arr.shape[0] * arr.shape[1], time.perf_counter() - t0, trace.drain()
+
+def _glob_base(pattern: str) -> str:
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    base = os.sep.join(parts)
+    if base == os.path.normpath(pattern):  # no wildcard at all
+        base = os.path.dirname(base)
+    return base or "."
+
+def plan(pattern, out_dir, fmt=None):
+    base = _glob_base(pattern)
+    jobs = []
+    for src in sorted(glob.glob(pattern, recursive=True)):
+        if not os.path.isfile(src):
+            continue
+        rel = os.path.relpath(src, base)
+        root, ext = os.path.splitext(rel)
+        jobs.append((src, os.path.join(out_dir, root + ("." + fmt.lstrip(".") if fmt else ext))))
+    return jobs
+
+def _check_state(out_dir, steps, overwrite):
+    path = os.path.join(out_dir, STATE_FILE)
+    state = {"steps": [[n, p] for n, p in steps]}
+    if os.path.exists(path) and not overwrite:
+        with open(path, encoding="utf-8") as f:
+            old = json.load(f)
+        if old.get("steps") != state["steps"]:
+            raise SystemExit(f"{out_dir} holds results of a different pipeline; "
+                             "use another output directory or --overwrite")
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+def _progress(done, total, skipped, mpix, t0, stream):
+    dt = max(1e-9, time.perf_counter() - t0)
+    fps = (done - skipped) / dt
+    eta = (total - done) / fps if fps > 0 else float("inf")
+    eta_s = f"{eta:5.0f}s" if eta != float("inf") else "    ?"
+    stream.write(f"\r[{done}/{total}] {fps:6.2f} files/s  {mpix / dt:7.1f} MP/s  ETA {eta_s}")
+    stream.flush()
+
+def run(pattern, out_dir, steps, workers=None, fmt=None, overwrite=False, save_params=None,
+        cache_dir=None, trace_path=None, stream=sys.stderr):
+    jobs = plan(pattern, out_dir, fmt)
+    if not jobs:
+        raise SystemExit(f"No files match {pattern!r}")
+    from algorithms.saver import format_for, encoder_options
+    try:
+        for fmt in {format_for(d) for _, d in jobs}:
+            encoder_options(fmt, **(save_params or {}))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    _check_state(out_dir, steps, overwrite)
+
+    todo = [(s, d) for s, d in jobs if overwrite or not os.path.exists(d)]
+    skipped = len(jobs) - len(todo)
+    done, mpix, failed, records_all = skipped, 0.0, [], []
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+
+    # bounded number of files in flight: decode, compute and encode of
+    # different files overlap across the workers without piling up memory
+    from algorithms.parallel import process_pool
+    with process_pool(workers) as pool:
+        queue = iter(todo)
+        running = {}
+        try:
+            while True:
+                while len(running) < 2 * workers:
+                    job = next(queue, None)
+                    if job is None:
+                        break
+                    running[pool.submit(_process_file, *job, steps, save_params or {}, cache_dir,
+                                        bool(trace_path))] = job
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    src, _dst = running.pop(fut)
+                    try:
+                        pixels, _, records = fut.result()
+                        mpix += pixels / 1e6
+                        records_all.extend(records)
+                    except Exception as e:
+                        failed.append((src, e))
+                        stream.write(f"\nFailed: {src}: {e}\n")
+                    done += 1
+                _progress(done, len(jobs), skipped, mpix, t0, stream)
+        except KeyboardInterrupt:
+            for fut in running:
+                fut.cancel()
+            stream.write("\nInterrupted; run the same command again to resume.\n")
+            raise SystemExit(130)
+
+    stream.write(f"\nDone: {len(todo) - len(failed)} processed, {skipped} already present, "
+                 f"{len(failed)} failed in {time.perf_counter() - t0:.1f}s\n")
+    if trace_path:
+        from algorithms import trace
+        trace.write(trace_path, records_all)
+        stream.write(f"Trace written to {trace_path}\n")
+    return failed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Apply an operation pipeline to many images.",
+                                 formatter_class=argparse.RawDescriptionHelpFormatter,
+                                 epilog=__doc__)
+    ap.add_argument("input", help='input glob, e.g. "photos/**/*.jpg" (quote it)')
+    ap.add_argument("-o", "--out", required=True, help="output directory")
+    ap.add_argument("--op", action="append", default=[], metavar="NAME[:k=v,...]",
+                    help="operation to apply; repeat for a pipeline")
+    ap.add_argument("--pipeline", default=None, metavar="FILE",
+                    help="recipe JSON saved from the app; --op steps are added after it")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--format", default=None, help="output extension, e.g. png (default: same as input)")
+    ap.add_argument("--encode", default="", metavar="k=v,...",
+                    help="encoder options, e.g. compress_level=9 (PNG), quality=85,progressive=1 "
+                         "(JPEG), compression=lzw (TIFF)")
+    ap.add_argument("--overwrite", action="store_true", help="recompute files that already exist")
+    ap.add_argument("--cache-dir", default=None,
+                    help="keep results here, keyed by image content and pipeline, and reuse them")
+    ap.add_argument("--impl", default=None, metavar="SPEC",
+                    help="implementation to run, e.g. numpy or resize=reference,smooth=reference "
+                         "(default: the fastest available)")
+    ap.add_argument("--trace", default=None, metavar="FILE",
+                    help="write per-file / per-step timings and peak memory as Chrome trace JSON")
+    args = ap.parse_args(argv)
+
+    if not args.op and not args.pipeline:
+        ap.error("give at least one --op or a --pipeline")
+    steps = []
+    if args.pipeline:
+        from algorithms.pipeline import Pipeline
+        try:
+            steps = list(Pipeline.load(args.pipeline))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            ap.error(f"cannot read pipeline {args.pipeline!r}: {e}")
+    try:
+        steps += [parse_op(s) for s in args.op]
+        save_params = parse_params(args.encode)
+    except ValueError as e:
+        ap.error(str(e))
+    from algorithms import registry
+    try:
+        registry.use(args.impl)
+    except ValueError as e:
+        ap.error(str(e))
+    for name, _ in steps:
+        if name not in registry.names():
+            ap.error(f"unknown operation {name!r}; choose from {', '.join(registry.names())}")
+
+    failed = run(args.input, args.out, steps, args.workers, args.format, args.overwrite,
+                 save_params, cache_dir=args.cache_dir, trace_path=args.trace)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
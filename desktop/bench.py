@@ -0,0 +1,198 @@
+"""Benchmark the algorithms on synthetic images and compare against a baseline.
+
+    python bench.py                                  # default sizes, gray + RGB
+    python bench.py --sizes all --json base.json     # up to 50 MP, save results
+    python bench.py --baseline base.json             # flag regressions (exit code 1)
+    python bench.py -k smooth --backend thread       # subset, banded across cores
+
+Each case reports the best of --repeat runs as megapixels per second and the
+peak memory allocated during one extra run (tracemalloc), beyond the input.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+SIZES = {
+    "thumb": (160, 120),
+    "vga": (640, 480),
+    "2mp": (1920, 1080),
+    "12mp": (4000, 3000),
+    "50mp": (8660, 5774),
+}
+DEFAULT_SIZES = ("thumb", "vga", "2mp", "12mp")
+KINDS = ("gray", "rgb")
+BACKENDS = ("direct", "thread", "process")
+
+def _half(shape):
+    return {"new_w": max(1, shape[1] // 2), "new_h": max(1, shape[0] // 2)}
+
+# (case, registry op, module, public function, params or params(shape))
+CASES = [
+    ("negative", "negative", "negative", "image_negative_exact", {"force_gray": True}),
+    ("threshold", "threshold", "threshold", "threshold_loop", {"t": 150}),
+    *[(f"smooth-{m}-{s}", "smooth", "smoothing", "smooth_image", {"mode": m, "strength": s})
+      for m in ("mean", "weighted", "gaussian") for s in ("low", "medium", "high")],
+    *[(f"smooth-box-r{r}", "smooth", "smoothing", "smooth_image", {"mode": "mean", "radius": r})
+      for r in (1, 10, 100)],
+    *[(f"smooth-gauss-s{g}", "smooth", "smoothing", "smooth_image", {"mode": "gaussian", "sigma": g})
+      for g in (1, 5, 50)],
+    *[(f"sharpen-{k}", "sharpen", "sharpening", "sharpen_image", {"kind": k, "strength": "medium"})
+      for k in ("first", "second")],
+    ("laplacian", "laplacian", "edges", "laplacian_manual", {}),
+    ("histogram", "histogram", "histogram", "compute_histogram_manual", {}),
+    ("log", "log", "log_gamma", "log_transform_manual", {}),
+    ("gamma", "gamma", "log_gamma", "gamma_transform_manual", {"gamma": 2.2}),
+    ("resize-half", "resize", "resize", "resize_nearest_manual", _half),
+]
+
+def make_image(size, kind, seed=0):
+    # deterministic noise over a gradient, so every intensity occurs
+    W, H = size
+    rng = np.random.default_rng(seed)
+    shape = (H, W) if kind == "gray" else (H, W, 3)
+    ramp = np.linspace(0, 255, W, dtype=np.float32)
+    img = rng.integers(0, 64, size=shape, dtype=np.uint8)
+    img += (ramp[None, :] if kind == "gray" else ramp[None, :, None]).astype(np.uint8) // 4 * 3
+    img.flags.writeable = False
+    return img
+
+def _callable(case, backend):
+    # every call starts cold: no derivative or gray planes cached from the last run
+    from algorithms.derivatives import plane_cache
+    from algorithms.color import gray_cache
+    label, op, module, func, params = case
+    if backend == "direct":
+        from algorithms import registry
+        # numba or numpy as IMAGE_TOOLKIT_IMPL says; the reference loops are not timed
+        fn = registry.with_impl(getattr(importlib.import_module(f"algorithms.{module}"), func), op)
+    else:
+        from algorithms.parallel import run_parallel
+        fn = lambda img, **p: run_parallel(op, img, backend=backend, **p)
+    def call(img, p):
+        plane_cache().clear()
+        gray_cache().clear()
+        return fn(img, **p)
+    return call
+
+def time_case(fn, img, params, repeat=3, min_time=0.05):
+    # best per-call time; tiny images are looped until min_time has passed
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        n, t0 = 0, time.perf_counter()
+        while True:
+            fn(img, params)
+            n += 1
+            dt = time.perf_counter() - t0
+            if dt >= min_time:
+                break
+        best = min(best, dt / n)
+    return best
+
+def peak_memory(fn, img, params):
+    tracemalloc.start()
+    try:
+        fn(img, params)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run(sizes, kinds, backends, pattern=None, repeat=3, memory=True, stream=sys.stdout):
+    results = {}
+    stream.write(f"{'case':<24}{'size':>7}{'kind':>6}{'backend':>9}{'ms':>11}{'MP/s':>10}{'peak MB':>10}\n")
+    for size_name in sizes:
+        for kind in kinds:
+            img = make_image(SIZES[size_name], kind)
+            mpix = img.shape[0] * img.shape[1] / 1e6
+            for case in CASES:
+                if pattern and pattern not in case[0]:
+                    continue
+                params = case[4](img.shape) if callable(case[4]) else dict(case[4])
+                for backend in backends:
+                    fn = _callable(case, backend)
+                    fn(img, params)  # warm-up: imports, pools, cached tables
+                    sec = time_case(fn, img, params, repeat)
+                    peak = peak_memory(fn, img, params) / (1 << 20) if memory else None
+                    key = f"{case[0]}|{size_name}|{kind}|{backend}"
+                    results[key] = {"seconds": sec, "mpix_s": mpix / sec, "peak_mb": peak}
+                    stream.write(f"{case[0]:<24}{size_name:>7}{kind:>6}{backend:>9}{sec * 1e3:>11.2f}"
+                                 f"{mpix / sec:>10.1f}{peak if peak is not None else float('nan'):>10.1f}\n")
+                    stream.flush()
+    return results
+
+def compare(results, baseline, tolerance=0.15, stream=sys.stdout):
+    # cases whose throughput dropped (or peak memory grew) by more than tolerance
+    regressions = []
+    for key, cur in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if cur["mpix_s"] < old["mpix_s"] * (1 - tolerance):
+            regressions.append((key, "MP/s", old["mpix_s"], cur["mpix_s"]))
+        if cur.get("peak_mb") is not None and old.get("peak_mb") is not None \
+                and cur["peak_mb"] > old["peak_mb"] * (1 + tolerance) + 1:
+            regressions.append((key, "peak MB", old["peak_mb"], cur["peak_mb"]))
+    for key, what, old, new in regressions:
+        stream.write(f"REGRESSION {key}: {what} {old:.1f} -> {new:.1f}\n")
+    matched = sum(k in baseline for k in results)
+    stream.write(f"{len(regressions)} regression(s) in {matched} case(s) compared with the baseline\n")
+    return regressions
+
+def _meta():
+    from algorithms import jit, registry
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "jit": jit.enabled(),
+        "impl": {name: registry.implementation(name) for name in registry.names()},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the image algorithms.",
+                                 formatter_class=argparse.RawDescriptionHelpFormatter,
+                                 epilog=__doc__)
+    ap.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                    help=f"comma-separated from {', '.join(SIZES)} or 'all'")
+    ap.add_argument("--kinds", default=",".join(KINDS), help="gray, rgb or both")
+    ap.add_argument("--backend", action="append", choices=BACKENDS, default=None,
+                    help="direct call (default) or run_parallel with threads / processes; repeatable")
+    ap.add_argument("-k", "--filter", default=None, help="only cases whose name contains this")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per case, best is kept")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    ap.add_argument("--json", default=None, help="write results here (usable as a baseline)")
+    ap.add_argument("--baseline", default=None, help="compare against results saved with --json")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown, default 0.15")
+    args = ap.parse_args(argv)
+
+    sizes = list(SIZES) if args.sizes == "all" else [s.strip() for s in args.sizes.split(",")]
+    kinds = [k.strip() for k in args.kinds.split(",")]
+    for s in sizes:
+        if s not in SIZES:
+            ap.error(f"unknown size {s!r}; choose from {', '.join(SIZES)}")
+    for k in kinds:
+        if k not in KINDS:
+            ap.error(f"unknown kind {k!r}; choose from {', '.join(KINDS)}")
+
+    results = run(sizes, kinds, args.backend or ["direct"], args.filter, args.repeat, not args.no_memory)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(), "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+# tests/conftest.py
+import os
+import sys
+import numpy as np
+import pytest
+
+# the app imports its packages from the desktop directory, as when run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def make_image():
+    # seeded uint8 noise: make_image((H, W) or (H, W, C), seed=0, writeable=True)
+    def make(shape=(300, 200, 3), seed=0, writeable=True):
+        img = np.random.default_rng(seed).integers(0, 256, size=shape, dtype=np.uint8)
+        img.flags.writeable = writeable
+        return img
+    return make
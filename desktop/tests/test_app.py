@@ -0,0 +1,15 @@
+# tests/test_app.py
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image
+
+from app import App
+
+def test_pil_to_np_on_pil_images(make_image):
+    app = SimpleNamespace(_src_array=None)
+    img = Image.fromarray(make_image((40, 30, 3)))
+    arr = App._pil_to_np(app, img)
+    assert np.array_equal(arr, np.asarray(img)) and not arr.flags.writeable
+    assert App._pil_to_np(app, img) is arr  # same image: same array, hashed once
+    other = img.copy()
+    assert App._pil_to_np(app, other) is not arr
@@ -0,0 +1,46 @@
+# tests/test_batch.py
+import io
+import os
+import numpy as np
+import pytest
+from PIL import Image
+
+import batch
+
+STEPS = [("negative", {}), ("threshold", {"t": 128})]
+
+@pytest.fixture
+def shoot(tmp_path, make_image):
+    src = tmp_path / "shoot"
+    src.mkdir()
+    for i in range(3):
+        Image.fromarray(make_image((40, 30, 3), seed=i)).save(src / f"{i}.png")
+    return str(src / "*.png"), str(tmp_path / "out")
+
+def _run(shoot, steps=STEPS, **kw):
+    stream = io.StringIO()
+    failed = batch.run(*shoot, steps, workers=1, stream=stream, **kw)
+    assert failed == []
+    return stream.getvalue()
+
+def test_rerun_skips_finished_outputs(shoot):
+    pattern, out = shoot
+    assert "3 processed, 0 already present" in _run(shoot)
+    first = {name: os.stat(os.path.join(out, name)).st_mtime_ns for name in ("0.png", "1.png", "2.png")}
+    with Image.open(pattern.replace("*", "1")) as src, Image.open(os.path.join(out, "1.png")) as im:
+        assert np.array_equal(np.asarray(im), batch.run_steps(np.asarray(src), STEPS))
+
+    # an interrupted run: one output is missing, only that one is computed
+    os.remove(os.path.join(out, "2.png"))
+    assert "1 processed, 2 already present" in _run(shoot)
+    assert os.stat(os.path.join(out, "0.png")).st_mtime_ns == first["0.png"]
+    assert os.path.exists(os.path.join(out, "2.png"))
+
+def test_overwrite_recomputes_everything(shoot):
+    _run(shoot)
+    assert "3 processed, 0 already present" in _run(shoot, overwrite=True)
+
+def test_other_pipeline_in_same_output_is_refused(shoot):
+    _run(shoot)
+    with pytest.raises(SystemExit, match="different pipeline"):
+        _run(shoot, steps=[("log", {})])
@@ -0,0 +1,48 @@
+# tests/test_color.py
+import numpy as np
+import pytest
+
+from algorithms import cache, color, registry
+from algorithms.cache import ResultCache
+from algorithms.pipeline import Pipeline
+from algorithms.progress import Progress
+
+@pytest.fixture
+def grays(monkeypatch):
+    color.gray_cache().clear()
+    calls = []
+    luminance = color.luminance
+    # image-sized calls only (tables are converted too)
+    monkeypatch.setattr(color, "luminance", lambda a: (a.shape[0] > 1 and calls.append(a.shape)) or luminance(a))
+    yield calls
+    color.gray_cache().clear()
+
+def test_writable_input_is_not_hashed(grays, monkeypatch, make_image):
+    hashed = []
+    monkeypatch.setattr(cache, "content_key", lambda a: hashed.append(a.shape))
+    img = make_image()
+    assert np.array_equal(color.gray_plane(img), color.luminance_float(img).astype(np.uint8))
+    color.gray_plane(img)
+    assert hashed == [] and len(color.gray_cache()) == 0 and len(grays) == 2
+
+def test_read_only_input_is_cached(grays, make_image):
+    img = make_image(writeable=False)
+    a = color.gray_plane(img)
+    assert color.gray_plane(img) is a and len(grays) == 1
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_app_pipeline_path_computes_luminance_once(grays, parallel, make_image):
+    img = make_image(writeable=True)  # the pipeline's source key is enough
+    results = ResultCache()
+    outs = [Pipeline([("threshold", {"t": t})]).run(img, Progress(), cache=results, parallel=parallel)
+            for t in (64, 128)]
+    outs.append(Pipeline([("negative", {})]).run(img, Progress(), cache=results, parallel=parallel))
+    assert len(grays) == 1
+    assert np.array_equal(outs[0], registry.call("threshold", img, t=64))
+    assert np.array_equal(outs[2], registry.call("negative", img))
+
+def test_bands_share_the_gray_plane(grays, make_image):
+    img = make_image((700, 200, 3), writeable=False)
+    got = registry.call("threshold", img, progress=Progress(), t=100)
+    assert len(grays) == 1
+    assert np.array_equal(got, registry.call("threshold", img, t=100))
@@ -0,0 +1,67 @@
+# tests/test_derivatives.py
+import numpy as np
+import pytest
+
+from algorithms import cache, parallel, registry
+from algorithms.cache import ResultCache
+from algorithms.derivatives import plane_cache
+from algorithms.pipeline import Pipeline
+from algorithms.progress import Progress
+from algorithms.tiling import run_tiled
+
+@pytest.fixture
+def planes():
+    plane_cache().clear()
+    plane_cache().hits = plane_cache().misses = 0
+    yield plane_cache()
+    plane_cache().clear()
+
+def test_direct_calls_share_planes(planes, make_image):
+    img = make_image()
+    a = registry.call("sharpen", img, kind="second", strength="low")
+    b = registry.call("laplacian", img)
+    c = registry.call("sharpen", img, kind="second", strength="high")
+    assert len(planes) == 1 and planes.hits == 2
+    assert not np.array_equal(a, c) and b.shape == img.shape
+
+@pytest.mark.parametrize("run", [
+    lambda img, **p: registry.call("sharpen", img, progress=Progress(), **p),
+    lambda img, **p: parallel.run_parallel("sharpen", img, workers=2, **p),
+])
+def test_bands_share_the_whole_image_planes(planes, run, make_image):
+    img = make_image()
+    for strength in ("low", "high"):
+        got = run(img, kind="first", strength=strength)
+        assert np.array_equal(got, registry.call("sharpen", img.copy(), kind="first", strength=strength))
+    parallel.shutdown()
+    assert list(planes._items) == [f"{cache.content_key(img)}:sobel_l1"]
+    assert planes.hits >= 1
+
+def test_tiles_keep_no_planes(planes, make_image):
+    # out of core: a whole-image plane would not fit either
+    img = make_image()
+    got = np.asarray(run_tiled("sharpen", img, tile=64, kind="first"))
+    assert len(planes) == 0
+    assert np.array_equal(got, registry.call("sharpen", img, kind="first"))
+
+def test_app_pipeline_path_reuses_planes(planes, make_image):
+    # what the app runs: a cached Pipeline with progress on parallel bands
+    img = make_image((400, 300, 3), writeable=False)
+    results = ResultCache()
+    steps = [("sharpen", {"kind": "second", "strength": s}) for s in ("low", "medium", "high")]
+    steps.append(("laplacian", {}))
+    outs = [Pipeline([step]).run(img, Progress(), cache=results, parallel=True) for step in steps]
+    assert len(planes) == 1 and planes.hits == 3  # one Laplacian plane, then one blend per step
+    for (name, params), got in zip(steps, outs):
+        assert np.array_equal(got, registry.call(name, img.copy(), **params))
+
+def test_pipeline_keys_planes_without_rehashing(planes, monkeypatch, make_image):
+    img = make_image()
+    hashed = []
+    content_key = cache.content_key
+    monkeypatch.setattr(cache, "content_key", lambda a: hashed.append(a.shape) or content_key(a))
+    recipe = Pipeline([("gamma", {"gamma": 0.8}), ("sharpen", {"kind": "second"})])
+    out = recipe.run(img, cache=ResultCache())
+    assert len(hashed) == 1  # the source only, not the gamma result
+    assert [k.split(":")[0] for k in planes._items] == [recipe.keys(content_key(img))[0]]
+    assert np.array_equal(out, registry.call("sharpen", registry.call("gamma", img, gamma=0.8), kind="second"))
@@ -0,0 +1,17 @@
+# tests/test_histogram.py
+import sys
+import pytest
+
+from algorithms.histogram import render_histogram_image
+
+@pytest.mark.parametrize("shape", [(2, 2), (1, 1, 3), (64, 48, 3)])
+def test_renders_small_images(shape, make_image):
+    img = make_image(shape)
+    assert render_histogram_image(img).mode == "RGB"
+
+def test_matplotlib_missing_falls_back_to_chart(monkeypatch, make_image):
+    monkeypatch.setitem(sys.modules, "matplotlib", None)  # import raises ImportError
+    img = make_image((32, 32, 3))
+    with pytest.warns(UserWarning, match="matplotlib unavailable"):
+        chart = render_histogram_image(img, use_matplotlib=True)
+    assert chart.tobytes() == render_histogram_image(img).tobytes()
@@ -0,0 +1,56 @@
+# tests/test_history.py
+import numpy as np
+import pytest
+
+from algorithms.history import History
+from algorithms.pipeline import Pipeline
+
+STEPS = [("smooth", {"mode": "mean"}), ("gamma", {"gamma": 0.8}), ("sharpen", {"kind": "first"}),
+         ("negative", {"force_gray": False}), ("log", {})]
+
+def _fill(history, original):
+    # one entry per prefix of STEPS, each with its pixels; returns them
+    expected = []
+    for k in range(1, len(STEPS) + 1):
+        recipe = Pipeline(STEPS[:k])
+        expected.append(recipe.run(original))
+        history.push(recipe, STEPS[k - 1][0], expected[-1])
+        history.trim()
+    return expected
+
+@pytest.mark.parametrize("original", ["noise", "blocks"])
+def test_over_budget_entries_come_back_identical(original, make_image):
+    # noise does not compress, so its entries are dropped and recomputed;
+    # flat blocks are zlib-compressed and unpacked
+    img = make_image((120, 90, 3))
+    if original == "blocks":
+        img = make_image((12, 9, 3)).repeat(10, axis=0).repeat(10, axis=1)
+    history = History(max_bytes=2 * img.nbytes)
+    expected = _fill(history, img)
+    assert history.nbytes <= history.max_bytes
+    entries = [history.neighbour(-k) for k in range(len(STEPS) - 1, -1, -1)]
+    if original == "noise":
+        assert sum(history.peek(e) is None for e in entries) >= 2
+    else:
+        assert sum(e.packed is not None for e in entries) >= 2
+    for entry, pixels in zip(entries, expected):
+        assert np.array_equal(history.image(entry, img), pixels)
+        assert history.peek(entry) is not None  # kept again until the next trim
+
+def test_current_entry_stays_under_any_budget(make_image):
+    img = make_image((60, 40, 3))
+    history = History(max_bytes=1)
+    expected = _fill(history, img)
+    assert history.peek(history.current) is expected[-1]
+    assert history.image(history.neighbour(-2), img).tobytes() == expected[-3].tobytes()
+
+def test_undo_redo_and_branching(make_image):
+    img = make_image((60, 40, 3))
+    history = History()
+    _fill(history, img)
+    assert history.step(-1).label == "negative" and history.can_redo
+    history.push(Pipeline(STEPS[:4]).then("threshold", t=50), "threshold", None)
+    assert not history.can_redo and history.current.label == "threshold"
+    while history.can_undo:
+        history.step(-1)
+    assert history.current.recipe is None and history.step(-1) is None
@@ -0,0 +1,33 @@
+# tests/test_implementations.py
+import io
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+import check_implementations as harness  # noqa: E402
+from algorithms import registry  # noqa: E402
+
+CASES_PER_OP = 12
+
+@pytest.mark.parametrize("name", registry.names())
+def test_implementations_match_reference(name):
+    # a fixed seeded corpus per operation, small images: the reference is per-pixel Python
+    out = io.StringIO()
+    seed = 1000 * (registry.names().index(name) + 1)
+    failures = sum(harness.check_case(seed + i, [name], 21, out) for i in range(CASES_PER_OP))
+    assert failures == 0, out.getvalue()
+
+def test_harness_reports_mismatch(monkeypatch):
+    # a broken implementation is found, shrunk and replayable
+    broken = lambda img, **p: registry.get("negative", "reference")(img, **p) ^ 1
+    get = registry.get
+    monkeypatch.setattr(registry, "get", lambda name, impl=None: broken if impl == "numpy" else get(name, impl))
+    out = io.StringIO()
+    assert harness.check_case(5, ["negative"], 21, out) > 0
+    report = out.getvalue()
+    assert "FAIL negative" in report and "smallest failing crop (1, 1" in report and "--seed 5 -n 1" in report
+
+def test_cli_exit_status():
+    assert harness.main(["-n", "3", "--seed", "7", "-k", "threshold", "--max-size", "9"]) == 0
@@ -0,0 +1,35 @@
+# tests/test_loader.py
+import pytest
+from PIL import Image
+
+from algorithms.loader import load_draft
+
+@pytest.fixture
+def picture(make_image):
+    return lambda w=1600, h=1200: Image.fromarray(make_image((h, w, 3)))
+
+def test_jpeg_draft_fits_box(tmp_path, picture):
+    path = str(tmp_path / "a.jpg")
+    picture().save(path, quality=90)
+    draft = load_draft(path, 400, 400)
+    assert draft.size == (400, 300)
+
+def test_pyramidal_tiff_draft_reads_reduced_page(tmp_path, monkeypatch, picture):
+    full = picture()
+    path = str(tmp_path / "pyramid.tif")
+    pages = [full.reduce(f) for f in (2, 4, 8)]
+    full.save(path, save_all=True, append_images=pages, compression="tiff_deflate")
+    loaded = []
+    load = Image.Image.load
+    monkeypatch.setattr(Image.Image, "load", lambda im: loaded.append(im.size) or load(im))
+    draft = load_draft(path, 300, 300)
+    assert draft.size == (300, 225)
+    assert (400, 300) in loaded and (1600, 1200) not in loaded  # 1/4 page: smallest that covers the box
+
+def test_other_files_have_no_draft(tmp_path, picture):
+    img = picture(800, 600)
+    img.save(tmp_path / "a.png")
+    img.save(tmp_path / "flat.tif")
+    img.save(tmp_path / "pages.tif", save_all=True, append_images=[picture(300, 300)])  # not a reduction
+    for name in ("a.png", "flat.tif", "pages.tif"):
+        assert load_draft(str(tmp_path / name), 200, 200) is None
@@ -0,0 +1,70 @@
+# tests/test_parallel.py
+import os
+import subprocess
+import sys
+import textwrap
+import numpy as np
+import pytest
+
+from algorithms import parallel, registry
+
+DESKTOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_process_backend_after_kernels_exits(tmp_path):
+    # compiled kernels run in the parent, then a process pool: the
+    # interpreter used to hang at exit when the workers were forked
+    script = tmp_path / "run.py"
+    script.write_text(textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {DESKTOP!r})
+        import numpy as np
+        from algorithms import parallel, registry
+
+        def main():
+            im = np.random.default_rng(0).integers(0, 256, size=(600, 400, 3), dtype=np.uint8)
+            a = registry.call("negative", im)
+            b = parallel.run_parallel("negative", im, workers=4, backend="process")
+            parallel.shutdown()
+            print("same" if np.array_equal(a, b) else "differ")
+
+        if __name__ == "__main__":
+            main()
+    """))
+    done = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert done.returncode == 0, done.stderr
+    assert done.stdout.strip() == "same"
+
+def _numba_threads(_):
+    return os.environ.get("NUMBA_NUM_THREADS")
+
+def test_process_workers_run_one_kernel_thread():
+    with parallel.process_pool(2) as pool:
+        assert set(pool.map(_numba_threads, range(4))) == {"1"}
+
+def test_process_pool_does_not_fork():
+    assert parallel.mp_context().get_start_method() in ("forkserver", "spawn")
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_run_parallel_matches_whole_image(backend, make_image):
+    im = make_image((301, 203, 3))
+    expected = registry.call("smooth", im, mode="gaussian", sigma=1.5)
+    got = parallel.run_parallel("smooth", im, workers=2, backend=backend, mode="gaussian", sigma=1.5)
+    parallel.shutdown()
+    assert np.array_equal(got, expected)
+
+def _smooth_impl(_):
+    return registry.implementation("smooth")
+
+def test_process_pool_follows_a_later_implementation_choice():
+    try:
+        registry.use(None)
+        first = parallel._pool("process", 2)
+        assert first.submit(_smooth_impl, 0).result() == "numpy"
+        registry.use("smooth=reference")
+        pool = parallel._pool("process", 2)
+        assert pool is not first
+        assert set(pool.map(_smooth_impl, range(4))) == {"reference"}
+        assert parallel._pool("process", 2) is pool
+    finally:
+        registry.use(None)
+        parallel.shutdown()
@@ -0,0 +1,65 @@
+# tests/test_pipeline.py
+import numpy as np
+import pytest
+
+from algorithms import pipeline, registry
+from algorithms.cache import ResultCache
+from algorithms.pipeline import FORMAT, Pipeline
+from algorithms.progress import Progress
+
+CHAINS = [
+    [("gamma", {"gamma": 0.5}), ("log", {})],
+    [("negative", {"force_gray": False}), ("gamma", {"gamma": 2.2}), ("log", {})],
+    [("gamma", {"gamma": 1.8}), ("threshold", {"t": 100}), ("negative", {})],  # gray op mid-chain
+    [("threshold", {"t": 90}), ("gamma", {"gamma": 0.7})],
+    [("log", {}), ("smooth", {"mode": "weighted"}), ("negative", {}), ("sharpen", {"kind": "second"})],
+]
+
+def _one_by_one(img, steps):
+    for name, params in steps:
+        img = np.asarray(registry.call(name, img, **params))
+    return img
+
+@pytest.mark.parametrize("steps", CHAINS)
+@pytest.mark.parametrize("shape", [(97, 61), (97, 61, 3)])
+def test_fused_chain_matches_steps_one_by_one(steps, shape, make_image):
+    img = make_image(shape)
+    expected = _one_by_one(img, steps)
+    recipe = Pipeline(steps)
+    assert np.array_equal(recipe.run(img), expected)
+    assert np.array_equal(recipe.run(img, Progress()), expected)
+
+def test_consecutive_point_ops_form_one_stage():
+    kinds = [kind for kind, _, _ in Pipeline(CHAINS[4]).stages()]
+    assert kinds == ["point", "op", "point", "op"]
+    assert len(Pipeline(CHAINS[1]).stages()) == 1
+
+def test_json_round_trip(tmp_path):
+    recipe = Pipeline(CHAINS[4]).then("resize", new_w=40, new_h=30, mode="area")
+    assert Pipeline.from_json(recipe.to_json()) == recipe
+    recipe.save(str(tmp_path / "recipe.json"))
+    loaded = Pipeline.load(str(tmp_path / "recipe.json"))
+    assert loaded == recipe and loaded.steps == recipe.steps
+
+def test_newer_or_unknown_recipes_are_rejected():
+    with pytest.raises(ValueError, match="newer"):
+        Pipeline.from_dict({"format": FORMAT + 1, "steps": []})
+    with pytest.raises(ValueError, match="Unknown operation"):
+        Pipeline.from_json('{"steps": [{"op": "emboss"}]}')
+
+def test_cached_prefix_is_resumed(make_image, monkeypatch):
+    img = make_image((120, 90, 3), writeable=False)
+    cache = ResultCache()
+    short = Pipeline(CHAINS[4][:3])
+    long = short.then("sharpen", kind="second")
+    short.run(img, cache=cache)
+
+    ran = []
+    call = registry.call
+    monkeypatch.setattr(registry, "call", lambda name, *a, **k: ran.append(name) or call(name, *a, **k))
+    monkeypatch.setattr(pipeline, "_run_point", lambda *a: pytest.fail("cached point stage ran again"))
+    out = long.run(img, cache=cache)
+    assert ran == ["sharpen"]  # only the new step
+    assert long.run(img, cache=cache) is out  # and nothing at all once the whole recipe is cached
+    monkeypatch.undo()
+    assert np.array_equal(out, _one_by_one(img, long.steps))
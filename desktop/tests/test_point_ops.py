@@ -0,0 +1,18 @@
+# tests/test_point_ops.py
+import pytest
+
+from algorithms.point_ops import Gamma, Log, Negative, PointOp, Threshold
+
+def test_point_op_is_abstract():
+    with pytest.raises(TypeError):
+        PointOp()
+
+    class Incomplete(PointOp):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+@pytest.mark.parametrize("op", [Negative(), Threshold(128), Log(), Gamma(2.2)])
+def test_operations_are_concrete(op):
+    assert isinstance(op, PointOp)
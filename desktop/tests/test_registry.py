@@ -0,0 +1,24 @@
+# tests/test_registry.py
+import importlib
+import os
+
+from algorithms import registry
+
+ALGORITHMS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "algorithms")
+
+def _named_modules():
+    # every module the registry imports by name
+    names = {registry._REFERENCE, "algorithms.point_ops"}
+    for table in (registry._OPS, registry._HALOS, registry._APPROX_HALOS, registry._PREVIEWS):
+        names.update(module for module, _ in table.values())
+    return names
+
+def test_named_modules_are_files_the_build_lists():
+    # the Windows build adds a hidden import per algorithms/*.py file
+    files = {f"algorithms.{n[:-3]}" for n in os.listdir(ALGORITHMS) if n.endswith(".py")}
+    assert _named_modules() <= files
+
+def test_named_functions_exist():
+    for table in (registry._OPS, registry._HALOS, registry._APPROX_HALOS, registry._PREVIEWS):
+        for module, attr in table.values():
+            assert callable(getattr(importlib.import_module(module), attr))
@@ -0,0 +1,23 @@
+# tests/test_saver.py
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageFile
+
+from algorithms.saver import save_image
+
+def test_concurrent_progressive_jpeg_saves(tmp_path, make_image):
+    # noisy 4:4:4 progressive JPEGs need the raised buffer floor; saves from
+    # several threads must not see each other's (or the restored) floor
+    block = ImageFile.MAXBLOCK
+    images = [make_image((200 + 60 * i, 300 + 40 * i, 3), seed=i) for i in range(8)]
+
+    def save(i):
+        path = str(tmp_path / f"{i}.jpg")
+        save_image(images[i], path, quality=95, subsampling="4:4:4", progressive=True, optimize=True)
+        return path
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(save, range(len(images))))
+    assert ImageFile.MAXBLOCK == block
+    for path, img in zip(paths, images):
+        with Image.open(path) as im:
+            assert im.size == (img.shape[1], img.shape[0])
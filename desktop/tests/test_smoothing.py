@@ -0,0 +1,68 @@
+# tests/test_smoothing.py
+import numpy as np
+import pytest
+
+from algorithms import parallel, registry
+from algorithms.progress import Progress
+from algorithms.smoothing import IIR_MIN_SIGMA, gaussian_blur, smooth_approx_halo, smooth_halo
+from algorithms.tiling import run_banded, run_tiled
+
+SIGMAS = [IIR_MIN_SIGMA, 5.5, 12.0]
+
+def _within_one(got, expected):
+    assert got.shape == expected.shape and got.dtype == expected.dtype
+    assert np.abs(got.astype(np.int16) - expected).max() <= 1
+
+def test_recursive_gaussian_has_approximate_halo_only():
+    assert smooth_halo(mode="gaussian", sigma=5.5) is None
+    assert smooth_approx_halo(mode="gaussian", sigma=5.5) == 22
+    assert registry.halo("smooth", mode="gaussian", sigma=5.5) is None
+    assert registry.halo("smooth", approx=True, mode="gaussian", sigma=5.5) == 22
+    assert registry.halo("smooth", approx=True, mode="gaussian", sigma=1.0) == smooth_halo(sigma=1.0)
+
+@pytest.mark.parametrize("sigma", SIGMAS)
+def test_tiled_recursive_gaussian_within_one_level(sigma, make_image):
+    img = make_image((517, 301, 3))
+    expected = gaussian_blur(img, sigma)
+    _within_one(np.asarray(run_tiled("smooth", img, tile=128, mode="gaussian", sigma=sigma)), expected)
+    _within_one(run_banded("smooth", img, band_rows=64, mode="gaussian", sigma=sigma), expected)
+
+def test_tiled_recursive_gaussian_from_memmap(tmp_path, make_image):
+    img = make_image((300, 260))
+    np.save(tmp_path / "in.npy", img)
+    src = np.load(tmp_path / "in.npy", mmap_mode="r")
+    out = run_tiled("smooth", src, tile=100, out_path=str(tmp_path / "out.npy"), mode="gaussian", sigma=6.0)
+    _within_one(np.load(tmp_path / "out.npy"), gaussian_blur(img, 6.0))
+    del out
+
+def test_progress_recursive_gaussian_is_exact_with_row_steps(make_image):
+    img = make_image((700, 300, 3))
+    p = Progress()
+    got = registry.call("smooth", img, progress=p, mode="gaussian", sigma=8.0)
+    assert np.array_equal(got, gaussian_blur(img, 8.0))
+    assert p.total == 2 * 3 + 2 * 2  # 256-row steps, forward and backward, both axes
+    assert p.done == p.total
+
+def test_parallel_recursive_gaussian_is_exact(make_image):
+    img = make_image((517, 301, 3))
+    got = parallel.run_parallel("smooth", img, workers=2, mode="gaussian", sigma=5.5)
+    parallel.shutdown()
+    assert np.array_equal(got, gaussian_blur(img, 5.5))
+
+def test_tiled_without_out_path_leaves_no_file(tmp_path, monkeypatch, make_image):
+    import tempfile
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    img = make_image((300, 260, 3))
+    out = run_tiled("smooth", img, tile=100, mode="gaussian", sigma=6.0)
+    assert isinstance(out, np.memmap) and list(tmp_path.iterdir()) == []
+    _within_one(np.asarray(out), gaussian_blur(img, 6.0))
+
+@pytest.mark.parametrize("sigma", [0.5, 1.0, 2.9])
+def test_small_sigma_gaussian_strips_do_not_show(sigma, monkeypatch, make_image):
+    # one-row strips and one whole-image strip give the same bytes
+    from algorithms import smoothing
+    img = make_image((97, 61, 3))
+    monkeypatch.setattr(smoothing, "STRIP_PIXELS", 1 << 30)
+    whole = gaussian_blur(img, sigma)
+    monkeypatch.setattr(smoothing, "STRIP_PIXELS", 1)
+    assert np.array_equal(gaussian_blur(img, sigma), whole)
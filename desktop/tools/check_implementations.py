@@ -0,0 +1,153 @@
+"""Check that every implementation of every operation gives the reference bytes.
+
+    python tools/check_implementations.py                 # 200 random cases
+    python tools/check_implementations.py -n 1000 -k smooth
+    python tools/check_implementations.py --seed 1234 -n 1   # replay one case
+
+Each case draws an operation, parameters from its whole range, and a gray or
+RGB image of odd size (noise, a few levels, flat, gray stored as RGB). The
+reference loops (algorithms.reference) run on it, then every other
+implementation available here (registry.implementations), called directly
+and with a progress token (banded). A mismatch is shrunk to the smallest
+crop that still differs and reported with the seed that replays it.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms import registry  # noqa: E402
+from algorithms.progress import Progress  # noqa: E402
+
+def _odd(rng, hi):
+    return int(rng.integers(0, (hi + 1) // 2)) * 2 + 1
+
+def make_image(rng, max_size):
+    H, W = _odd(rng, max_size), _odd(rng, max_size)
+    shape = (H, W) if rng.random() < 0.4 else (H, W, 3)
+    style = rng.choice(["noise", "levels", "flat", "gray-rgb"])
+    if style == "noise":
+        img = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    elif style == "levels":  # max below a power of two, few distinct values
+        top = int(rng.choice([1, 2, 64, 127, 128, 129, 255]))
+        img = rng.choice(np.linspace(0, top, int(rng.integers(1, 5))).astype(np.uint8), size=shape)
+    elif style == "flat":
+        img = np.full(shape, int(rng.choice([0, 1, 128, 255])), dtype=np.uint8)
+    else:
+        g = rng.integers(0, 256, size=(H, W), dtype=np.uint8)
+        img = np.stack([g, g, g], axis=2)
+    return img
+
+# operation -> parameters drawn from everything the operation accepts
+PARAMS = {
+    "negative": lambda rng, img: {"force_gray": bool(rng.random() < 0.5)},
+    "threshold": lambda rng, img: {"t": int(rng.integers(0, 257))},
+    "log": lambda rng, img: {},
+    "gamma": lambda rng, img: {"gamma": float(rng.choice([0.0, 0.4, 1.0, 2.2, round(rng.uniform(0.05, 5), 3)]))},
+    "smooth": lambda rng, img: [
+        lambda: {"mode": str(rng.choice(["mean", "weighted", "gaussian", "other"])),
+                 "strength": str(rng.choice(["low", "medium", "high"]))},
+        lambda: {"mode": "mean", "radius": int(rng.integers(0, 5))},
+        lambda: {"mode": "gaussian", "sigma": round(float(rng.uniform(0.3, 6)), 2)},
+    ][rng.integers(3)](),
+    "sharpen": lambda rng, img: {"kind": str(rng.choice(["first", "second", "other"])),
+                                 "strength": str(rng.choice(["low", "medium", "high", "other"]))},
+    "laplacian": lambda rng, img: {},
+    "histogram": lambda rng, img: {},
+    "resize": lambda rng, img: {"new_w": int(rng.integers(1, 2 * img.shape[1] + 2)),
+                                "new_h": int(rng.integers(1, 2 * img.shape[0] + 2)),
+                                "mode": str(rng.choice(["nearest", "bilinear", "area", "pyramid"]))},
+}
+
+def _run(name, impl, img, params, banded):
+    fn = registry.get(name, impl)
+    res = fn(img, progress=Progress(), **params) if banded else fn(img, **params)
+    return np.asarray(res)
+
+def _differs(name, impl, img, params, banded, expected=None):
+    # None if impl matches the reference on img, else a short description
+    if expected is None:
+        expected = _run(name, "reference", img, params, False)
+    got = _run(name, impl, img, params, banded)
+    if got.shape != expected.shape or got.dtype != expected.dtype:
+        return f"shape/dtype {got.shape} {got.dtype}, expected {expected.shape} {expected.dtype}"
+    bad = np.argwhere(got != expected)
+    if not len(bad):
+        return None
+    at = tuple(int(i) for i in bad[0])
+    return f"{len(bad)} value(s) differ, first at {at}: {got[at]} instead of {expected[at]}"
+
+def _crops(img):
+    # smaller crops of img, smallest first, sides kept odd
+    for axis in (0, 1):
+        n = img.shape[axis]
+        for m in sorted({1, n // 2 | 1, n - 2}):
+            if 1 <= m < n:
+                for start in (0, n - m):
+                    yield img[start:start + m] if axis == 0 else img[:, start:start + m]
+
+def shrink(name, impl, img, params, banded):
+    # smallest crop on which impl still differs
+    smaller = True
+    while smaller:
+        smaller = False
+        for crop in _crops(img):
+            if _differs(name, impl, crop, params, banded):
+                img, smaller = crop, True
+                break
+    return img
+
+def check_case(seed, names, max_size, stream):
+    rng = np.random.default_rng(seed)
+    name = str(rng.choice(names))
+    img = make_image(rng, max_size)
+    params = PARAMS[name](rng, img)
+    expected = _run(name, "reference", img, params, False)
+    failures = 0
+    for impl in registry.implementations(name):
+        for banded in (False, True):
+            if impl == "reference" and not banded:
+                continue
+            why = _differs(name, impl, img, params, banded, expected)
+            if why is None:
+                continue
+            failures += 1
+            small = shrink(name, impl, img, params, banded)
+            stream.write(f"FAIL {name} {params} on {impl}{' (banded)' if banded else ''}, "
+                         f"image {img.shape}: {why}\n"
+                         f"     smallest failing crop {small.shape}: "
+                         f"{_differs(name, impl, small, params, banded)}\n"
+                         f"     replay: --seed {seed} -n 1 -k {name}\n")
+    return failures
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare every implementation with the reference loops.",
+                                 formatter_class=argparse.RawDescriptionHelpFormatter,
+                                 epilog=__doc__)
+    ap.add_argument("-n", "--cases", type=int, default=200, help="random cases to run")
+    ap.add_argument("--seed", type=int, default=None, help="first case seed (default: random)")
+    ap.add_argument("-k", "--filter", default=None, help="only operations whose name contains this")
+    ap.add_argument("--max-size", type=int, default=41, help="largest image side (keep it small: "
+                                                               "the reference is per-pixel Python)")
+    args = ap.parse_args(argv)
+
+    names = [n for n in registry.names() if not args.filter or args.filter in n]
+    if not names:
+        ap.error(f"no operation matches {args.filter!r}")
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % (1 << 31))
+    impls = {n: registry.implementations(n) for n in names}
+    print("implementations: " + ", ".join(f"{n}={'/'.join(i)}" for n, i in impls.items()))
+
+    t0, failed = time.perf_counter(), 0
+    for i in range(args.cases):
+        failed += check_case(seed + i, names, args.max_size, sys.stdout) > 0
+    print(f"{args.cases - failed} of {args.cases} case(s) identical (seeds {seed}..{seed + args.cases - 1}) "
+          f"in {time.perf_counter() - t0:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())